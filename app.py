@@ -3,113 +3,413 @@
 Flask web application for exploring IEEE-754 double-precision floating-point behavior.
 """
 
+import json
 import math
+import os
+import threading
+import time
 from decimal import ROUND_HALF_UP, Context
-
-from flask import Flask, jsonify, render_template, request, send_from_directory
-
-from fp import FP, Segment
+from functools import lru_cache
+from itertools import islice
+from typing import List, Optional
+
+from flask import Flask, Response, g, jsonify, render_template, request, send_from_directory, stream_with_context
+from markupsafe import Markup
+
+from batch import BatchItemError, iter_items
+from bulk import RECORD, RECORD_LAYOUT, VALUE_SIZE, analyze_records, iter_chunks, to_columns
+from metrics import CONTENT_TYPE, REGISTRY, Counter, Gauge, Histogram, record_spans, replay, span
+from notes import code_css, render_notes_or_fallback
+from page_cache import IDENTITY, PageCache
+from offload import Overloaded, TimeBudgetExceeded, WorkPool
+from fp import CompactFP, Segment, float_range, use_segment_table
+from fputil import (float_to_uint64, uint64_to_float, uint64_to_exact_decimal, uint64_to_ordinal, ordinal_to_uint64,
+                    exact_decimal_digits, unpack_uint64_fp, MAX_FINITE_ORDINAL, SUBNORMAL_UNBIASED_EXP)
+from segment_table import SegmentTable
 
 app = Flask(__name__)
 
 _SEGMENT_CTX = Context(prec=400, rounding=ROUND_HALF_UP)
 
+# precomputed segment table, built with 'python segment_table.py segments.bin': when present it is memory-mapped
+# and shared by all the worker processes instead of each of them computing the segments
+_SEGMENT_TABLE_PATH = os.environ.get("FP_SEGMENT_TABLE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "segments.bin"))
+if os.path.exists(_SEGMENT_TABLE_PATH):
+    use_segment_table(SegmentTable.open(_SEGMENT_TABLE_PATH))
+
+# page size of the d-digit decimal list: the list itself can be astronomically long for large digits
+_D_DIGIT_PAGE_SIZE = 100
+_D_DIGIT_MAX_PAGE_SIZE = 1000
+
+# significant digits of the exact decimal sent with the exact decimal payload; longer expansions (up to 767 digits
+# near the subnormals) are sent as this head and fetched on demand from /api/exact-decimal/digits
+_EXACT_HEAD_DIGITS = 64
+_EXACT_DIGITS_PAGE_SIZE = 200
+_EXACT_DIGITS_MAX_PAGE_SIZE = 1000
+
+# entries per result cache, and freshness lifetime of the cacheable GET APIs: results only depend on the input
+_RESULT_CACHE_SIZE = 4096
+_RESULT_MAX_AGE = 86400
+
+# neighbours streamed by /api/range on each side of the value, and floats whose exact decimals are computed at once
+_RANGE_DEFAULT_K = 5
+_RANGE_MAX_K = 100000
+_RANGE_EXACT_CHUNK = 1024
+
+# offload mode: with OFFLOAD_WORKERS > 0 the CPU-heavy calls of the exact decimal and segment tools and the exact
+# decimals of /api/range run on a process pool of that size with at most OFFLOAD_QUEUE calls waiting (503 beyond),
+# each request within TIME_BUDGET seconds (503 after). ITERATION_BUDGET caps the values one request may produce (422 beyond), in both modes. The body of the
+# binary bulk analysis is streamed in chunks, so it has its own, much larger, limit: BULK_MAX_BYTES (413 beyond).
+app.config.update(
+    OFFLOAD_WORKERS=int(os.environ.get("FP_OFFLOAD_WORKERS", "0")),
+    OFFLOAD_QUEUE=int(os.environ.get("FP_OFFLOAD_QUEUE", "16")),
+    TIME_BUDGET=float(os.environ.get("FP_TIME_BUDGET", "5")),
+    ITERATION_BUDGET=int(os.environ.get("FP_ITERATION_BUDGET", str(2 * _RANGE_MAX_K + 1))),
+    BULK_MAX_BYTES=int(os.environ.get("FP_BULK_MAX_BYTES", str(1 << 30))),
+)
+# seconds after which a client refused with 503 may retry
+_RETRY_AFTER = 1
+
+# the pages without per-request content are rendered once and served from memory, precompressed, until one of
+# their source files changes; the notes are rendered from Markdown on the server
+_PAGE_CACHE = PageCache()
+_NOTES_PATH = os.path.join(app.root_path, "docs", "floating-point-distribution-and-precision.md")
+
+# the work pool of offload mode lives in app.extensions["work_pool"], see get_work_pool()
+_work_pool_lock = threading.Lock()
+
+# request and stage metrics, exported on /metrics: routes are labelled with their URL rule (not the path, whose
+# values are unbounded), and stages with buckets of digits and exponents
+REQUEST_SECONDS = Histogram("fp_http_request_duration_seconds", "Time to handle a request, by route, method and status",
+                            ["route", "method", "status"])
+REQUESTS_IN_FLIGHT = Gauge("fp_http_requests_in_flight", "Requests being handled, by route", ["route"])
+REQUEST_ERRORS = Counter("fp_http_request_errors_total", "Requests answered with a 4xx or 5xx status, by route, method and status",
+                         ["route", "method", "status"])
+STAGE_SECONDS = Histogram("fp_stage_duration_seconds", "Time spent in each stage of the exact decimal and segment tools",
+                          ["tool", "stage", "digits", "exponent"])
+
+
+def get_work_pool() -> Optional[WorkPool]:
+    """Return the work pool of offload mode, created on first use and replaced when OFFLOAD_WORKERS or OFFLOAD_QUEUE
+    changed, or None (after shutting down the previous pool, if any) when offload mode is off."""
+    workers, max_queue = app.config["OFFLOAD_WORKERS"], app.config["OFFLOAD_QUEUE"]
+    with _work_pool_lock:
+        pool = app.extensions.get("work_pool")
+        if pool is not None and (workers <= 0 or (pool.workers, pool.max_queue) != (workers, max_queue)):
+            pool.shutdown()
+            pool = None
+        if pool is None and workers > 0:
+            pool = WorkPool(workers, max_queue)
+        app.extensions["work_pool"] = pool
+        return pool
+
+
+def _offload(func, *args, timeout: Optional[float] = None):
+    """Return func(*args), computed on the work pool in offload mode and in the calling thread otherwise.
+
+    The result is awaited for 'timeout' seconds, TIME_BUDGET by default. Raise Overloaded or TimeBudgetExceeded as
+    WorkPool.run() does."""
+    if app.config["OFFLOAD_WORKERS"] <= 0:
+        return func(*args)
+    pool = get_work_pool()
+    # the stages timed in the worker process are recorded here
+    if timeout is None:
+        timeout = app.config["TIME_BUDGET"]
+    elif timeout <= 0:
+        raise TimeBudgetExceeded(f"No time left of the time budget of {app.config['TIME_BUDGET']} s")
+    result, spans = pool.run(record_spans, func, *args, timeout=timeout)
+    replay(spans)
+    return result
+
+
+def _unavailable(exc: Exception):
+    """Return the payload and status of a request refused by the work pool."""
+    reason = "time_budget" if isinstance(exc, TimeBudgetExceeded) else "overloaded"
+    return {"error": f"Server busy, please retry: {exc}", "reason": reason}, 503
+
+
+def _over_budget(iterations: int):
+    """Return the payload and status of a request that would produce more values than the iteration budget, or None."""
+    budget = app.config["ITERATION_BUDGET"]
+    if iterations <= budget:
+        return None
+    return {"error": f"The request would produce {iterations} values, more than the budget of {budget}",
+            "reason": "iteration_budget"}, 422
+
+
+def _json_response(payload: dict, status: int) -> Response:
+    """Return a JSON response, telling clients refused with 503 when to retry."""
+    response = jsonify(payload)
+    response.status_code = status
+    if status == 503:
+        response.headers["Retry-After"] = str(_RETRY_AFTER)
+    return response
+
+
+def _digits_bucket(digits: int) -> str:
+    """Label of a number of digits: up to 15 every decimal round-trips through a double, from 18 none is needed."""
+    if digits <= 15:
+        return "1-15"
+    return str(digits) if digits <= 17 else "18-50"
+
+
+def _exponent_bucket(unbiased_exp: int) -> str:
+    """Label of an unbiased exponent: 'subnormal' (zero included), or the range of 256 exponents it is in."""
+    if unbiased_exp == SUBNORMAL_UNBIASED_EXP:
+        return "subnormal"
+    low = unbiased_exp // 256 * 256
+    return f"{low}..{low + 255}"
+
+
+def _stage_labels(payload: dict) -> dict:
+    """Digits and exponent labels of the stages of a tool result; an error has neither."""
+    labels = {}
+    if "digits" in payload:
+        labels["digits"] = _digits_bucket(payload["digits"])
+    if "unbiased_exp" in payload:
+        labels["exponent"] = _exponent_bucket(payload["unbiased_exp"])
+    return labels
+
+
+def _serialized(tool: str, payload: dict, status: int, respond=_json_response) -> Response:
+    """Return respond(payload, status), timed as the JSON serialisation stage of 'tool'."""
+    with span(STAGE_SECONDS, tool=tool, stage="serialize", **_stage_labels(payload)):
+        return respond(payload, status)
+
+
+@app.before_request
+def _start_request_metrics():
+    g.metrics_route = request.url_rule.rule if request.url_rule else "unmatched"
+    g.metrics_start = time.perf_counter()
+    REQUESTS_IN_FLIGHT.inc(route=g.metrics_route)
+
+
+@app.after_request
+def _record_response_status(response: Response) -> Response:
+    g.metrics_status = response.status_code
+    return response
+
+
+@app.teardown_request
+def _finish_request_metrics(exc):
+    """Observe the request latency, up to the end of the handler (of the stream for batch responses); a request
+    that raised, 'exc', counts as a 500, even if its status was already sent."""
+    route = g.pop("metrics_route", None)
+    if route is None:
+        return
+    status = g.pop("metrics_status", 500)
+    if exc is not None:
+        status = 500
+    labels = {"route": route, "method": request.method, "status": str(status)}
+    REQUEST_SECONDS.observe(time.perf_counter() - g.pop("metrics_start"), **labels)
+    REQUESTS_IN_FLIGHT.dec(route=route)
+    if status >= 400:
+        REQUEST_ERRORS.inc(**labels)
+
+
+def _template_path(name: str) -> str:
+    return os.path.join(app.root_path, app.template_folder, name)
+
+
+def _static_page(template: str, extra_sources=(), **context) -> Response:
+    """Serve a page rendered from 'template' (and 'extra_sources') from the page cache: the smallest variant the
+    client accepts, with a strong ETag that clients revalidate on each use, or 304 Not Modified."""
+    def render() -> str:
+        # the compiled templates are only reloaded from disk in debug mode: drop them so that an edit is seen
+        app.jinja_env.cache.clear()
+        return render_template(template, **{name: value() if callable(value) else value for name, value in context.items()})
+
+    sources = [_template_path(template), _template_path("base.html"), *extra_sources]
+    page = _PAGE_CACHE.get(template, sources, render)
+    encoding = page.negotiate(request.accept_encodings.quality)
+    response = Response(page.variants[encoding], mimetype="text/html")
+    if encoding != IDENTITY:
+        response.content_encoding = encoding
+    response.vary.add("Accept-Encoding")
+    response.set_etag(page.etags[encoding])
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 
 @app.route("/")
 def index():
     """Serve the home page with mission and links to tools."""
-    return render_template("index.html", nav_active="home")
+    return _static_page("index.html", nav_active="home")
 
 
 @app.route("/exact-decimal")
 def exact_decimal_form():
     """Serve the exact decimal form page."""
-    return render_template("exact_decimal.html", nav_active="exact_decimal")
+    return _static_page("exact_decimal.html", nav_active="exact_decimal")
 
 
 @app.route("/exact-decimal", methods=["POST"])
 def exact_decimal_process():
     """Process the decimal input and return exact decimal representation."""
-    decimal_input = request.form.get("decimal", "").strip()
-    digits_input = request.form.get("digits", "").strip()
+    payload, status = exact_decimal_result(
+        request.form.get("decimal", "").strip(),
+        request.form.get("digits", "").strip(),
+        request.form.get("offset", "").strip(),
+        request.form.get("limit", "").strip(),
+    )
+    return _serialized("exact_decimal", payload, status)
+
+
+def exact_decimal_result(decimal_input: str, digits_input: str, offset_input: str = "", limit_input: str = ""):
+    """Return the JSON payload of the exact decimal tool for one input, and its HTTP status."""
+    offset_input = offset_input or "0"
+    limit_input = limit_input or str(_D_DIGIT_PAGE_SIZE)
 
     if not decimal_input:
-        return jsonify({"error": "Please enter a decimal number"}), 400
+        return {"error": "Please enter a decimal number"}, 400
 
     if not digits_input:
-        return jsonify({"error": "Please enter the number of digits"}), 400
+        return {"error": "Please enter the number of digits"}, 400
 
     try:
-        float_value = float(decimal_input)
-        digits_value = int(digits_input)
-
-        if digits_value < 1 or digits_value > 50:
-            return jsonify({"error": "Number of digits must be between 1 and 50"}), 400
-
-        result = FP.from_float(float_value)
-        d_digit_result = result.get_d_digit_decimals(digits_value)
-        d_digit_count, d_digit_distance, d_digit_list = d_digit_result
-
-        payload = {
-            "input": decimal_input,
-            "digits": digits_value,
-            "fp": result.fp,
-            "bits": result.bits,
-            "exact_decimal": str(result.exact_decimal),
-            "unbiased_exp": result.unbiased_exp,
-            "d_digit_count": d_digit_count,
-            "d_digit_distance": str(d_digit_distance),
-            "d_digit_list": [str(d) for d in d_digit_list],
-        }
-        if math.isfinite(float_value):
-            payload["neighbor_lower"] = math.nextafter(float_value, -math.inf)
-            payload["neighbor_higher"] = math.nextafter(float_value, math.inf)
-
-        return jsonify(payload)
+        with span(STAGE_SECONDS, tool="exact_decimal", stage="parse") as labels:
+            float_value = float(decimal_input)
+            digits_value = int(digits_input)
+
+            if digits_value < 1 or digits_value > 50:
+                return {"error": "Number of digits must be between 1 and 50"}, 400
+            labels["digits"] = _digits_bucket(digits_value)
+
+            offset_value = int(offset_input)
+            limit_value = int(limit_input)
+
+            if offset_value < 0:
+                return {"error": "Offset must be a non-negative integer"}, 400
+
+            if limit_value < 0 or limit_value > _D_DIGIT_MAX_PAGE_SIZE:
+                return {"error": f"Limit must be between 0 and {_D_DIGIT_MAX_PAGE_SIZE}"}, 400
+
+            if not math.isfinite(float_value):
+                return {"error": "Please enter a finite number (not infinity or NaN)."}, 400
+
+            u = float_to_uint64(float_value)
+            labels["exponent"] = _exponent_bucket(unpack_uint64_fp(u)[3])
+
+        payload = {"input": decimal_input}
+        # a cache hit, or the computation of the stages below on a miss
+        with span(STAGE_SECONDS, **dict(labels, stage="result")):
+            payload.update(_exact_decimal_payload(u, digits_value, offset_value, limit_value))
+        return payload, 200
+    except (Overloaded, TimeBudgetExceeded) as exc:
+        return _unavailable(exc)
     except ValueError as exc:
         error_msg = str(exc)
         if "could not convert string to float" in error_msg:
-            return jsonify({
+            return {
                 "error": "Invalid decimal number or number of digits. Please enter valid numbers.",
-            }), 400
+            }, 400
         if "invalid literal" in error_msg:
-            return jsonify({
+            return {
                 "error": "Invalid decimal number or number of digits. Please enter valid numbers.",
-            }), 400
-        return jsonify({"error": f"Error processing input: {error_msg}"}), 400
+            }, 400
+        return {"error": f"Error processing input: {error_msg}"}, 400
 
 
 @app.route("/segment")
 def segment_form():
     """Serve the segment / ULP explorer page."""
-    return render_template("segment.html", nav_active="segment")
+    return _static_page("segment.html", nav_active="segment")
 
 
 @app.route("/segment", methods=["POST"])
 def segment_process():
     """Return binade bounds and ULP (distance) for the float parsed from user input."""
-    decimal_input = request.form.get("decimal", "").strip()
+    payload, status = segment_result(request.form.get("decimal", "").strip())
+    return _serialized("segment", payload, status)
+
 
+def segment_result(decimal_input: str):
+    """Return the JSON payload of the segment / ULP tool for one input, and its HTTP status."""
     if not decimal_input:
-        return jsonify({"error": "Please enter a number"}), 400
+        return {"error": "Please enter a number"}, 400
 
-    try:
-        float_value = float(decimal_input)
-    except ValueError:
-        return jsonify({"error": "Invalid number. Please enter a valid floating-point literal."}), 400
+    with span(STAGE_SECONDS, tool="segment", stage="parse") as labels:
+        try:
+            float_value = float(decimal_input)
+        except ValueError:
+            return {"error": "Invalid number. Please enter a valid floating-point literal."}, 400
 
-    if not math.isfinite(float_value):
-        return jsonify({"error": "Please enter a finite number (not infinity or NaN)."}), 400
+        if not math.isfinite(float_value):
+            return {"error": "Please enter a finite number (not infinity or NaN)."}, 400
+
+        u = float_to_uint64(float_value)
+        labels["exponent"] = _exponent_bucket(unpack_uint64_fp(u)[3])
 
     try:
-        seg = Segment.from_fp(float_value, _SEGMENT_CTX)
+        payload = {"input": decimal_input}
+        # a cache hit, or the computation of the stages below on a miss
+        with span(STAGE_SECONDS, **dict(labels, stage="result")):
+            payload.update(_segment_payload(u))
     except OverflowError:
-        return jsonify({"error": "Cannot compute segment for this value."}), 400
-
-    fp_obj = FP.from_float(float_value)
-    float_index = int((fp_obj.exact_decimal - seg.min_val) / seg.distance)
-    return jsonify({
-        "input": decimal_input,
+        return {"error": "Cannot compute segment for this value."}, 400
+    except (Overloaded, TimeBudgetExceeded) as exc:
+        return _unavailable(exc)
+    return payload, 200
+
+
+@lru_cache(maxsize=_RESULT_CACHE_SIZE)
+def _exact_decimal_payload(u: int, digits: int, offset: int, limit: int) -> dict:
+    """Input-independent part of the exact decimal payload, cached on the canonical bit pattern of the float
+    (so that '0.1' and '0.10' share one entry) and the d-digit page. Callers must not mutate the result."""
+    return _offload(_compute_exact_decimal_payload, u, digits, offset, limit)
+
+
+def _compute_exact_decimal_payload(u: int, digits: int, offset: int, limit: int) -> dict:
+    """Compute the cached part of the exact decimal payload, see _exact_decimal_payload()."""
+    labels = {"tool": "exact_decimal", "digits": _digits_bucket(digits), "exponent": _exponent_bucket(unpack_uint64_fp(u)[3])}
+    with span(STAGE_SECONDS, stage="from_float", **labels):
+        result = CompactFP.from_uint64(u)
+    with span(STAGE_SECONDS, stage="d_digit_decimals", **labels):
+        d_digit_count, d_digit_distance, d_digit_list = result.get_d_digit_decimals(digits, offset, limit)
+    with span(STAGE_SECONDS, stage="exact_decimal_digits", **labels):
+        head, total, adjusted = result.exact_decimal_digits(0, _EXACT_HEAD_DIGITS)
+    truncated = total > _EXACT_HEAD_DIGITS
+    return {
+        "digits": digits,
+        "fp": result.fp,
+        "bits": result.bits,
+        # either the exact decimal or, when it is longer, the head of its significant digits: the rest is fetched
+        # from /api/exact-decimal/digits
+        "exact_decimal": None if truncated else str(result.exact_decimal),
+        "exact_decimal_head": head if truncated else None,
+        "exact_decimal_digits": total,
+        "exact_decimal_exponent": adjusted,
+        "exact_decimal_truncated": truncated,
+        "unbiased_exp": result.unbiased_exp,
+        # the count (and so the offsets of its pages) easily exceeds 2**53, beyond which JSON clients parse numbers
+        # inexactly: both are sent as decimal strings
+        "d_digit_count": str(d_digit_count),
+        "d_digit_distance": str(d_digit_distance),
+        "d_digit_list": [str(d) for d in d_digit_list],
+        "d_digit_offset": str(offset),
+        "d_digit_limit": limit,
+        "neighbor_lower": math.nextafter(result.fp, -math.inf),
+        "neighbor_higher": math.nextafter(result.fp, math.inf),
+    }
+
+
+@lru_cache(maxsize=_RESULT_CACHE_SIZE)
+def _segment_payload(u: int) -> dict:
+    """Input-independent part of the segment payload, cached on the canonical bit pattern of the float.
+    Callers must not mutate the result."""
+    return _offload(_compute_segment_payload, u)
+
+
+def _compute_segment_payload(u: int) -> dict:
+    """Compute the cached part of the segment payload, see _segment_payload()."""
+    labels = {"tool": "segment", "exponent": _exponent_bucket(unpack_uint64_fp(u)[3])}
+    with span(STAGE_SECONDS, stage="from_float", **labels):
+        fp_obj = CompactFP.from_uint64(u)
+    with span(STAGE_SECONDS, stage="from_fp", **labels):
+        seg = Segment.from_fp(fp_obj.fp, _SEGMENT_CTX)
+    with span(STAGE_SECONDS, stage="float_index", **labels):
+        float_index = seg.float_index(fp_obj.fp)
+    return {
         "fp": fp_obj.fp,
         "unbiased_exp": seg.unbiased_exp,
         "min_val": str(seg.min_val),
@@ -118,18 +418,285 @@ def segment_process():
         "length": str(seg.length),
         "float_index": float_index,
         "num_floats": 2 ** 52,
+    }
+
+
+def _cache_stats(cached_function) -> dict:
+    """Hit, miss and eviction counters of a result cache. Every miss inserts one entry, so the entries
+    that are no longer there have been evicted (concurrent misses of the same key count once more)."""
+    info = cached_function.cache_info()
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "evictions": info.misses - info.currsize,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+    }
+
+
+def _cacheable(payload: dict, status: int) -> Response:
+    """Return the JSON response of a GET API, with a strong ETag over its body and Cache-Control headers, or a
+    304 Not Modified if the request's If-None-Match matches. Errors are not cacheable."""
+    response = _json_response(payload, status)
+    if status != 200:
+        return response
+    response.add_etag()
+    response.cache_control.public = True
+    response.cache_control.max_age = _RESULT_MAX_AGE
+    return response.make_conditional(request)
+
+
+@app.route("/api/exact-decimal")
+def exact_decimal_api():
+    """GET counterpart of POST /exact-decimal, with query parameters instead of form fields, that
+    browsers and proxies can cache and revalidate."""
+    payload, status = exact_decimal_result(
+        request.args.get("decimal", "").strip(),
+        request.args.get("digits", "").strip(),
+        request.args.get("offset", "").strip(),
+        request.args.get("limit", "").strip(),
+    )
+    return _serialized("exact_decimal", payload, status, _cacheable)
+
+
+@app.route("/api/exact-decimal/digits")
+def exact_decimal_digits_api():
+    """Return a window of the significant digits of the exact decimal value of a float, for the "more digits" of
+    the exact decimal tool: query parameters 'decimal', 'start' (0-based, default 0) and 'count' (default 200)."""
+    return _cacheable(*exact_decimal_digits_result(
+        request.args.get("decimal", "").strip(),
+        request.args.get("start", "").strip(),
+        request.args.get("count", "").strip(),
+    ))
+
+
+def exact_decimal_digits_result(decimal_input: str, start_input: str = "", count_input: str = ""):
+    """Return the JSON payload of a window of exact decimal digits, and its HTTP status."""
+    if not decimal_input:
+        return {"error": "Please enter a decimal number"}, 400
+    try:
+        float_value = float(decimal_input)
+        start = int(start_input or "0")
+        count = int(count_input or str(_EXACT_DIGITS_PAGE_SIZE))
+    except ValueError:
+        return {"error": "Invalid number, start or count. Please enter valid numbers."}, 400
+    if not math.isfinite(float_value):
+        return {"error": "Please enter a finite number (not infinity or NaN)."}, 400
+    if start < 0:
+        return {"error": "start must be a non-negative integer"}, 400
+    if count < 0 or count > _EXACT_DIGITS_MAX_PAGE_SIZE:
+        return {"error": f"count must be between 0 and {_EXACT_DIGITS_MAX_PAGE_SIZE}"}, 400
+    digits, total, adjusted = exact_decimal_digits(float_to_uint64(float_value), start, count)
+    return {"input": decimal_input, "start": start, "digits": digits, "total": total, "exponent": adjusted}, 200
+
+
+@app.route("/api/segment")
+def segment_api():
+    """GET counterpart of POST /segment, with a query parameter instead of a form field, that
+    browsers and proxies can cache and revalidate."""
+    payload, status = segment_result(request.args.get("decimal", "").strip())
+    return _serialized("segment", payload, status, _cacheable)
+
+
+@app.route("/api/range")
+def float_range_api():
+    """Stream the k floats on either side of a value (and the value itself) as NDJSON, in ascending order.
+
+    Query parameters: 'decimal', 'k' (default 5), 'step' in floats (default 1) and 'exact' to add exact decimals.
+    Each line carries the 'offset' from the value in steps, the float 'fp' and its bit pattern 'hex'.
+    """
+    decimal_input = request.args.get("decimal", "").strip()
+    if not decimal_input:
+        return jsonify({"error": "Please enter a number"}), 400
+    try:
+        float_value = float(decimal_input)
+        k = int(request.args.get("k", "").strip() or _RANGE_DEFAULT_K)
+        step = int(request.args.get("step", "").strip() or "1")
+    except ValueError:
+        return jsonify({"error": "Invalid number, k or step. Please enter valid numbers."}), 400
+    if not math.isfinite(float_value):
+        return jsonify({"error": "Please enter a finite number (not infinity or NaN)."}), 400
+    if k < 0 or k > _RANGE_MAX_K:
+        return jsonify({"error": f"k must be between 0 and {_RANGE_MAX_K}"}), 400
+    if step < 1:
+        return jsonify({"error": "step must be a positive integer"}), 400
+    over_budget = _over_budget(2 * k + 1)
+    if over_budget:
+        return _json_response(*over_budget)
+    exact = request.args.get("exact", "").strip().lower() in ("1", "true", "yes")
+
+    ordinal = uint64_to_ordinal(float_to_uint64(float_value))
+    below = min(k, (ordinal + MAX_FINITE_ORDINAL) // step)
+    lowest = uint64_to_float(ordinal_to_uint64(ordinal - below * step))
+    floats = float_range(lowest, below + 1 + k, step, output="uint64")
+    if not exact:
+        def generate():
+            for offset, u in enumerate(floats, -below):
+                yield json.dumps({"offset": offset, "fp": uint64_to_float(u), "hex": f"0x{u:016x}"}) + "\n"
+
+        return Response(generate(), mimetype="application/x-ndjson")
+
+    # the exact decimals are the costly part: they are computed chunk by chunk like the other heavy calls (on the
+    # work pool in offload mode), all the chunks of the request within one time budget
+    deadline = time.monotonic() + app.config["TIME_BUDGET"]
+    chunks = iter(lambda: list(islice(floats, _RANGE_EXACT_CHUNK)), [])
+
+    def exact_chunk(patterns):
+        return patterns, _offload(_exact_decimals, patterns, timeout=deadline - time.monotonic())
+
+    try:
+        first = exact_chunk(next(chunks))
+    except (Overloaded, TimeBudgetExceeded) as exc:
+        return _json_response(*_unavailable(exc))
+
+    def generate_exact():
+        offset = -below
+        chunk = first
+        while True:
+            for u, exact_decimal in zip(*chunk):
+                yield json.dumps({"offset": offset, "fp": uint64_to_float(u), "hex": f"0x{u:016x}", "exact_decimal": exact_decimal}) + "\n"
+                offset += 1
+            patterns = next(chunks, None)
+            if patterns is None:
+                return
+            try:
+                chunk = exact_chunk(patterns)
+            except (Overloaded, TimeBudgetExceeded) as exc:
+                # the status is already sent: the stream ends with the error instead
+                yield json.dumps(_unavailable(exc)[0]) + "\n"
+                return
+
+    return Response(generate_exact(), mimetype="application/x-ndjson")
+
+
+def _exact_decimals(patterns: List[int]) -> List[str]:
+    """Return the exact decimal values of the floats with the given bit patterns, as strings."""
+    return [str(uint64_to_exact_decimal(u)) for u in patterns]
+
+
+@app.route("/api/cache-stats")
+def cache_stats():
+    """Return the hit, miss and eviction counters of the result caches, to size them."""
+    return jsonify({
+        "exact_decimal": _cache_stats(_exact_decimal_payload),
+        "segment": _cache_stats(_segment_payload),
     })
 
 
+def _field(item: dict, name: str) -> str:
+    """Return the named field of a batch item as the string a form field would carry."""
+    value = item.get(name)
+    return "" if value is None else str(value).strip()
+
+
+def _exact_decimal_item(item):
+    """Return the payload and status of one /api/exact-decimal/batch item, an object with 'decimal' and 'digits'
+    (and optionally 'offset' and 'limit')."""
+    if not isinstance(item, dict):
+        return {"error": "Each item must be an object with 'decimal' and 'digits'"}, 400
+    return exact_decimal_result(_field(item, "decimal"), _field(item, "digits"), _field(item, "offset"), _field(item, "limit"))
+
+
+def _segment_item(item):
+    """Return the payload and status of one /api/segment/batch item, a number, a string or an object with 'decimal'."""
+    if isinstance(item, dict):
+        return segment_result(_field(item, "decimal"))
+    if isinstance(item, (str, int, float)) and not isinstance(item, bool):
+        return segment_result(str(item).strip())
+    return {"error": "Each item must be a number, a string or an object with 'decimal'"}, 400
+
+
+def _batch_response(process_item) -> Response:
+    """Stream one NDJSON line per item of the request body, as soon as it is computed.
+
+    The body is read in chunks and never held whole (see batch.iter_items()), so memory stays bounded
+    whatever the number of items. Per-item errors are reported inline with the item's index and status.
+    """
+    def generate():
+        for position, item in enumerate(iter_items(request.stream)):
+            if isinstance(item, BatchItemError):
+                payload, status = {"error": str(item)}, 400
+            else:
+                payload, status = process_item(item)
+            line = {"index": position, "status": status, **payload}
+            yield json.dumps(line) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@app.route("/api/exact-decimal/batch", methods=["POST"])
+def exact_decimal_batch():
+    """Batch counterpart of POST /exact-decimal: a JSON array or NDJSON body of
+    {"decimal": ..., "digits": ...} objects, answered with one NDJSON line per item."""
+    return _batch_response(_exact_decimal_item)
+
+
+@app.route("/api/segment/batch", methods=["POST"])
+def segment_batch():
+    """Batch counterpart of POST /segment: a JSON array or NDJSON body of numbers (or {"decimal": ...} objects),
+    answered with one NDJSON line per item."""
+    return _batch_response(_segment_item)
+
+
+@app.route("/api/analyze", methods=["POST"])
+def analyze_api():
+    """Analyse an application/octet-stream body of packed little-endian doubles (or, byte for byte the same, their
+    uint64 bit patterns), read and analysed in chunks without any text conversion.
+
+    The response streams one 20-byte record per value (see bulk.RECORD and the X-Record-Layout header), or with
+    'format=ndjson' one line of columns per chunk. 'digits=0' skips the shortest-digit counts, the costly field.
+    """
+    if request.mimetype != "application/octet-stream":
+        return jsonify({"error": "The body must be application/octet-stream: packed little-endian float64 or uint64 values"}), 415
+    length = request.content_length
+    if length is None:
+        return jsonify({"error": "The Content-Length of the body is required"}), 411
+    if length % VALUE_SIZE:
+        return jsonify({"error": f"The body must be a whole number of {VALUE_SIZE}-byte values, not {length} bytes"}), 400
+    output = request.args.get("format", "").strip().lower() or "binary"
+    if output not in ("binary", "ndjson"):
+        return jsonify({"error": "format must be 'binary' or 'ndjson'"}), 400
+    digits = request.args.get("digits", "").strip().lower() not in ("0", "false", "no")
+    max_bytes = app.config["BULK_MAX_BYTES"]
+    if length > max_bytes:
+        return _json_response({"error": f"The body has {length} bytes, more than the limit of {max_bytes}",
+                               "reason": "body_too_large"}, 413)
+
+    if output == "binary":
+        def generate():
+            for values in iter_chunks(request.stream):
+                yield analyze_records(values, digits).tobytes()
+
+        response = Response(stream_with_context(generate()), mimetype="application/octet-stream")
+        response.content_length = length // VALUE_SIZE * RECORD.itemsize
+        response.headers["X-Record-Layout"] = RECORD_LAYOUT
+        return response
+
+    def generate_lines():
+        offset = 0
+        for values in iter_chunks(request.stream):
+            yield json.dumps({"offset": offset, "count": len(values), **to_columns(analyze_records(values, digits))}) + "\n"
+            offset += len(values)
+
+    return Response(stream_with_context(generate_lines()), mimetype="application/x-ndjson")
+
+
+@app.route("/metrics")
+def metrics():
+    """Export the request and stage metrics of this process in the Prometheus text format."""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
 @app.route("/notes")
 def notes():
-    """Serve the floating-point notes page."""
-    return render_template("notes.html", nav_active="notes")
+    """Serve the floating-point notes page, rendered from the Markdown notes on the server."""
+    return _static_page("notes.html", [_NOTES_PATH], nav_active="notes",
+                        notes_html=lambda: Markup(render_notes_or_fallback(_NOTES_PATH)), code_css=lambda: Markup(code_css()))
 
 
 @app.route("/notes/content")
 def notes_content():
-    """Serve the raw markdown notes file for client-side rendering."""
+    """Serve the raw Markdown notes file."""
     return send_from_directory(
         "docs",
         "floating-point-distribution-and-precision.md",
@@ -138,4 +705,4 @@ def notes_content():
 
 
 if __name__ == "__main__":
-    app.run(debug=True, host="0.0.0.0", port=8080)
+    app.run(debug=True, host="0.0.0.0", port=8080, threaded=True)
@@ -0,0 +1,180 @@
+"""Empirical decimal precision atlas: a parallel sweep of d-digit round-trip collisions, binade by binade
+
+For every binade (unbiased exponent e, -1023 for the subnormals) a stratified random sample of its floats is
+drawn, and for every number of digits d the d-digit decimals that map to each sampled float are listed with
+FP.get_d_digit_decimals(). A float with two or more of them is a collision: those decimals do not survive a
+round trip through the float. Binades are swept in parallel on a ProcessPoolExecutor.
+
+The atlas is an NDJSON file: a header line with the sweep parameters, then one record per (binade, d):
+
+    {"e": 52, "d": 16, "samples": 256, "collisions": 11, "witness": ["4503599627370497.0", "4503599627370497", "..."]}
+
+'witness' is the first sampled float with a collision and two of its d-digit decimals (null without collisions).
+The records of a binade are appended and flushed as soon as the binade is done, so the file is also the
+checkpoint: an interrupted sweep is resumed by running it again with the same parameters.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from fp import FP
+from fputil import DOUBLE_PRECISION_EXPONENT_BIAS, DOUBLE_PRECISION_FRACTION_BITS, SUBNORMAL_UNBIASED_EXP
+
+FORMAT = "fp-precision-atlas/1"
+SAMPLES = 256
+DIGITS = range(1, 18)
+EXPONENTS = range(SUBNORMAL_UNBIASED_EXP, DOUBLE_PRECISION_EXPONENT_BIAS + 1)
+
+
+def binade_uint64(e: int) -> range:
+    """Return the bit patterns of the positive floats with unbiased exponent 'e' (-1023: the subnormals, without zero)
+    """
+    if not SUBNORMAL_UNBIASED_EXP <= e <= DOUBLE_PRECISION_EXPONENT_BIAS:
+        raise ValueError(f"Unbiased exponent {e} out of the range of finite double-precision floating-point numbers")
+    first = (e + DOUBLE_PRECISION_EXPONENT_BIAS) << DOUBLE_PRECISION_FRACTION_BITS
+    return range(max(first, 1), first + (1 << DOUBLE_PRECISION_FRACTION_BITS))
+
+
+def sample_binade(e: int, samples: int, seed: int) -> List[int]:
+    """Return a stratified random sample of the bit patterns of binade 'e', in ascending order
+
+    The binade is split into 'samples' strata of consecutive floats and one float is drawn in each, so the
+    sample covers the whole binade. A binade with at most 'samples' floats is returned whole. The sample only
+    depends on (e, samples, seed), so a resumed sweep draws the same floats.
+    """
+    floats = binade_uint64(e)
+    if len(floats) <= samples:
+        return list(floats)
+    rng = random.Random(f"{seed}:{e}")
+    bounds = [len(floats) * i // samples for i in range(samples + 1)]
+    return [floats[lo + rng.randrange(hi - lo)] for lo, hi in zip(bounds, bounds[1:])]
+
+
+def sweep_binade(e: int, digits: Iterable[int], samples: int, seed: int) -> List[dict]:
+    """Return the atlas records of binade 'e', one per number of digits in 'digits'
+    """
+    digits = list(digits)
+    collisions = {d: 0 for d in digits}
+    witnesses: Dict[int, Optional[list]] = {d: None for d in digits}
+    sample = sample_binade(e, samples, seed)
+    for u in sample:
+        fp = FP.from_uint64(u)
+        for d in digits:
+            count, _, decimals = fp.get_d_digit_decimals(d, limit=2)
+            if count > 1:
+                collisions[d] += 1
+                if witnesses[d] is None:
+                    witnesses[d] = [repr(fp.fp)] + [str(decimal) for decimal in decimals]
+    return [{"e": e, "d": d, "samples": len(sample), "collisions": collisions[d], "witness": witnesses[d]} for d in digits]
+
+
+def _header(digits: Iterable[int], samples: int, seed: int) -> dict:
+    return {"format": FORMAT, "digits": list(digits), "samples": samples, "seed": seed}
+
+
+def load_atlas(path: str) -> Tuple[Optional[dict], Dict[Tuple[int, int], dict]]:
+    """Return the header and the records, keyed by (e, d), of the atlas file at 'path' ((None, {}) if it does not exist)
+
+    A partly written last line, left by an interrupted sweep, is ignored.
+    """
+    if not os.path.exists(path):
+        return (None, {})
+    header, records = None, {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if header is None:
+                if record.get("format") != FORMAT:
+                    raise ValueError(f"{path} is not a precision atlas")
+                header = record
+            else:
+                records[(record["e"], record["d"])] = record
+    return (header, records)
+
+
+def _drop_partial_line(path: str) -> None:
+    """Truncate the atlas at 'path' after its last complete line, so that records can be appended to it"""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+
+
+def sweep(path: str, exponents: Iterable[int] = EXPONENTS, digits: Iterable[int] = DIGITS, samples: int = SAMPLES,
+          seed: int = 0, workers: Optional[int] = None,
+          progress: Optional[Callable[[int, int, float], None]] = None) -> Dict[Tuple[int, int], dict]:
+    """Sweep the binades 'exponents' for collisions of 'digits'-digit decimals and append the records to the atlas at 'path'
+
+    Binades whose records are all in the atlas already are skipped, so an interrupted sweep resumes where it stopped;
+    the atlas must have been started with the same 'digits', 'samples' and 'seed'. The binades are swept on a pool
+    of 'workers' processes (os.cpu_count() by default) and 'progress(done, total, elapsed_seconds)' is called after
+    each one. Return all the records of the atlas, keyed by (e, d).
+    """
+    digits = list(digits)
+    if not digits or min(digits) < 1:
+        raise ValueError("Number of digits must be a positive integer")
+    if samples < 1:
+        raise ValueError("samples must be a positive integer")
+    header, records = load_atlas(path)
+    if header is not None and header != _header(digits, samples, seed):
+        raise ValueError(f"{path} was started with different parameters: {header}")
+
+    _drop_partial_line(path)
+    pending = [e for e in exponents if any((e, d) not in records for d in digits)]
+    total, start = len(pending), time.monotonic()
+    with open(path, "a", encoding="utf-8") as f:
+        if header is None:
+            f.write(json.dumps(_header(digits, samples, seed)) + "\n")
+            f.flush()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(sweep_binade, e, digits, samples, seed) for e in pending]
+            for done, future in enumerate(as_completed(futures), 1):
+                binade = future.result()
+                f.write("".join(json.dumps(record) + "\n" for record in binade))
+                f.flush()
+                records.update(((record["e"], record["d"]), record) for record in binade)
+                if progress is not None:
+                    progress(done, total, time.monotonic() - start)
+    return records
+
+
+def print_progress(done: int, total: int, elapsed: float) -> None:
+    """Progress report for sweep(): binades done, rate and estimated time left, on stderr"""
+    eta = elapsed / done * (total - done)
+    print(f"\r{done}/{total} binades, {done / elapsed:.2f} binades/s, {eta:.0f} s left", end="\n" if done == total else "",
+          file=sys.stderr, flush=True)
+
+
+def _int_range(text: str) -> range:
+    """Parse 'a:b' (inclusive) or 'a' into a range"""
+    first, _, last = text.partition(":")
+    return range(int(first), int(last or first) + 1)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point: sweep (or resume) the atlas file given in 'argv' (sys.argv[1:] by default)"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("atlas", help="atlas file (NDJSON), created or resumed")
+    parser.add_argument("--exponents", type=_int_range, default=EXPONENTS, help="unbiased exponents, e.g. -1023:1023")
+    parser.add_argument("--digits", type=_int_range, default=DIGITS, help="numbers of digits, e.g. 1:17")
+    parser.add_argument("--samples", type=int, default=SAMPLES, help="floats sampled per binade")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: number of CPUs)")
+    args = parser.parse_args(argv)
+    sweep(args.atlas, args.exponents, args.digits, args.samples, args.seed, args.workers, print_progress)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from atlas import binade_uint64, load_atlas, sample_binade, sweep, sweep_binade
+from fp import segment_precision
+from fputil import uint64_to_float
+
+
+def test_binade_uint64():
+    assert uint64_to_float(binade_uint64(0)[0]) == 1.0
+    assert uint64_to_float(binade_uint64(0)[-1]) == 2.0 - 2.0**-52
+    assert uint64_to_float(binade_uint64(-1023)[0]) == 5e-324
+    assert len(binade_uint64(-1023)) == 2**52 - 1
+    with pytest.raises(ValueError):
+        binade_uint64(1024)
+
+
+def test_sample_binade_is_stratified_and_reproducible():
+    sample = sample_binade(10, 100, seed=1)
+    assert sample == sample_binade(10, 100, seed=1)
+    assert sample != sample_binade(10, 100, seed=2)
+    assert sample == sorted(sample) and len(set(sample)) == 100
+    floats = binade_uint64(10)
+    for i, u in enumerate(sample):
+        assert floats.start + len(floats) * i // 100 <= u < floats.start + len(floats) * (i + 1) // 100
+
+
+def test_sweep_binade_agrees_with_segment_precision():
+    for e in (-1023, -1022, 0, 52, 53, 56, 1023):
+        records = sweep_binade(e, range(1, 18), 32, seed=0)
+        assert [r["d"] for r in records] == list(range(1, 18))
+        for r in records:
+            if r["d"] <= segment_precision(e):
+                assert r["collisions"] == 0 and r["witness"] is None
+            if r["witness"] is not None:
+                f, x, y = r["witness"]
+                assert x != y and float(x) == float(y) == float(f)
+
+
+def test_sweep_writes_and_resumes(tmp_path):
+    path = str(tmp_path / "atlas.ndjson")
+    calls = []
+    records = sweep(path, range(50, 53), range(15, 17), samples=16, workers=2, progress=lambda *args: calls.append(args))
+    assert set(records) == {(e, d) for e in range(50, 53) for d in (15, 16)}
+    assert [call[:2] for call in calls] == [(1, 3), (2, 3), (3, 3)]
+    assert load_atlas(path)[1] == records
+
+    # an interrupted sweep: a binade missing and a partly written line
+    with open(path, encoding="utf-8") as f:
+        lines = [line for line in f if '"e": 52' not in line]
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+        f.write('{"e": 52, "d": 1')
+    calls.clear()
+    resumed = sweep(path, range(50, 54), range(15, 17), samples=16, workers=2, progress=lambda *args: calls.append(args))
+    assert [call[:2] for call in calls] == [(1, 2), (2, 2)]
+    assert {key: value for key, value in resumed.items() if key[0] < 53} == records
+    assert load_atlas(path)[1] == resumed
+    assert json.loads(open(path, encoding="utf-8").readline())["samples"] == 16
+
+
+def test_sweep_rejects_other_parameters(tmp_path):
+    path = str(tmp_path / "atlas.ndjson")
+    sweep(path, [0], [1], samples=4, workers=1)
+    with pytest.raises(ValueError):
+        sweep(path, [0], [1], samples=8, workers=1)
+    with pytest.raises(ValueError):
+        sweep(path, [0], [0], samples=4, workers=1)
@@ -0,0 +1,147 @@
+"""Incremental readers for the bodies of the batch endpoints: a JSON array or NDJSON (one JSON value per line)
+
+The body is read in fixed-size chunks and each item is yielded as soon as it is complete, so the memory used
+does not depend on the number of items, only on the size of the largest one.
+"""
+
+import codecs
+import json
+from itertools import chain
+from typing import BinaryIO, Iterable, Iterator
+
+CHUNK_SIZE = 64 * 1024
+MAX_ITEM_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\r\n"
+
+
+class BatchItemError(ValueError):
+    """An item of a batch body that could not be parsed
+
+    It is yielded in place of the item rather than raised, so that the error can be reported inline.
+    """
+
+
+def iter_items(stream: BinaryIO, chunk_size: int = CHUNK_SIZE, max_item_size: int = MAX_ITEM_SIZE) -> Iterator[object]:
+    """Return a generator of the items of a batch body, read from 'stream' in chunks of 'chunk_size' bytes
+
+    A body whose first non-blank character is '[' is a JSON array, anything else is NDJSON. Items that cannot
+    be parsed, or that are longer than 'max_item_size' characters, are yielded as BatchItemError. An NDJSON
+    body resumes with the next line; a JSON array cannot be resynchronised and ends at its first error.
+    """
+    chunks = _iter_text_chunks(stream, chunk_size)
+    head = ""
+    for chunk in chunks:
+        head += chunk
+        if head.strip(_WHITESPACE):
+            break
+    if not head.strip(_WHITESPACE):
+        return
+    body = chain([head], chunks)
+    if head.lstrip(_WHITESPACE).startswith("["):
+        yield from _iter_json_array(body, max_item_size)
+    else:
+        yield from _iter_ndjson(body, max_item_size)
+
+
+def _iter_text_chunks(stream: BinaryIO, chunk_size: int) -> Iterator[str]:
+    """Return a generator of the UTF-8 decoded chunks of 'stream', never splitting a multi-byte character"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        text = decoder.decode(data)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _parse_item(text: str) -> object:
+    """Return the JSON value in 'text', or a BatchItemError"""
+    try:
+        return json.loads(text)
+    except ValueError as exc:
+        return BatchItemError(f"Invalid JSON item: {exc}")
+
+
+def _iter_ndjson(chunks: Iterable[str], max_item_size: int) -> Iterator[object]:
+    """Return a generator of the items of an NDJSON body, skipping blank lines"""
+    buffer = ""
+    skipping = False
+    for chunk in chunks:
+        if skipping:
+            # discard the rest of an oversized line
+            newline = chunk.find("\n")
+            if newline < 0:
+                continue
+            chunk, skipping = chunk[newline + 1:], False
+        buffer += chunk
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if line.strip(_WHITESPACE):
+                yield _parse_item(line)
+        if len(buffer) > max_item_size:
+            yield BatchItemError(f"Item longer than {max_item_size} characters")
+            buffer, skipping = "", True
+    if buffer.strip(_WHITESPACE) and not skipping:
+        yield _parse_item(buffer)
+
+
+def _iter_json_array(chunks: Iterable[str], max_item_size: int) -> Iterator[object]:
+    """Return a generator of the items of a JSON array body, decoding one item at a time from a sliding buffer"""
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    buffer, pos, eof = "", 0, False
+    # 'open': expecting '['; 'first': a value or ']'; 'value': a value; 'separator': ',' or ']'
+    state = "open"
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                yield BatchItemError("Unterminated JSON array")
+                return
+            buffer, pos, eof = _refill(buffer, pos, chunks)
+            continue
+
+        char = buffer[pos]
+        if state == "open":
+            # iter_items() only dispatches bodies starting with '['
+            pos, state = pos + 1, "first"
+        elif char == "]" and state in ("first", "separator"):
+            return
+        elif state == "separator":
+            if char != ",":
+                yield BatchItemError("Expected ',' or ']' between the items of the JSON array")
+                return
+            pos, state = pos + 1, "value"
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as exc:
+                if eof or len(buffer) - pos > max_item_size:
+                    yield BatchItemError(f"Invalid JSON item: {exc}" if eof else f"Item longer than {max_item_size} characters")
+                    return
+                # most likely an item split across chunks
+                buffer, pos, eof = _refill(buffer, pos, chunks)
+                continue
+            if end - pos > max_item_size:
+                yield BatchItemError(f"Item longer than {max_item_size} characters")
+                return
+            if not eof and len(buffer) - pos <= max_item_size and (end == len(buffer) or buffer[end] not in _WHITESPACE + ",]"):
+                # a number cut by the end of the chunk ('1e' of '1e-310') decodes, but is not followed by a separator
+                buffer, pos, eof = _refill(buffer, pos, chunks)
+                continue
+            yield item
+            pos, state = end, "separator"
+
+
+def _refill(buffer: str, pos: int, chunks: Iterator[str]):
+    """Drop the consumed part of 'buffer' and append the next chunk; return (buffer, pos, eof)"""
+    chunk = next(chunks, None)
+    if chunk is None:
+        return buffer[pos:], 0, True
+    return buffer[pos:] + chunk, 0, False
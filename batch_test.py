@@ -0,0 +1,52 @@
+import io
+import json
+
+import pytest
+
+from batch import BatchItemError, iter_items
+
+ITEMS = [{"decimal": "0.1", "digits": 5}, 1e-310, "72057594037927945", [1, 2], None, True, -0.0, "é"]
+
+
+def items(body: str, chunk_size: int = 7, max_item_size: int = 64):
+    return list(iter_items(io.BytesIO(body.encode()), chunk_size, max_item_size))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 4096])
+def test_json_array(chunk_size):
+    assert items(json.dumps(ITEMS), chunk_size) == ITEMS
+    assert items("  \n [ 1 , 23 ,\n456 ]  ", chunk_size) == [1, 23, 456]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 4096])
+def test_ndjson(chunk_size):
+    body = "\n".join(json.dumps(item) for item in ITEMS)
+    assert items(body, chunk_size) == ITEMS
+    assert items(body + "\n\n", chunk_size) == ITEMS
+    assert items("1\r\n\r\n23\n456", chunk_size) == [1, 23, 456]
+
+
+def test_empty_bodies():
+    assert items("") == []
+    assert items(" \n ") == []
+    assert items("[]") == []
+    assert items(" [ ] ") == []
+
+
+def test_ndjson_errors_are_inline():
+    result = items('1\n{"decimal": \n3\n' + "9" * 100 + "\n4")
+    assert result[0] == 1
+    assert isinstance(result[1], BatchItemError)
+    assert result[2] == 3
+    assert isinstance(result[3], BatchItemError) and "longer" in str(result[3])
+    assert result[4] == 4
+
+
+@pytest.mark.parametrize(
+    "body,expected",
+    [("[1, 2", [1, 2]), ("[1 2]", [1]), ("[1, oops, 3]", [1]), ("[1,]", [1]), ("[1} " + "2, " * 100 + "3]", [1]), ("[1, " + "9" * 100 + ", 3]", [1])]
+)
+def test_json_array_errors_end_the_array(body, expected):
+    result = items(body)
+    assert result[:-1] == expected
+    assert isinstance(result[-1], BatchItemError)
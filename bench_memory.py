@@ -0,0 +1,158 @@
+"""Memory and startup measurements that the timed cases of bench_suite.py cannot express
+
+    python bench_memory.py                    # every measurement
+    python bench_memory.py objects cold_start # only the named ones
+    python bench_memory.py --objects 100000   # fewer FP objects
+
+'objects' builds consecutive FP and CompactFP objects and reports their bytes per object and construction time.
+'segment_table' builds the memoised segment table of all the exponents and reports its build time and size.
+'cold_start' starts fresh worker processes that look up every segment, with the table computed in the process and
+memory-mapped from a segments.bin file, and reports the time of the lookups, the Python heap they retain and the
+growth of the private (not shared with other processes) resident set, which needs /proc/self/statm (Linux).
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from decimal import ROUND_HALF_UP, Context
+from typing import Callable, Dict, List, Optional
+
+from fp import FP, CompactFP, get_segments, next_n_binary_fp, segment_table_clear
+from fputil import DOUBLE_PRECISION_EXPONENT_BIAS, SUBNORMAL_UNBIASED_EXP
+from segment_table import build_segment_table
+
+DEFAULT_OBJECTS = 1_000_000
+DEFAULT_RUNS = 5
+
+_SEGMENT_CTX = Context(prec=400, rounding=ROUND_HALF_UP)
+
+# cold start of a worker process: import fp, then compute or map the whole segment table and look up every segment.
+# With "time" prints the time of the lookups, otherwise the Python heap they retain and the growth of the private
+# resident set
+_COLD_START = """
+import sys, time, tracemalloc
+from decimal import ROUND_HALF_UP, Context
+import fp, segment_table
+def private_rss():
+    with open("/proc/self/statm") as f:
+        resident, shared = map(int, f.read().split()[1:3])
+    return (resident - shared) * 4096
+before = private_rss()
+if sys.argv[1] != "time":
+    tracemalloc.start()
+start = time.perf_counter()
+if len(sys.argv) > 2:
+    fp.use_segment_table(segment_table.SegmentTable.open(sys.argv[2]))
+fp.get_segments(-1023, 1024, Context(prec=400, rounding=ROUND_HALF_UP))
+elapsed = time.perf_counter() - start
+if sys.argv[1] == "time":
+    print(elapsed)
+else:
+    print(tracemalloc.get_traced_memory()[0], private_rss() - before)
+"""
+
+
+def object_memory(n: int = DEFAULT_OBJECTS) -> Dict[str, dict]:
+    """Return, for FP and CompactFP, the bytes per object and the construction time of n consecutive objects"""
+    results = {}
+    for cls in (FP, CompactFP):
+        start = time.perf_counter()
+        fps = next_n_binary_fp(cls.from_float(1.0), n)
+        elapsed = time.perf_counter() - start
+        del fps
+
+        tracemalloc.start()
+        fps = next_n_binary_fp(cls.from_float(1.0), n)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del fps
+        results[cls.__name__] = {"bytes_per_object": size / n, "seconds": elapsed, "ns_per_object": elapsed / n * 1e9}
+    return results
+
+
+def segment_table_memory() -> dict:
+    """Return the build time and size of the memoised segment table of all the exponents, built from scratch"""
+    exponents = range(SUBNORMAL_UNBIASED_EXP, DOUBLE_PRECISION_EXPONENT_BIAS + 1)
+    segment_table_clear()
+    tracemalloc.start()
+    start = time.perf_counter()
+    get_segments(exponents.start, exponents.stop, _SEGMENT_CTX)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"segments": len(exponents), "seconds": elapsed, "bytes": size, "bytes_per_segment": size / len(exponents)}
+
+
+def cold_start(runs: int = DEFAULT_RUNS) -> Dict[str, dict]:
+    """Return, with the segment table computed in each process and memory-mapped from a file, the fastest of 'runs'
+    cold starts and the heap and private resident set growth of a worker process; Linux only"""
+    def run(*args: str) -> List[str]:
+        return subprocess.run([sys.executable, "-c", _COLD_START, *args], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "segments.bin")
+        start = time.perf_counter()
+        build_segment_table(path)
+        results["build"] = {"seconds": time.perf_counter() - start, "bytes": os.path.getsize(path)}
+        for label, args in (("computed", []), ("mapped", [path])):
+            elapsed = min(float(run("time", *args)[0]) for _ in range(runs))
+            retained, rss = map(int, run("memory", *args))
+            results[label] = {"seconds": elapsed, "heap_bytes": retained, "private_rss_bytes": rss}
+    return results
+
+
+def _print_objects(n: int, _runs: int) -> None:
+    print(f"{n} consecutive floats from 1.0")
+    for name, r in object_memory(n).items():
+        print(f"  {name:<10} {r['bytes_per_object']:>8.1f} bytes/object {r['seconds']:>8.2f} s to build "
+              f"{r['ns_per_object']:>10.1f} ns/object")
+
+
+def _print_segment_table(_n: int, _runs: int) -> None:
+    r = segment_table_memory()
+    print(f"whole segment table ({r['segments']} exponents, prec {_SEGMENT_CTX.prec}): {r['seconds'] * 1e3:.1f} ms to "
+          f"build, {r['bytes'] / 1024:.0f} KiB, {r['bytes_per_segment']:.0f} bytes/segment")
+
+
+def _print_cold_start(_n: int, runs: int) -> None:
+    results = cold_start(runs)
+    build = results.pop("build")
+    print(f"build_segment_table: {build['seconds'] * 1e3:.1f} ms, {build['bytes'] / 1024:.0f} KiB file")
+    print(f"cold start, best of {runs} processes{'':8}  lookups   heap retained   private RSS growth")
+    for label, r in (("computed in each process", results["computed"]), ("memory-mapped segments.bin", results["mapped"])):
+        print(f"  {label:<40} {r['seconds'] * 1e3:>7.1f} ms {r['heap_bytes'] / 1024:>10.0f} KiB "
+              f"{r['private_rss_bytes'] / 1024:>14.0f} KiB")
+
+
+MEASUREMENTS: Dict[str, Callable[[int, int], None]] = {
+    "objects": _print_objects,
+    "segment_table": _print_segment_table,
+    "cold_start": _print_cold_start,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point: print the named measurements, or all of them"""
+    parser = argparse.ArgumentParser(description="Measure the memory and startup costs of FP objects and segment tables")
+    parser.add_argument("measurements", nargs="*", metavar="MEASUREMENT",
+                        help=f"one of {', '.join(MEASUREMENTS)} (default: all)")
+    parser.add_argument("--objects", type=int, default=DEFAULT_OBJECTS, help="FP objects built by 'objects'")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="processes started by 'cold_start'; the fastest counts")
+    args = parser.parse_args(argv)
+    if args.objects < 1 or args.runs < 1:
+        parser.error("--objects and --runs must be positive")
+    unknown = [name for name in args.measurements if name not in MEASUREMENTS]
+    if unknown:
+        parser.error(f"unknown measurement {', '.join(unknown)}; choose from {', '.join(MEASUREMENTS)}")
+    for name in args.measurements or MEASUREMENTS:
+        MEASUREMENTS[name](args.objects, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import sys
+
+import pytest
+
+from bench_memory import cold_start, main, object_memory, segment_table_memory
+
+
+def test_object_memory():
+    results = object_memory(1000)
+    assert list(results) == ["FP", "CompactFP"]
+    assert results["CompactFP"]["bytes_per_object"] < results["FP"]["bytes_per_object"]
+    assert all(r["seconds"] > 0 and r["ns_per_object"] > 0 for r in results.values())
+
+
+def test_segment_table_memory():
+    results = segment_table_memory()
+    assert results["segments"] == 2047 and results["bytes"] > 0 and results["seconds"] > 0
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc/self/statm")
+def test_cold_start():
+    results = cold_start(runs=1)
+    assert set(results) == {"build", "computed", "mapped"} and results["build"]["bytes"] > 0
+    assert results["mapped"]["heap_bytes"] < results["computed"]["heap_bytes"]
+
+
+def test_main(capsys):
+    main(["objects", "segment_table", "--objects", "100"])
+    out = capsys.readouterr().out
+    assert "100 consecutive floats" in out and "bytes/object" in out and "whole segment table" in out
+    with pytest.raises(SystemExit):
+        main(["nosuchmeasurement"])
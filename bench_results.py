@@ -0,0 +1,36 @@
+"""Environment and JSON files of the benchmark reports, shared by bench_suite.py and loadtest.py without the imports
+of either (numpy, the atlas, the app)
+"""
+
+import json
+import os
+import platform
+import subprocess
+
+import fp
+
+
+def environment() -> dict:
+    """Return what the timings depend on besides the code: interpreter, machine and segment table file"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10,
+                                check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):  # no git, or not a git checkout
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "segment_table_file": fp.get_segment_table() is not None,
+        "commit": commit,
+    }
+
+
+def save_results(document: dict, path: str) -> None:
+    """Write a report document to 'path' as indented JSON"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=1)
+        f.write("\n")
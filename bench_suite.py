@@ -0,0 +1,373 @@
+"""Reproducible benchmark suite of the hot paths of fp.py, fputil.py, fparray.py, exhaustive.py, metrics.py and app.py,
+with JSON baselines
+
+    python bench_suite.py                                  # run every case and print the results
+    python bench_suite.py --save baseline.json             # run and save the results as a baseline
+    python bench_suite.py --compare baseline.json          # run and exit with status 1 if a case regressed
+    python bench_suite.py --compare baseline.json --threshold 0.1 --filter from_float
+
+Every case has a stable name '<path>/<input>' and runs a fixed call on a fixed input: tiny, subnormal, huge and
+normal floats, at and next to powers of two and ten, and arrays tiled from them. No randomness, network or files
+are involved. A case is timed
+as the minimum over 'repeat' runs of a loop calibrated to last at least 'min_time' seconds, with the garbage
+collector off; the minimum is the least noisy estimate of the cost of a call on an idle machine. The runs are
+interleaved: each round runs every case once.
+
+On a shared or throttled machine the speed of the whole machine drifts by tens of percent within seconds, so
+the minimum alone is not comparable across runs. Each run is therefore also timed against a fixed pure-Python
+reference loop run next to it, and the median of these ratios, the 'relative' cost, is what comparisons use: a
+case regressed when its relative cost exceeds its baseline by more than the threshold (25% by default). Compare
+against a baseline saved on the same machine and interpreter: the environment of both runs is saved with the
+results and a mismatch is reported.
+"""
+
+import argparse
+import json
+import math
+import statistics
+import sys
+import time
+import timeit
+from decimal import ROUND_HALF_UP, Context, Decimal
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import fparray
+from atlas import DIGITS, sweep_binade
+from bench_results import environment, save_results
+from exhaustive import analyze_range
+from fp import (FP, CompactFP, Segment, float_after, float_range, float_range_array, find_precision_collision,
+                identify_surrounding_powers_of_2_and_10, segment_precision)
+from fputil import (FLOAT32, exact_decimal_digits, float_to_uint64, next_binary_fp, next_uint64_fp, uint64_to_bits,
+                    uint64_to_exact_decimal)
+from metrics import Histogram, Registry, span
+
+VERSION = 1
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_REPEAT = 5
+DEFAULT_MIN_TIME = 0.05
+
+# representative inputs: the ends of the double range, the subnormals, and values at and next to powers of 2 and 10
+INPUTS: Dict[str, float] = {
+    "tiny": 5e-324,
+    "subnormal": 1e-310,
+    "min_normal": 2.2250738585072014e-308,
+    "one": 1.0,
+    "pow2": 2.0 ** 52,
+    "below_pow2": math.nextafter(2.0 ** 52, 0),
+    "pow10": 1e22,
+    "near_pow10": 0.1,
+    "huge": 1.7976931348623157e308,
+}
+# inputs of the d-digit decimal cases, for d = 1 to 20, and the page size of the app
+D_DIGIT_INPUTS = ("tiny", "near_pow10", "huge")
+D_DIGIT_LIMIT = 100
+# unbiased exponents of the segment cases: the subnormals, both ends and the middle of the range
+SEGMENT_EXPONENTS = (-1023, -1022, -500, -52, 0, 52, 500, 1023)
+# length of the walks of consecutive floats and of the array cases (the inputs above, tiled)
+RANGE_COUNT = 1000
+ARRAY_TILES = 512
+# float32 bit patterns of the exhaustive analysis case: the first 4096 numbers of the binade [1, 2)
+EXHAUSTIVE_START, EXHAUSTIVE_COUNT = 0x3F800000, 4096
+
+_SEGMENT_CTX = Context(prec=400, rounding=ROUND_HALF_UP)
+
+# a comparison row: case name, baseline and current ns per call, change of the relative cost (a fraction; None when
+# the case is absent from either run) and status
+Comparison = Tuple[str, Optional[float], Optional[float], Optional[float], str]
+
+
+def cases() -> Dict[str, Callable[[], object]]:
+    """Return the benchmark cases by name, in a stable order"""
+    values = np.tile(np.array(list(INPUTS.values())), ARRAY_TILES)
+    return {**_fp_cases(), **_scalar_cases(), **_array_cases(values), **_metrics_cases(), **_app_cases(values)}
+
+
+def _fp_cases() -> Dict[str, Callable[[], object]]:
+    """Return the cases of the FP objects, their d-digit decimals and the segments"""
+    suite: Dict[str, Callable[[], object]] = {}
+    bits = {label: uint64_to_bits(float_to_uint64(x)) for label, x in INPUTS.items()}
+    for label, x in INPUTS.items():
+        suite[f"from_float/{label}"] = lambda x=x: FP.from_float(x)
+    for label in INPUTS:
+        suite[f"from_binary/{label}"] = lambda b=bits[label]: FP.from_binary(b)
+    # the next float by its bit pattern as a string and as an integer, and the next FP object built from either
+    for label, x in INPUTS.items():
+        if label != "huge":  # the next float would be infinity
+            value, compact = FP.from_float(x), CompactFP.from_float(x)
+            suite[f"next_binary_fp/{label}"] = lambda b=bits[label]: next_binary_fp(b)
+            suite[f"next_uint64_fp/{label}"] = lambda u=float_to_uint64(x): next_uint64_fp(u)
+            suite[f"next_fp_from_binary/{label}"] = lambda b=bits[label]: FP.from_binary(next_binary_fp(b))
+            suite[f"next_fp/{label}"] = value.next
+            suite[f"next_compact_fp/{label}"] = compact.next
+    for label in D_DIGIT_INPUTS:
+        value = FP.from_float(INPUTS[label])
+        for d in range(1, 21):
+            suite[f"get_d_digit_decimals/{label}/d={d:02}"] = lambda v=value, d=d: v.get_d_digit_decimals(d, 0, D_DIGIT_LIMIT)
+    for e in SEGMENT_EXPONENTS:
+        suite[f"segment_from_exponent/e={e}"] = lambda e=e: Segment.from_exponent(e, _SEGMENT_CTX)
+    for e in SEGMENT_EXPONENTS:
+        # the segment computed from scratch, as on the first lookup without a segment table file
+        suite[f"segment_compute/e={e}"] = lambda e=e: Segment.compute(e, _SEGMENT_CTX.prec, _SEGMENT_CTX.rounding)
+    return suite
+
+
+def _scalar_cases() -> Dict[str, Callable[[], object]]:
+    """Return the cases of the scalar functions on floats, bit patterns and exponents"""
+    suite: Dict[str, Callable[[], object]] = {}
+    for label, x in INPUTS.items():
+        u = float_to_uint64(x)
+        suite[f"exact_decimal/{label}"] = lambda u=u: uint64_to_exact_decimal(u)
+        suite[f"exact_decimal_digits/{label}"] = lambda u=u: exact_decimal_digits(u, 0, 64)
+    for label, x in INPUTS.items():
+        suite[f"compact_fp/{label}"] = lambda x=x: CompactFP.from_float(x)
+    for label, x in INPUTS.items():
+        suite[f"significant_digits/{label}"] = lambda text=repr(x): FP.get_number_significant_digits(text)
+    decimals = [repr(x) for x in INPUTS.values()] * ARRAY_TILES
+    suite[f"significant_digits_batch/n={len(decimals)}"] = lambda: FP.get_numbers_significant_digits(decimals)
+    for label, x in INPUTS.items():
+        suite[f"surrounding_powers/{label}"] = lambda x=x: identify_surrounding_powers_of_2_and_10(x)
+    for label, x in INPUTS.items():
+        suite[f"float_after/{label}"] = lambda x=x: float_after(x, -1000)
+    suite[f"float_range/float/n={RANGE_COUNT}"] = lambda: _consume(float_range(1.0, RANGE_COUNT))
+    suite[f"float_range/decimal/n={RANGE_COUNT}"] = lambda: _consume(float_range(1.0, RANGE_COUNT, output="decimal"))
+    suite[f"float_range_array/n={RANGE_COUNT}"] = lambda: float_range_array(1.0, RANGE_COUNT)
+    for e in SEGMENT_EXPONENTS:
+        # the exact guaranteed precision, with its memo cleared before each call
+        suite[f"segment_precision/e={e}"] = lambda e=e: (segment_precision.cache_clear(), segment_precision(e))
+    one, two = Decimal(1), Decimal(2)
+    for d in (15, 16, 17):
+        suite[f"find_precision_collision/[1, 2]/d={d}"] = lambda d=d: find_precision_collision(one, two, d)
+    return suite
+
+
+def _array_cases(values: np.ndarray) -> Dict[str, Callable[[], object]]:
+    """Return the cases of the vectorised analyses of the array 'values' and of float32 bit patterns, and the atlas"""
+    suite: Dict[str, Callable[[], object]] = {}
+    suite[f"fparray_analyze/n={values.size}"] = lambda: fparray.analyze(values)
+    # the same columns from the scalar objects, the way they were computed before fparray
+    suite[f"from_float_loop/n={values.size}"] = lambda: _from_float_loop(values)
+    suite[f"fparray_surrounding_powers/n={values.size}"] = lambda: fparray.surrounding_powers(values)
+    suite[f"exhaustive_analyze_range/float32/n={EXHAUSTIVE_COUNT}"] = \
+        lambda: analyze_range(FLOAT32, EXHAUSTIVE_START, EXHAUSTIVE_START + EXHAUSTIVE_COUNT)
+    for e in (-1023, 0):
+        suite[f"atlas_sweep_binade/e={e}"] = lambda e=e: sweep_binade(e, DIGITS, 4, 0)
+    return suite
+
+
+def _metrics_cases() -> Dict[str, Callable[[], object]]:
+    """Return the cases of the instrumentation: a histogram observation and an empty timing span"""
+    histogram = Histogram("bench_seconds", "Benchmark", ["stage", "digits", "exponent"], registry=Registry())
+    labels = {"stage": "parse", "digits": "17", "exponent": "0..255"}
+
+    def empty_span() -> None:
+        with span(histogram, **labels):
+            pass
+
+    return {"metrics/observe": lambda: histogram.observe(1e-4, **labels), "metrics/span": empty_span}
+
+
+def _app_cases(values: np.ndarray) -> Dict[str, Callable[[], object]]:
+    """Return the cases of the routes of app.py through the Flask test client; the packed doubles are 'values'"""
+    from app import _exact_decimal_payload, _segment_payload, app
+
+    suite: Dict[str, Callable[[], object]] = {}
+    client = app.test_client()
+
+    def post(path: str, form: dict, cached_function=None) -> None:
+        if cached_function is not None:
+            cached_function.cache_clear()
+        response = client.post(path, data=form)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    # each route with its result cache cleared before each request, so that the result is computed, and once cached
+    for label, x in INPUTS.items():
+        form = {"decimal": repr(x), "digits": "17"}
+        suite[f"post_exact_decimal/{label}"] = lambda form=form: post("/exact-decimal", form, _exact_decimal_payload)
+    suite["post_exact_decimal/cached"] = lambda: post("/exact-decimal", {"decimal": "0.1", "digits": "17"})
+    for label, x in INPUTS.items():
+        form = {"decimal": repr(x)}
+        suite[f"post_segment/{label}"] = lambda form=form: post("/segment", form, _segment_payload)
+    suite["post_segment/cached"] = lambda: post("/segment", {"decimal": "0.1"})
+
+    def stream(path: str, body: bytes, content_type: str) -> None:
+        response = client.post(path, data=body, content_type=content_type)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        _consume(response.response)
+
+    # the streaming APIs: the text batch on the inputs, the packed doubles on the tiled array
+    text = json.dumps([repr(x) for x in INPUTS.values()]).encode()
+    packed = values.astype("<f8").tobytes()
+    suite[f"post_segment_batch/n={len(INPUTS)}"] = lambda: stream("/api/segment/batch", text, "application/json")
+    suite[f"post_analyze/n={values.size}"] = lambda: stream("/api/analyze", packed, "application/octet-stream")
+    suite[f"post_analyze/digits=0/n={values.size}"] = \
+        lambda: stream("/api/analyze?digits=0", packed, "application/octet-stream")
+    for query in ("k=500", "k=50&exact=1"):
+        suite[f"get_range/{query}"] = lambda query=query: _consume(client.get(f"/api/range?decimal=0.1&{query}").response)
+    # the static pages from the page cache, as a browser asks for them
+    for label, url in (("home", "/"), ("notes", "/notes")):
+        suite[f"get_page/{label}"] = lambda url=url: client.get(url, headers={"Accept-Encoding": "gzip"})
+    return suite
+
+
+def _from_float_loop(values: np.ndarray) -> None:
+    for value in values.tolist():
+        fp_value = FP.from_float(value)
+        segment = Segment.from_fp(value, _SEGMENT_CTX)
+        _ = (fp_value.unbiased_exp, float(segment.distance), int(fp_value.bits[12:], 2))
+
+
+def _consume(iterable: Iterable) -> None:
+    for _ in iterable:
+        pass
+
+
+def _reference() -> int:
+    """Fixed pure-Python workload that the cases are timed against, to factor out the speed of the machine"""
+    total = 0
+    for i in range(1000):
+        total += i * i
+    return total
+
+
+def calibrate(func: Callable[[], object], min_time: float = DEFAULT_MIN_TIME) -> int:
+    """Return a number of calls of 'func' that lasts at least 'min_time' seconds"""
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            return number
+        # aim a little above min_time, growing at most 100-fold per step
+        number = max(number + 1, min(number * 100, math.ceil(number * 1.2 * min_time / max(elapsed, 1e-9))))
+
+
+def run_suite(name_filter: str = "", repeat: int = DEFAULT_REPEAT, min_time: float = DEFAULT_MIN_TIME,
+              progress: Optional[Callable[[str, float], None]] = None) -> dict:
+    """Run the cases whose name contains 'name_filter' and return the results document that --save writes
+
+    Each case is called while its loop is calibrated, so that one-off work (imports, memoised tables) is not timed.
+    """
+    suite = {name: func for name, func in cases().items() if name_filter in name}
+    if not suite:
+        raise ValueError(f"No benchmark case matches {name_filter!r}")
+    timers = {name: timeit.Timer(func) for name, func in suite.items()}
+    numbers = {name: calibrate(func, min_time) for name, func in suite.items()}
+    reference = timeit.Timer(_reference)
+    reference_number = calibrate(_reference, min_time / 5)
+
+    def reference_ns() -> float:
+        return reference.timeit(reference_number) / reference_number * 1e9
+
+    # one run of every case per round rather than all the runs of a case in a row, so that a slow period of the
+    # machine (another process, frequency scaling) affects one run of many cases rather than every run of a few;
+    # each run is also divided by the faster of the reference runs on either side of it
+    runs: Dict[str, List[float]] = {name: [] for name in suite}
+    relative: Dict[str, List[float]] = {name: [] for name in suite}
+    for _ in range(repeat):
+        for name, timer in timers.items():
+            before = reference_ns()
+            ns = timer.timeit(numbers[name]) / numbers[name] * 1e9
+            runs[name].append(ns)
+            relative[name].append(ns / min(before, reference_ns()))
+    results = {}
+    for name in suite:
+        results[name] = {"ns": min(runs[name]), "relative": statistics.median(relative[name]), "number": numbers[name],
+                         "runs": runs[name]}
+        if progress is not None:
+            progress(name, min(runs[name]))
+    return {
+        "version": VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": environment(),
+        "settings": {"repeat": repeat, "min_time": min_time},
+        "results": results,
+    }
+
+
+def load_results(path: str) -> dict:
+    """Return a results document saved by save_results(); raise ValueError if it is not one"""
+    with open(path, encoding="utf-8") as f:
+        document = json.load(f)
+    if not isinstance(document, dict) or document.get("version") != VERSION or "results" not in document:
+        raise ValueError(f"{path} is not a benchmark results file of version {VERSION}")
+    return document
+
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> List[Comparison]:
+    """Return a comparison row per case of either document, with the status 'regressed' (relative cost above its
+    baseline by more than 'threshold', a fraction), 'improved' (below by as much), 'ok', 'new' or 'missing'"""
+    old, new = baseline["results"], current["results"]
+    rows = []
+    for name in list(new) + [name for name in old if name not in new]:
+        if name not in old:
+            rows.append((name, None, new[name]["ns"], None, "new"))
+        elif name not in new:
+            rows.append((name, old[name]["ns"], None, None, "missing"))
+        else:
+            ratio = new[name]["relative"] / old[name]["relative"]
+            status = "regressed" if ratio > 1 + threshold else "improved" if ratio < 1 / (1 + threshold) else "ok"
+            rows.append((name, old[name]["ns"], new[name]["ns"], ratio - 1, status))
+    return rows
+
+
+def environment_differences(baseline: dict, current: dict) -> List[str]:
+    """Return the environment keys, other than the commit, that differ between two results documents"""
+    old, new = baseline.get("environment", {}), current.get("environment", {})
+    return [key for key in sorted(old.keys() | new.keys()) if key != "commit" and old.get(key) != new.get(key)]
+
+
+def print_comparison(rows: List[Comparison], out=sys.stdout) -> None:
+    """Print the comparison rows: baseline and current ns per call, and the change of the relative cost"""
+    width = max(len(name) for name, *_ in rows)
+    print(f"{'case':<{width}} {'baseline':>14} {'current':>14} {'relative':>9}", file=out)
+    for name, old, new, change, status in rows:
+        change_text = "" if change is None else f"{change * 100:+.1f}%"
+        print(f"{name:<{width}} {_format_ns(old):>14} {_format_ns(new):>14} {change_text:>9}  {status}", file=out)
+
+
+def _format_ns(ns: Optional[float]) -> str:
+    return "" if ns is None else f"{ns:,.1f} ns"
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point: run the cases, save the results with --save and compare them with --compare"""
+    parser = argparse.ArgumentParser(description="Run the benchmark suite, save it as a baseline or compare it with one")
+    parser.add_argument("--save", metavar="FILE", help="save the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare with a JSON baseline; exit with status 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"slowdown, as a fraction of the baseline, beyond which a case regressed (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--filter", default="", help="only run the cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed runs per case; the fastest counts")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME, help="minimum seconds per timed run")
+    args = parser.parse_args(argv)
+    if args.threshold <= 0 or args.repeat < 1 or args.min_time <= 0:
+        parser.error("--threshold, --repeat and --min-time must be positive")
+
+    try:
+        baseline = load_results(args.compare) if args.compare else None
+        current = run_suite(args.filter, args.repeat, args.min_time,
+                            None if baseline else lambda name, ns: print(f"{name:<48} {_format_ns(ns):>14}", flush=True))
+    except (OSError, ValueError) as exc:
+        parser.exit(2, f"error: {exc}\n")
+    if args.save:
+        save_results(current, args.save)
+    if baseline is None:
+        return
+
+    if args.filter:
+        baseline = dict(baseline, results={name: r for name, r in baseline["results"].items() if args.filter in name})
+    rows = compare(baseline, current, args.threshold)
+    print_comparison(rows)
+    differences = environment_differences(baseline, current)
+    if differences:
+        print(f"warning: the baseline was run in a different environment ({', '.join(differences)})")
+    regressed = [name for name, *_, status in rows if status == "regressed"]
+    if regressed:
+        parser.exit(1, f"{len(regressed)} of {len(rows)} cases regressed by more than {args.threshold:.0%}: {', '.join(regressed)}\n")
+    print(f"no regression beyond {args.threshold:.0%} in {len(rows)} cases")
+
+
+if __name__ == "__main__":
+    main()
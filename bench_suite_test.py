@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+import bench_suite
+from bench_suite import compare, load_results, main, run_suite, save_results
+from fp import FP
+
+
+def document(**relative):
+    return {"version": bench_suite.VERSION, "results": {name: {"ns": 100 * r, "relative": r} for name, r in relative.items()}}
+
+
+def test_compare():
+    baseline = document(same=1.0, slower=1.0, faster=1.0, gone=1.0)
+    current = document(same=1.1, slower=1.3, faster=0.7, added=1.0)
+    rows = compare(baseline, current, threshold=0.25)
+    assert [(name, status) for name, *_, status in rows] == [
+        ("same", "ok"), ("slower", "regressed"), ("faster", "improved"), ("added", "new"), ("gone", "missing")]
+    assert rows[1][1:4] == (100.0, 130.0, pytest.approx(0.3))
+    assert compare(baseline, current, threshold=0.5)[1][-1] == "ok"
+
+
+def test_run_suite_and_baseline_file(tmp_path):
+    results = run_suite("segment_from_exponent/e=0", repeat=2, min_time=0.001)
+    case = results["results"]["segment_from_exponent/e=0"]
+    assert list(results["results"]) == ["segment_from_exponent/e=0"]
+    assert len(case["runs"]) == 2 and case["ns"] == min(case["runs"]) and case["relative"] > 0
+    assert results["environment"]["python"] and results["settings"] == {"repeat": 2, "min_time": 0.001}
+
+    path = tmp_path / "baseline.json"
+    save_results(results, str(path))
+    assert load_results(str(path)) == results
+    path.write_text(json.dumps({"results": {}}))
+    with pytest.raises(ValueError):
+        load_results(str(path))
+    with pytest.raises(ValueError):
+        run_suite("no such case")
+
+
+def test_cases_cover_the_hot_paths():
+    names = list(bench_suite.cases())
+    for prefix in ("from_float/", "from_binary/", "next_binary_fp/", "segment_from_exponent/", "segment_compute/",
+                   "post_exact_decimal/", "post_segment/"):
+        assert sum(name.startswith(prefix) for name in names) >= 8
+    for prefix in ("next_uint64_fp/", "next_fp_from_binary/", "next_fp/", "next_compact_fp/"):
+        assert sum(name.startswith(prefix) for name in names) >= 8
+    for prefix in ("exact_decimal/", "exact_decimal_digits/", "compact_fp/", "significant_digits/", "significant_digits_batch/",
+                   "from_float_loop/", "surrounding_powers/",
+                   "float_after/", "float_range/", "segment_precision/", "find_precision_collision/", "fparray_analyze/",
+                   "exhaustive_analyze_range/", "atlas_sweep_binade/", "metrics/", "post_segment_batch/", "post_analyze/",
+                   "get_range/", "get_page/"):
+        assert any(name.startswith(prefix) for name in names), prefix
+    assert {f"get_d_digit_decimals/near_pow10/d={d:02}" for d in range(1, 21)} <= set(names)
+
+
+def test_main_fails_on_regression(tmp_path, monkeypatch, capsys):
+    path = str(tmp_path / "baseline.json")
+    options = ["--filter", "from_float/one", "--repeat", "3", "--min-time", "0.01"]
+    main(["--save", path] + options)
+    main(["--compare", path, "--threshold", "1"] + options)
+    assert "no regression beyond 100% in 1 cases" in capsys.readouterr().out
+
+    from_float = FP.from_float
+
+    def slow_from_float(f):
+        for _ in range(9):
+            from_float(f)
+        return from_float(f)
+
+    monkeypatch.setattr(FP, "from_float", staticmethod(slow_from_float))
+    with pytest.raises(SystemExit) as exc:
+        main(["--compare", path, "--threshold", "1"] + options)
+    assert exc.value.code == 1
+    assert "1 of 1 cases regressed by more than 100%: from_float/one" in capsys.readouterr().err
@@ -0,0 +1,78 @@
+"""Incremental reader and encoders of the binary bulk endpoint: packed doubles in, fixed-size records or columns out
+
+The body is a sequence of little-endian float64 values, or equivalently of their uint64 bit patterns: both are the
+same 8 bytes. It is read in chunks of CHUNK_VALUES values straight into a buffer that NumPy reinterprets in place,
+so no text is parsed and no Python object is built per value; each chunk is analysed as a whole with fparray.
+
+The analysis of a value is a RECORD of 20 bytes, little-endian and unpadded:
+
+    exponent      int16    unbiased exponent, as FP.unbiased_exp (-1023 for zero and subnormals, 1024 for Infinity and NaN)
+    digits        uint8    significant digits of the shortest decimal (0 for Infinity and NaN, or when not computed)
+    flags         uint8    FLAG_NEGATIVE | FLAG_SUBNORMAL | FLAG_INF | FLAG_NAN
+    float_index   uint64   0-based position of |x| among the 2**52 floats of its segment
+    ulp           float64  distance to the next float of larger magnitude (NaN for Infinity and NaN)
+"""
+
+import math
+from typing import BinaryIO, Dict, Iterator, List
+
+import numpy as np
+
+from fparray import analyze, shortest_digits
+
+VALUE_SIZE = 8
+CHUNK_VALUES = 8192
+
+FLAG_NEGATIVE = 1
+FLAG_SUBNORMAL = 2
+FLAG_INF = 4
+FLAG_NAN = 8
+
+RECORD = np.dtype([("exponent", "<i2"), ("digits", "u1"), ("flags", "u1"), ("float_index", "<u8"), ("ulp", "<f8")])
+# the record layout, as sent in the X-Record-Layout header of the binary responses
+RECORD_LAYOUT = ",".join(f"{name}:{RECORD.fields[name][0].str}" for name in RECORD.names)
+
+
+def iter_chunks(stream: BinaryIO, chunk_values: int = CHUNK_VALUES) -> Iterator[np.ndarray]:
+    """Return a generator of the values of 'stream' as float64 arrays of at most 'chunk_values' values, each one a
+    view of the buffer its bytes were read into
+
+    Raise ValueError at the end of the stream if it holds a partial value.
+    """
+    while True:
+        buffer = bytearray(chunk_values * VALUE_SIZE)
+        view = memoryview(buffer)
+        filled = 0
+        while filled < len(buffer):
+            count = stream.readinto(view[filled:])
+            if not count:
+                break
+            filled += count
+        if filled % VALUE_SIZE:
+            raise ValueError(f"The body ends with a partial value of {filled % VALUE_SIZE} bytes")
+        if filled:
+            yield np.frombuffer(buffer, dtype="<f8", count=filled // VALUE_SIZE)
+        if filled < len(buffer):
+            return
+
+
+def analyze_records(values: np.ndarray, digits: bool = True) -> np.ndarray:
+    """Return the RECORD array of 'values'; the digits are left at 0 unless 'digits' (they cost a Python call per
+    value, the other fields a few vectorised operations)"""
+    analysis = analyze(values)
+    records = np.zeros(len(analysis), dtype=RECORD)
+    records["exponent"] = analysis.unbiased_exp
+    if digits:
+        records["digits"] = shortest_digits(values)
+    records["flags"] = ((analysis.sign < 0) * FLAG_NEGATIVE | analysis.is_subnormal * FLAG_SUBNORMAL
+                        | analysis.is_inf * FLAG_INF | analysis.is_nan * FLAG_NAN)
+    records["float_index"] = analysis.float_index
+    records["ulp"] = analysis.ulp
+    return records
+
+
+def to_columns(records: np.ndarray) -> Dict[str, List]:
+    """Return the fields of 'records' as JSON-serialisable columns; a NaN ULP is None"""
+    columns = {name: records[name].tolist() for name in RECORD.names}
+    columns["ulp"] = [None if math.isnan(ulp) else ulp for ulp in columns["ulp"]]
+    return columns
@@ -0,0 +1,77 @@
+import io
+import math
+import struct
+from decimal import ROUND_HALF_UP, Context
+
+import numpy as np
+import pytest
+
+from bulk import (FLAG_INF, FLAG_NAN, FLAG_NEGATIVE, FLAG_SUBNORMAL, RECORD, RECORD_LAYOUT, analyze_records,
+                  iter_chunks, to_columns)
+from fp import FP, Segment
+from fputil import float_to_uint64, shortest_decimal_digits
+
+VALUES = [0.0, -0.0, 5e-324, -1e-310, 2.2250738585072014e-308, 0.1, -1.2, 1.0, 1023.9999999999999,
+          4503599627370497.0, 1.7976931348623157e308, math.inf, -math.inf, math.nan]
+ctx = Context(prec=800, rounding=ROUND_HALF_UP)
+
+
+class ShortReads(io.BytesIO):
+    """A stream returning at most 'size' bytes per read, as a socket may"""
+
+    def __init__(self, data: bytes, size: int) -> None:
+        super().__init__(data)
+        self.size = size
+
+    def readinto(self, buffer) -> int:
+        return super().readinto(memoryview(buffer)[:self.size])
+
+
+@pytest.mark.parametrize("read_size", [1, 3, 8, 13, 1 << 16])
+def test_iter_chunks(read_size):
+    values = np.arange(25, dtype="<f8") / 7
+    chunks = list(iter_chunks(ShortReads(values.tobytes(), read_size), chunk_values=10))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert np.concatenate(chunks).tolist() == values.tolist()
+    assert list(iter_chunks(io.BytesIO(b""))) == []
+    assert [len(chunk) for chunk in iter_chunks(io.BytesIO(values[:20].tobytes()), chunk_values=10)] == [10, 10]
+
+
+def test_iter_chunks_partial_value():
+    chunks = iter_chunks(io.BytesIO(b"\0" * 20), chunk_values=2)
+    assert len(next(chunks)) == 2
+    with pytest.raises(ValueError):
+        next(chunks)
+
+
+def test_bit_patterns_are_the_same_bytes():
+    patterns = [float_to_uint64(value) for value in VALUES]
+    body = struct.pack(f"<{len(patterns)}Q", *patterns)
+    assert body == struct.pack(f"<{len(VALUES)}d", *VALUES)
+    values = next(iter_chunks(io.BytesIO(body)))
+    assert values.view("<u8").tolist() == patterns
+
+
+def test_records_match_scalar():
+    records = analyze_records(np.array(VALUES))
+    assert RECORD.itemsize == 20 and len(records.tobytes()) == 20 * len(VALUES)
+    for record, value in zip(records.tolist(), VALUES):
+        exponent, digits, flags, float_index, ulp = record
+        if not math.isfinite(value):
+            assert exponent == 1024 and digits == 0 and math.isnan(ulp)
+            assert flags & (FLAG_NAN if math.isnan(value) else FLAG_INF)
+            continue
+        fp = FP.from_float(value)
+        segment = Segment.from_fp(value, ctx)
+        assert exponent == fp.unbiased_exp
+        assert digits == shortest_decimal_digits(value)
+        assert flags == (FLAG_NEGATIVE if math.copysign(1, value) < 0 else 0) | (FLAG_SUBNORMAL if 0 < abs(value) < 2.2250738585072014e-308 else 0)
+        assert float_index == segment.float_index(value) and ulp == float(segment.distance)
+    assert analyze_records(np.array(VALUES), digits=False)["digits"].tolist() == [0] * len(VALUES)
+
+
+def test_columns_and_layout():
+    columns = to_columns(analyze_records(np.array([1.0, math.nan])))
+    assert list(columns) == list(RECORD.names)
+    assert columns["ulp"] == [2.0 ** -52, None] and columns["digits"] == [1, 0]
+    assert np.dtype([tuple(field.split(":")) for field in RECORD_LAYOUT.split(",")]) == RECORD
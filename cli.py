@@ -0,0 +1,206 @@
+"""Command-line interface, run as 'python -m cli <command>'
+
+    python -m cli analyze [FILE] [--input-format decimal|hex|binary] [--output-format ndjson|csv] [--workers N]
+    python -m cli segments START END
+
+'analyze' reads numbers from FILE (stdin by default) in chunks, analyses the chunks on a pool of worker processes
+and writes one row per number to stdout, in input order. Only a bounded number of chunks is in flight at any
+time, so memory does not depend on the size of the input. Input formats:
+- decimal: one decimal literal per line ('0.1', '1e-310', '-72057594037927945')
+- hex: one 64-bit pattern per line in hexadecimal, with or without '0x' ('0x3FB999999999999A')
+- binary: packed doubles, 8 bytes each ('--byte-order' little or big)
+Blank lines are skipped. Numbers that cannot be analysed (invalid literals, Infinity, NaN) get a row with an
+'error' instead of aborting the run.
+
+'segments' prints the table of the segments with unbiased exponents START to END - 1.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from array import array
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import ExitStack
+from decimal import ROUND_HALF_UP, Context
+from itertools import islice
+from typing import BinaryIO, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+from fp import FP, Segment, tabulate_esegments
+from fputil import float_to_uint64, shortest_decimal_digits
+
+CHUNK_SIZE = 10000
+FIELDS = ["index", "input", "fp", "bits", "unbiased_exp", "significant_digits", "exact_decimal",
+          "segment_min", "segment_max", "ulp", "float_index", "error"]
+
+_SEGMENT_CTX = Context(prec=400, rounding=ROUND_HALF_UP)
+
+# a number to analyse: a decimal literal, or a bit pattern (None if invalid) with the text it was read from
+Item = Union[str, Tuple[Optional[int], str]]
+
+
+def analyze_item(index: int, item: Item) -> dict:
+    """Return the analysis row of one number: its float, bit pattern, exact decimal, shortest round-trip digits
+    and segment, or an 'error' if it is not a finite double
+    """
+    u, text = (None, item) if isinstance(item, str) else item
+    try:
+        if isinstance(item, str):
+            u = float_to_uint64(float(text))
+        elif u is None:
+            raise ValueError("Invalid 64-bit pattern in hexadecimal")
+        fp = FP.from_uint64(u)
+        segment = Segment.from_fp(fp.fp, _SEGMENT_CTX)
+        return {
+            "index": index,
+            "input": text,
+            "fp": fp.fp,
+            "bits": f"0x{u:016X}",
+            "unbiased_exp": fp.unbiased_exp,
+            "significant_digits": shortest_decimal_digits(fp.fp),
+            "exact_decimal": str(fp.exact_decimal),
+            "segment_min": str(segment.min_val),
+            "segment_max": str(segment.max_val),
+            "ulp": str(segment.distance),
+            "float_index": segment.float_index(fp.fp),
+        }
+    except (ValueError, OverflowError) as exc:
+        return {"index": index, "input": text, "error": str(exc)}
+
+
+def analyze_chunk(start: int, items: List[Item]) -> List[dict]:
+    """Return the analysis rows of a chunk of numbers whose first one has index 'start'"""
+    return [analyze_item(index, item) for index, item in enumerate(items, start)]
+
+
+def read_text_chunks(stream: TextIO, chunk_size: int, input_format: str) -> Iterator[List[Item]]:
+    """Return a generator of lists of at most 'chunk_size' items read from the lines of 'stream'"""
+    lines = (line.strip() for line in stream)
+    items: Iterator[Item] = (line for line in lines if line)
+    if input_format == "hex":
+        items = (_parse_hex(line) for line in items)
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _parse_hex(text: str) -> Item:
+    """Return the bit pattern written in hexadecimal in 'text', with 'text'; the pattern is None if 'text' is not one"""
+    try:
+        u = int(text, 16)
+    except ValueError:
+        return (None, text)
+    return (u if 0 <= u < 1 << 64 else None, text)
+
+
+def read_binary_chunks(stream: BinaryIO, chunk_size: int, byte_order: str = "little") -> Iterator[List[Item]]:
+    """Return a generator of lists of at most 'chunk_size' bit patterns read from packed doubles in 'stream'
+
+    Raise ValueError if the input does not end on a whole double.
+    """
+    swap = byte_order != sys.byteorder
+    while True:
+        data = stream.read(chunk_size * 8)
+        while data and len(data) % 8:
+            more = stream.read(8 - len(data) % 8)
+            if not more:
+                raise ValueError(f"Input ends with a partial double ({len(data) % 8} bytes)")
+            data += more
+        if not data:
+            return
+        patterns = array("Q", data)
+        if swap:
+            patterns.byteswap()
+        yield [(u, f"0x{u:016X}") for u in patterns]
+
+
+def analyze_chunks(chunks: Iterable[List[Item]], executor: Optional[Executor] = None, max_pending: int = 1) -> Iterator[dict]:
+    """Return a generator of the analysis rows of 'chunks', in input order
+
+    With an 'executor' the chunks are analysed concurrently, with at most 'max_pending' of them submitted and not
+    yet written, so that memory stays bounded; without one they are analysed in this process.
+    """
+    start = 0
+    if executor is None:
+        for chunk in chunks:
+            yield from analyze_chunk(start, chunk)
+            start += len(chunk)
+        return
+    pending = deque()
+    for chunk in chunks:
+        pending.append(executor.submit(analyze_chunk, start, chunk))
+        start += len(chunk)
+        if len(pending) >= max_pending:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+def write_rows(rows: Iterable[dict], out: TextIO, output_format: str) -> None:
+    """Write the analysis rows to 'out' as NDJSON or CSV (with a header line)"""
+    if output_format == "csv":
+        writer = csv.DictWriter(out, FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        for row in rows:
+            out.write(json.dumps(row) + "\n")
+
+
+def analyze(args: argparse.Namespace) -> None:
+    """Run the 'analyze' command: analyse the numbers of args.file (stdin without one) chunk by chunk, on
+    args.workers processes, and write their rows to stdout
+    """
+    with ExitStack() as stack:
+        if args.input_format == "binary":
+            stream = stack.enter_context(open(args.file, "rb")) if args.file else sys.stdin.buffer
+            chunks = read_binary_chunks(stream, args.chunk_size, args.byte_order)
+        else:
+            stream = stack.enter_context(open(args.file, encoding="utf-8")) if args.file else sys.stdin
+            chunks = read_text_chunks(stream, args.chunk_size, args.input_format)
+        workers = args.workers or os.cpu_count() or 1
+        if workers == 1:
+            write_rows(analyze_chunks(chunks), sys.stdout, args.output_format)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                write_rows(analyze_chunks(chunks, executor, 2 * workers), sys.stdout, args.output_format)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point of 'python -m cli': parse 'argv' (sys.argv[1:] by default) and run the command"""
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Analyse double-precision floating-point numbers")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analyze_parser = commands.add_parser("analyze", help="analyse a stream of numbers into NDJSON or CSV rows")
+    analyze_parser.add_argument("file", nargs="?", help="input file (default: stdin)")
+    analyze_parser.add_argument("--input-format", choices=["decimal", "hex", "binary"], default="decimal")
+    analyze_parser.add_argument("--byte-order", choices=["little", "big"], default="little", help="of binary input")
+    analyze_parser.add_argument("--output-format", choices=["ndjson", "csv"], default="ndjson")
+    analyze_parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="numbers per chunk")
+    analyze_parser.add_argument("--workers", type=int, default=None, help="worker processes (default: number of CPUs)")
+
+    segments_parser = commands.add_parser("segments", help="print the table of the segments of unbiased exponents START to END - 1")
+    segments_parser.add_argument("start", type=int)
+    segments_parser.add_argument("end", type=int)
+
+    args = parser.parse_args(argv)
+    if args.command == "analyze":
+        if args.chunk_size < 1:
+            parser.error("--chunk-size must be a positive integer")
+        try:
+            analyze(args)
+        except BrokenPipeError:
+            # the reader went away (e.g. '| head'): stop quietly, without a second error when stdout is flushed at exit
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        except ValueError as exc:
+            parser.exit(1, f"error: {exc}\n")
+    else:
+        tabulate_esegments(args.start, args.end)
+
+
+if __name__ == "__main__":
+    main()
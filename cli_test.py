@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+import struct
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from decimal import ROUND_HALF_UP, Context
+
+import pytest
+
+from cli import analyze_chunks, analyze_item, read_binary_chunks, read_text_chunks, write_rows
+from fp import FP, Segment
+
+CTX = Context(prec=400, rounding=ROUND_HALF_UP)
+VALUES = ["0.1", "1e-310", "-72057594037927945", "0", "1.7976931348623157e308"]
+
+
+def test_analyze_item():
+    row = analyze_item(3, "0.1")
+    assert row["index"] == 3 and row["input"] == "0.1" and row["fp"] == 0.1
+    assert row["bits"] == "0x3FB999999999999A"
+    assert row["exact_decimal"] == str(FP.from_float(0.1).exact_decimal)
+    assert row["significant_digits"] == 1
+    assert row["float_index"] == Segment.from_fp(0.1, CTX).float_index(0.1)
+    assert analyze_item(0, (0x3FB999999999999A, "3fb999999999999a"))["exact_decimal"] == row["exact_decimal"]
+    for bad in ("foo", "inf", "nan", "1e400", (None, "zz"), (0x7FF0000000000000, "0x7FF0000000000000")):
+        assert set(analyze_item(0, bad)) == {"index", "input", "error"}
+
+
+def test_read_text_chunks():
+    stream = io.StringIO("1\n\n 2 \n3\n4\n5\n")
+    assert list(read_text_chunks(stream, 2, "decimal")) == [["1", "2"], ["3", "4"], ["5"]]
+    stream = io.StringIO("0x3FF0000000000000\n3ff0000000000000\nzz\n0x10000000000000000\n")
+    assert list(read_text_chunks(stream, 10, "hex")) == [[(0x3FF0000000000000, "0x3FF0000000000000"),
+                                                         (0x3FF0000000000000, "3ff0000000000000"),
+                                                         (None, "zz"), (None, "0x10000000000000000")]]
+
+
+@pytest.mark.parametrize("byte_order,fmt", [("little", "<"), ("big", ">")])
+def test_read_binary_chunks(byte_order, fmt):
+    floats = [1.0, 0.1, -2.5, 5e-324, 0.0]
+    # reads of any size, including ones that end within a double
+    stream = io.BufferedReader(io.BytesIO(struct.pack(f"{fmt}5d", *floats)), buffer_size=3)
+    chunks = list(read_binary_chunks(stream, 2, byte_order))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert [struct.unpack(">d", u.to_bytes(8, "big"))[0] for chunk in chunks for u, _ in chunk] == floats
+    with pytest.raises(ValueError):
+        list(read_binary_chunks(io.BytesIO(b"\0" * 12), 2, byte_order))
+
+
+def test_analyze_chunks_in_order_with_bounded_read_ahead():
+    read = []
+
+    def chunks():
+        for i in range(0, 20, 2):
+            read.append(i)
+            yield [str(float(i)), str(float(i + 1))]
+
+    expected = list(analyze_chunks(chunks()))
+    read.clear()
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        rows = analyze_chunks(chunks(), executor, max_pending=3)
+        first = next(rows)
+        assert len(read) == 3
+        assert [first, *rows] == expected
+    assert [row["index"] for row in expected] == list(range(20))
+    assert [row["fp"] for row in expected] == [float(i) for i in range(20)]
+
+
+def test_write_rows():
+    rows = [analyze_item(i, value) for i, value in enumerate(VALUES + ["foo"])]
+    out = io.StringIO()
+    write_rows(rows, out, "ndjson")
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == rows
+    out = io.StringIO()
+    write_rows(rows, out, "csv")
+    parsed = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert [row["input"] for row in parsed] == VALUES + ["foo"]
+    assert parsed[0]["exact_decimal"] == rows[0]["exact_decimal"] and parsed[0]["error"] == ""
+    assert parsed[-1]["error"] and parsed[-1]["fp"] == ""
+
+
+def run(*args, stdin):
+    return subprocess.run([sys.executable, "-m", "cli", *args], input=stdin, capture_output=True, check=False)
+
+
+def test_python_m_cli_analyze():
+    body = "\n".join(VALUES * 50).encode()
+    serial = run("analyze", "--workers", "1", stdin=body)
+    parallel = run("analyze", "--workers", "3", "--chunk-size", "7", stdin=body)
+    assert serial.returncode == parallel.returncode == 0
+    assert serial.stdout == parallel.stdout
+    assert [json.loads(line)["input"] for line in serial.stdout.decode().splitlines()] == VALUES * 50
+
+    binary = run("analyze", "--input-format", "binary", "--byte-order", "big", "--output-format", "csv",
+                 stdin=struct.pack(">2d", 0.1, 2.0))
+    assert [row["fp"] for row in csv.DictReader(io.StringIO(binary.stdout.decode()))] == ["0.1", "2.0"]
+
+    partial = run("analyze", "--input-format", "binary", stdin=b"\0" * 10)
+    assert partial.returncode == 1 and b"partial double" in partial.stderr
+
+
+def test_python_m_cli_segments():
+    result = run("segments", "0", "2", stdin=b"")
+    assert result.returncode == 0
+    assert "1.9999999999999997779553950749686919152736663818359375" in result.stdout.decode()
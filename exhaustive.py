@@ -0,0 +1,271 @@
+"""Exhaustive decimal analysis of the small binary formats (float16, bfloat16, float32): every positive finite
+number, enumerated in vectorised chunks
+
+For every number x of the format and every number of digits d up to fmt.decimal_digits, the d-digit decimals
+that round to x are the multiples of the lattice spacing 10**(floor(log10(x)) + 1 - d) in its rounding interval
+(see FP.get_d_digit_decimals()). They are counted exactly for a whole chunk at once in float64: the ends of the
+rounding intervals are exact doubles, their quotients by the spacing are computed exactly where they can be integers,
+and elsewhere only trusted when they are farther from an integer than their rounding error; the few others, and
+the numbers whose rounding interval crosses a power of 10 (where the spacing changes), are counted with Fractions.
+From the counts:
+- the shortest round-trip digits of x: the smallest d with at least one d-digit decimal
+- the d-digit collisions: the numbers to which two or more d-digit decimals round, so that those decimals do not
+  survive a round trip through the format
+
+The counts are aggregated into one NDJSON record per binade (e = -bias for the subnormals):
+
+    {"format": "float32", "e": 0, "count": 8388608, "min": "1.0", "max": "1.9999998807907104",
+     "ulp": "1.1920928955078125e-07", "precision": 7, "shortest_digits": [1, 9, 90, ...], "collisions": [0, ...]}
+
+'shortest_digits[d - 1]' is the number of floats whose shortest decimal has d digits, 'collisions[d - 1]' the number
+of floats with d-digit collisions and 'precision' the guaranteed precision of fp.segment_precision(), which only
+looks at the decimals from 'min' to 'max' (the rounding intervals of the end floats reach past them). The negative
+numbers mirror the positive ones. The chunks are analysed on a ProcessPoolExecutor:
+
+    python exhaustive.py float32 [--workers N] > float32.ndjson
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from functools import lru_cache
+from itertools import repeat
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from fp import d_digit_count, segment_precision, MIN_POWER_OF_10, MAX_POWER_OF_10
+from fparray import floor_log10
+from fputil import FORMATS, BinaryFormat
+
+CHUNK_SIZE = 1 << 17
+
+# a quotient lo / 10**t in float64 is within 2**-51 (relative) of the exact one, as 10**t and the quotient are each
+# rounded once: it is trusted when it is farther than this (relative) distance from an integer
+_TOLERANCE = 2.0**-48
+
+
+def check_format(fmt: BinaryFormat) -> None:
+    """Raise ValueError unless 'fmt' can be analysed exhaustively: at most 32 bits and at most 10 exponent bits, so
+    that its numbers, the ends of their rounding intervals and the d-digit lattice spacings are all normal doubles
+    """
+    if fmt.width > 32 or fmt.exponent_bits > 10:
+        raise ValueError(f"{fmt.name} is not a small binary format that can be analysed exhaustively")
+
+
+def positive_patterns(fmt: BinaryFormat) -> range:
+    """Return the bit patterns of the positive finite numbers of 'fmt', zero excluded"""
+    return range(1, fmt.exponent_mask)
+
+
+def decode(fmt: BinaryFormat, patterns: np.ndarray) -> np.ndarray:
+    """Return the numbers of the format 'fmt' with the given bit patterns as a float64 array, as fmt.to_float()
+    element by element for the finite ones
+    """
+    patterns = np.asarray(patterns, dtype=np.int64)
+    p = fmt.fraction_bits
+    fraction = patterns & fmt.fraction_mask
+    biased_exp = (patterns >> p) & ((1 << fmt.exponent_bits) - 1)
+    significand = np.where(biased_exp > 0, fraction | (1 << p), fraction)
+    exponent = (np.maximum(biased_exp, 1) - (fmt.bias + p)).astype(np.int32)
+    values = np.ldexp(significand.astype(np.float64), exponent)
+    return np.where(patterns & fmt.sign_mask, -values, values)
+
+
+@lru_cache(maxsize=None)
+def _powers_of_10() -> np.ndarray:
+    """The doubles nearest to 10**t for t = MIN_POWER_OF_10 to MAX_POWER_OF_10 - 1, indexed by t - MIN_POWER_OF_10"""
+    return np.array([float(Fraction(10)**t) for t in range(MIN_POWER_OF_10, MAX_POWER_OF_10)])
+
+
+def _lattice_counts(lo: np.ndarray, hi: np.ndarray, closed: np.ndarray, t: np.ndarray, d: int,
+                    max_exact_scale: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the number of multiples of 10**t in the intervals from lo to hi (ends included where 'closed'), and
+    where that number could not be decided in float64 and must be counted exactly
+
+    The counts are exact where the quotients by 10**t are: for 0 <= t, 10**t and its multiples up to 2**53 are
+    integer doubles, so below 2**52 the remainders lo - q * 10**t are exact; for -max_exact_scale <= t < 0, lo * 10**-t
+    and hi * 10**-t are exact. Elsewhere the quotients (below 10**d) are within 10**d * 2**-51 of the exact ones and
+    are trusted when they are farther than that from an integer; the ends are then too far from the multiples of
+    10**t to be one (which is where the exact counting above is needed).
+    """
+    powers_of_10 = _powers_of_10()
+    spacing = powers_of_10[t - MIN_POWER_OF_10]
+    a, b = lo / spacing, hi / spacing
+    first, last = np.ceil(a), np.floor(b)
+    tolerance = 10.0**d * _TOLERANCE
+    uncertain = (np.abs(a - np.rint(a)) <= tolerance) | (np.abs(b - np.rint(b)) <= tolerance)
+
+    exact = np.flatnonzero((t >= 0) & (hi < 2.0**52))
+    if len(exact):
+        s, excluded = spacing[exact], ~closed[exact]
+        lo_multiple, lo_remainder = _exact_divmod(lo[exact], s)
+        hi_multiple, hi_remainder = _exact_divmod(hi[exact], s)
+        # an end that is a multiple of the spacing is excluded from an open interval
+        first[exact] = lo_multiple + ((lo_remainder > 0) | excluded)
+        last[exact] = hi_multiple - ((hi_remainder == 0) & excluded)
+        uncertain[exact] = False
+
+    scaled = np.flatnonzero((t < 0) & (t >= -max_exact_scale))
+    if len(scaled):
+        scale, excluded = powers_of_10[-t[scaled] - MIN_POWER_OF_10], ~closed[scaled]
+        a, b = lo[scaled] * scale, hi[scaled] * scale
+        first[scaled] = np.ceil(a) + ((a == np.ceil(a)) & excluded)
+        last[scaled] = np.floor(b) - ((b == np.floor(b)) & excluded)
+        uncertain[scaled] = False
+    return (last - first + 1, uncertain)
+
+
+def _exact_divmod(x: np.ndarray, s: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return floor(x / s) and x - floor(x / s) * s exactly, for positive x < 2**52 and integers s <= x"""
+    q = np.floor(x / s)
+    r = x - q * s
+    # the rounded quotient can be off by one; q * s and the remainders are exact
+    q += (r >= s).astype(np.float64) - (r < 0)
+    return (q, x - q * s)
+
+
+def digit_analysis(fmt: BinaryFormat, patterns: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return, for the positive finite non-zero numbers of the format 'fmt' with the given bit patterns, their shortest
+    round-trip digits and the smallest number of digits with collisions (fmt.decimal_digits + 1 if none), int8 arrays
+
+    A d-digit decimal is also a (d + 1)-digit one, so both properties hold for every number of digits from there
+    on: d is scanned downwards from fmt.decimal_digits, where every number has a decimal, and each number drops out
+    at the first d without a d-digit decimal. Most numbers need all or nearly all the digits of the format, so they
+    are only visited two or three times.
+    """
+    patterns = np.asarray(patterns, dtype=np.int64)
+    values = decode(fmt, patterns)
+    p = fmt.fraction_bits
+    fraction, biased_exp = patterns & fmt.fraction_mask, patterns >> p
+    ulp = np.ldexp(1.0, (np.maximum(biased_exp, 1) - (fmt.bias + p)).astype(np.int32))
+    # the rounding interval, as fputil.rounding_interval(): at the bottom of a binade the lower neighbour is twice as close
+    lo = values - np.where((fraction == 0) & (biased_exp > 1), ulp / 4, ulp / 2)
+    hi = values + ulp / 2
+    closed = fraction % 2 == 0
+    adjusted = floor_log10(values)
+    # the numbers whose rounding interval crosses a power of 10 (or might: 10**k is rounded to a double) are
+    # counted exactly, piece by piece
+    powers_of_10 = _powers_of_10()
+    straddles = ((lo <= powers_of_10[adjusted - MIN_POWER_OF_10] * (1 + _TOLERANCE))
+                 | (hi >= powers_of_10[adjusted + 1 - MIN_POWER_OF_10] * (1 - _TOLERANCE)))
+    # lo and hi have at most p + 3 significant bits: times 5**k they stay exact while p + 3 + k * log2(5) <= 53
+    max_exact_scale = int((53 - (p + 3)) / math.log2(5))
+
+    digits = fmt.decimal_digits
+    shortest = np.empty(len(values), dtype=np.int8)
+    collisions_from = np.empty(len(values), dtype=np.int8)
+    # the numbers still scanned, and for how many of the numbers of digits scanned so far they had collisions
+    index, colliding = np.arange(len(values)), np.zeros(len(values), dtype=np.int8)
+    for d in range(digits, 0, -1):
+        count, uncertain = _lattice_counts(lo, hi, closed, adjusted + 1 - d, d, max_exact_scale)
+        for i in np.flatnonzero(uncertain | straddles):
+            count[i] = d_digit_count(int(patterns[index[i]]), int(adjusted[i]), d, fmt)
+        colliding += count > 1
+        found = count > 0
+        done = index[~found]
+        shortest[done] = d + 1
+        collisions_from[done] = digits + 1 - colliding[~found]
+        index, lo, hi, closed, adjusted, colliding, straddles = (
+            array[found] for array in (index, lo, hi, closed, adjusted, colliding, straddles))
+    shortest[index] = 1
+    collisions_from[index] = digits + 1 - colliding
+    return (shortest, collisions_from)
+
+
+def analyze_range(fmt: BinaryFormat, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the per-binade counts of the positive finite numbers of 'fmt' with bit patterns start to stop - 1:
+    shortest digits and collisions, int64 arrays indexed by [biased exponent, d - 1]
+    """
+    patterns = np.arange(start, stop, dtype=np.int64)
+    shortest, collisions_from = digit_analysis(fmt, patterns)
+    biased_exp = patterns >> fmt.fraction_bits
+    binades, digits = (1 << fmt.exponent_bits) - 1, fmt.decimal_digits
+    shortest_counts = np.bincount(biased_exp * digits + shortest - 1, minlength=binades * digits).reshape(binades, digits)
+    # a number with collisions from d on has collisions for every d' >= d
+    collisions_from_counts = np.bincount(biased_exp * (digits + 1) + collisions_from - 1, minlength=binades * (digits + 1))
+    collision_counts = np.cumsum(collisions_from_counts.reshape(binades, digits + 1)[:, :digits], axis=1)
+    return (shortest_counts, collision_counts)
+
+
+def _binade_record(fmt: BinaryFormat, biased_exp: int, shortest: np.ndarray, collisions: np.ndarray) -> dict:
+    p = fmt.fraction_bits
+    e = biased_exp - fmt.bias
+    return {
+        "format": fmt.name,
+        "e": e,
+        "count": int(shortest.sum()),
+        "min": repr(fmt.to_float(max(biased_exp << p, 1))),
+        "max": repr(fmt.to_float((biased_exp + 1 << p) - 1)),
+        "ulp": repr(2.0**(max(biased_exp, 1) - fmt.bias - p)),
+        "precision": segment_precision(e, fmt),
+        "shortest_digits": shortest.tolist(),
+        "collisions": collisions.tolist(),
+    }
+
+
+def exhaustive_analysis(fmt: BinaryFormat, workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE,
+                        progress: Optional[Callable[[int, int, float], None]] = None) -> List[dict]:
+    """Analyse every positive finite number of the format 'fmt' and return one record per binade, in exponent order
+
+    The bit patterns are cut into chunks of 'chunk_size' numbers, analysed on a pool of 'workers' processes
+    (os.cpu_count() by default; in this process with workers=1), and 'progress(done, total, elapsed_seconds)' is
+    called after each chunk.
+    """
+    check_format(fmt)
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+    patterns = positive_patterns(fmt)
+    chunks = [(start, min(start + chunk_size, patterns.stop)) for start in range(patterns.start, patterns.stop, chunk_size)]
+    binades, digits = (1 << fmt.exponent_bits) - 1, fmt.decimal_digits
+    shortest = np.zeros((binades, digits), dtype=np.int64)
+    collisions = np.zeros((binades, digits), dtype=np.int64)
+    start_time = time.monotonic()
+
+    def add(done: int, counts: Tuple[np.ndarray, np.ndarray]) -> None:
+        np.add(shortest, counts[0], out=shortest)
+        np.add(collisions, counts[1], out=collisions)
+        if progress is not None:
+            progress(done, len(chunks), time.monotonic() - start_time)
+
+    if workers == 1:
+        for done, (start, stop) in enumerate(chunks, 1):
+            add(done, analyze_range(fmt, start, stop))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map() drops each result once it is consumed, so the parent only holds the running sums
+            starts, stops = zip(*chunks)
+            for done, counts in enumerate(executor.map(analyze_range, repeat(fmt), starts, stops), 1):
+                add(done, counts)
+    return [_binade_record(fmt, biased_exp, shortest[biased_exp], collisions[biased_exp]) for biased_exp in range(binades)]
+
+
+def print_progress(done: int, total: int, elapsed: float) -> None:
+    """Progress report for exhaustive_analysis(): chunks done, rate and estimated time left, on stderr"""
+    eta = elapsed / done * (total - done)
+    print(f"\r{done}/{total} chunks, {done / elapsed:.2f} chunks/s, {eta:.0f} s left", end="\n" if done == total else "",
+          file=sys.stderr, flush=True)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point: analyse the format given in 'argv' (sys.argv[1:] by default) and write its
+    per-binade records to stdout as NDJSON
+    """
+    small_formats = [name for name, fmt in FORMATS.items() if fmt.width <= 32]
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("format", choices=small_formats)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: number of CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="numbers per chunk")
+    parser.add_argument("--quiet", action="store_true", help="no progress report on stderr")
+    args = parser.parse_args(argv)
+    records = exhaustive_analysis(FORMATS[args.format], args.workers, args.chunk_size, None if args.quiet else print_progress)
+    for record in records:
+        print(json.dumps(record))
+
+
+if __name__ == "__main__":
+    main()
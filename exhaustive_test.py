@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from exhaustive import analyze_range, decode, digit_analysis, exhaustive_analysis, positive_patterns
+from fp import d_digit_count, float_floor_log10, segment_precision
+from fputil import BFLOAT16, FLOAT16, FLOAT32, FLOAT64
+
+
+def numpy_shortest_digits(value) -> int:
+    """Significant digits of numpy's shortest round-trip representation (Dragon4) of a float16 or float32"""
+    significand = np.format_float_scientific(value, unique=True).partition("e")[0].replace(".", "").strip("0")
+    return len(significand) or 1
+
+
+def test_decode_agrees_with_numpy():
+    patterns = np.arange(1 << 16)
+    finite = np.isfinite(patterns.astype(np.uint16).view(np.float16))
+    assert np.array_equal(decode(FLOAT16, patterns)[finite], patterns.astype(np.uint16).view(np.float16)[finite].astype(np.float64))
+    bfloat16_as_float32 = (patterns.astype(np.uint32) << 16).view(np.float32)
+    finite = np.isfinite(bfloat16_as_float32)
+    assert np.array_equal(decode(BFLOAT16, patterns)[finite], bfloat16_as_float32[finite].astype(np.float64))
+    patterns = np.random.default_rng(0).integers(0, FLOAT32.exponent_mask, 100000)
+    assert np.array_equal(decode(FLOAT32, patterns), patterns.astype(np.uint32).view(np.float32).astype(np.float64))
+
+
+def test_shortest_digits_of_every_float16_agree_with_numpy():
+    patterns = np.array(positive_patterns(FLOAT16))
+    shortest, _ = digit_analysis(FLOAT16, patterns)
+    values = patterns.astype(np.uint16).view(np.float16)
+    assert shortest.tolist() == [numpy_shortest_digits(value) for value in values]
+
+
+def test_shortest_digits_and_collisions_of_float32_sample():
+    patterns = np.random.default_rng(1).integers(1, FLOAT32.exponent_mask, 5000)
+    patterns[:4] = [1, 0x00800000, 0x3F800000, FLOAT32.max_finite]
+    # the float32 numbers nearest to powers of 10, whose rounding intervals cross them
+    patterns[4:12] = [FLOAT32.from_float(10.0**k) + i for k in (-30, -5, 1, 20) for i in (-1, 0)]
+    shortest, collisions_from = digit_analysis(FLOAT32, patterns)
+    values = patterns.astype(np.uint32).view(np.float32)
+    assert shortest.tolist() == [numpy_shortest_digits(value) for value in values]
+    for u, value, first in zip(patterns[:300].tolist(), values.tolist(), collisions_from.tolist()):
+        adjusted = float_floor_log10(value)
+        counts = [d_digit_count(u, adjusted, d, FLOAT32) for d in range(1, 10)]
+        assert first == next((d for d, count in enumerate(counts, 1) if count > 1), 10)
+
+
+def test_analyze_range_counts_per_binade():
+    shortest, collisions = analyze_range(BFLOAT16, 0x3F80, 0x4000)
+    assert shortest.shape == collisions.shape == (255, 4)
+    assert shortest[127].tolist() == [1, 9, 90, 28] and shortest.sum() == 128
+    # 1.0 also has the 3-digit decimal 0.999, whose spacing is that of the decade below it
+    assert collisions[127].tolist() == [0, 0, 1, 128]
+
+
+def test_exhaustive_analysis_of_float16():
+    calls = []
+    records = exhaustive_analysis(FLOAT16, workers=1, progress=lambda *args: calls.append(args))
+    assert [r["e"] for r in records] == list(range(-15, 16))
+    assert sum(r["count"] for r in records) == len(positive_patterns(FLOAT16)) == 31743
+    assert calls[-1][:2] == (1, 1)
+    for r in records:
+        assert sum(r["shortest_digits"]) == r["count"]
+        assert r["collisions"] == sorted(r["collisions"]) and r["collisions"][-1] <= r["count"]
+        assert r["precision"] == segment_precision(r["e"], FLOAT16)
+    one = records[15]
+    assert (one["min"], one["max"], one["ulp"], one["precision"]) == ("1.0", "1.9990234375", "0.0009765625", 4)
+    assert exhaustive_analysis(FLOAT16, workers=2, chunk_size=5000) == records
+
+
+def test_exhaustive_analysis_rejects_wide_formats():
+    with pytest.raises(ValueError):
+        exhaustive_analysis(FLOAT64)
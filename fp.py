@@ -1,12 +1,38 @@
 """High-level functions to manipulate floating-point numbers
 """
 
-from decimal import ROUND_HALF_UP, Decimal, getcontext, setcontext, Context
-from math import log2, log10, floor
-from typing import List, Tuple, Generator
-from fputil import unpack_double_precision_fp, check_infinity_or_nan, from_decimal_to_binary, next_binary_fp, zero_last_n_elements
-
-setcontext(Context(prec=400, rounding=ROUND_HALF_UP))
+from array import array
+from decimal import ROUND_HALF_UP, Decimal, localcontext, Context
+from fractions import Fraction
+from functools import lru_cache
+from itertools import islice
+from bisect import bisect_right
+from math import inf, nextafter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Generator
+from fputil import (float_to_uint64, uint64_to_float, uint64_to_bits, bits_to_uint64, unpack_uint64_fp,
+                    check_infinity_or_nan_uint64, next_uint64_fp, uint64_to_exact_decimal, first_multiple_mod_in_range, rounding_interval,
+                    shortest_decimal_digits, exact_decimal_digits, uint64_to_ordinal, ordinal_range_to_uint64, MAX_FINITE_ORDINAL,
+                    ordinal_to_uint64, SUBNORMAL_UNBIASED_EXP, DOUBLE_PRECISION_EXPONENT_BIAS, DOUBLE_PRECISION_FRACTION_BITS,
+                    EXPONENT_MASK, SIGN_MASK, BinaryFormat, FLOAT64)
+
+# Decimal arithmetic in this module never relies on the current (per-thread) decimal context: it is either exact
+# by construction or done through the methods of this shared, never-mutated context, so that the functions can be
+# called from any thread whatever its context
+_CONTEXT = Context(prec=400, rounding=ROUND_HALF_UP)
+
+# precomputed segment table (e.g. a memory-mapped segment_table.SegmentTable) used by Segment.from_exponent(),
+# see use_segment_table()
+_SEGMENT_TABLE = None
+
+# floats converted at once by float_range()
+_RANGE_CHUNK = 4096
+
+# range of the powers of 2 and 10 that bound a positive finite float: 2**-1074 <= x < 2**1024, 10**-324 < x < 10**309
+MIN_POWER_OF_2 = SUBNORMAL_UNBIASED_EXP + 1 - DOUBLE_PRECISION_FRACTION_BITS
+MAX_POWER_OF_2 = DOUBLE_PRECISION_EXPONENT_BIAS + 1
+MIN_POWER_OF_10 = -324
+MAX_POWER_OF_10 = 309
+_MAX_DOUBLE = Fraction(2)**(DOUBLE_PRECISION_EXPONENT_BIAS + 1) - Fraction(2)**(DOUBLE_PRECISION_EXPONENT_BIAS - DOUBLE_PRECISION_FRACTION_BITS)
 
 
 class FP:
@@ -15,6 +41,7 @@ class FP:
     - bits: the binary representation of the floating-point number
     - exact_decimal: the exact decimal representation of the floating-point number
     - unbiased_exp: the unbiased exponent of the floating-point number
+    - fmt: the binary format of the number, FLOAT64 unless built with from_pattern() or with a 'fmt' argument
 
      Regarding 'fp' attribute:
      - historically, the Python prompt and built-in repr() function would choose the representative with 17 significant digits, 0.10000000000000001. 
@@ -27,11 +54,12 @@ class FP:
     - https://www.exploringbinary.com/number-of-decimal-digits-in-a-binary-fraction/
     """
 
-    def __init__(self, fp: float, bits: str, exact_decimal: Decimal, unbiased_exp: int):
+    def __init__(self, fp: float, bits: str, exact_decimal: Decimal, unbiased_exp: int, fmt: BinaryFormat = FLOAT64):
         self.fp = fp
         self.bits = bits
         self.exact_decimal = exact_decimal
         self.unbiased_exp = unbiased_exp
+        self.fmt = fmt
 
     def __repr__(self):
         return f"FP(float={self.fp}, bits={self.bits}, exact_decimal={self.exact_decimal}, unbiased_exp={self.unbiased_exp})"
@@ -40,9 +68,11 @@ class FP:
         return self.fp == other.fp and self.bits == other.bits and self.exact_decimal == other.exact_decimal and self.unbiased_exp == other.unbiased_exp
 
     def next(self) -> "FP":
-        """Return the next double-precision floating-point number
+        """Return the next floating-point number of the same format
         """
-        return FP.from_binary(next_binary_fp(self.bits))
+        if self.fmt == FLOAT64:
+            return FP.from_uint64(next_uint64_fp(bits_to_uint64(self.bits)))
+        return FP.from_pattern(self.fmt.next_pattern(bits_to_uint64(self.bits)), self.fmt)
 
     def fp_gen(self) -> Generator["FP", None, None]:
         """Return a generator of consecutive FP objects in ascending order and starting from this FP
@@ -54,178 +84,526 @@ class FP:
             yield fp
             fp = fp.next()
 
-    def get_d_digit_decimals(self, d: int):
+    def ordinal(self) -> int:
+        """Return the position of this floating-point number on the line of numbers of its format, see float_to_ordinal()
+        """
+        u = bits_to_uint64(self.bits)
+        if self.fmt == FLOAT64:
+            return uint64_to_ordinal(u)
+        return -(u & ~self.fmt.sign_mask) if u & self.fmt.sign_mask else u
+
+    def skip(self, k: int) -> "FP":
+        """Return the k-th floating-point number of the same format after this one (before it for negative k), in O(1)
+        """
+        if self.fmt == FLOAT64:
+            return FP.from_uint64(ordinal_to_uint64(_skip_ordinal(self.ordinal(), k)))
+        o = self.ordinal() + k
+        if abs(o) > self.fmt.max_finite:
+            raise OverflowError("Infinity")
+        return FP.from_pattern(self.fmt.sign_mask | -o if o < 0 else o, self.fmt)
+
+    def ulp_distance(self, other) -> int:
+        """Return the number of floats from this one to 'other' (negative if 'other' is smaller), see ulp_distance()
+
+        Both numbers must be of the same format.
+        """
+        if other.fmt != self.fmt:
+            raise ValueError(f"Cannot count the numbers between a {self.fmt.name} and a {other.fmt.name} number")
+        return other.ordinal() - self.ordinal()
+
+    def _d_digit_lattice(self, d: int) -> Tuple[List[Tuple[int, int, int]], int]:
+        """Return (pieces, t): the d-digit decimals that map to this floating-point number, as a list of pieces
+        (first, count, t') in ascending order, each the 'count' consecutive multiples (first + i) * 10**t' of the lattice
+        spacing 10**t', and the exponent t of the lattice spacing in the decade of the float
+
+        The multiples are counted arithmetically in the exact rounding interval of the float (see rounding_interval()).
+        The interval is split at the powers of 10 it crosses, since the spacing of the d-digit decimals changes there.
+        """
+        _, _, exp = self.exact_decimal.as_tuple()
+        if isinstance(exp, str):
+            raise ValueError("dec must be a finite number")
+        return _d_digit_lattice(bits_to_uint64(self.bits), self.exact_decimal.adjusted(), d, self.fmt)
+
+    def exact_decimal_digits(self, start: int = 0, count: Optional[int] = None) -> Tuple[str, int, int]:
+        """Return (digits, total, adjusted): the significant digits at positions start to start + count - 1 of the exact
+        decimal value, their total number and the exponent of the leading one, see fputil.exact_decimal_digits()
+        """
+        return exact_decimal_digits(float_to_uint64(self.fp), start, count)
+
+    def count_d_digit_decimals(self, d: int) -> Tuple[int, Decimal]:
+        """Return the number of d-digit decimal numbers that map to the given double-precision floating-point number,
+        and the distance between consecutive d-digit numbers, in O(1) whatever the number of digits
+
+        The distance is the one in the decade of the float; it is ten times smaller (larger) for the d-digit numbers
+        below (above) a power of 10 crossed by the rounding interval.
+        """
+        pieces, t = self._d_digit_lattice(d)
+        return (sum(count for _, count, _ in pieces), _CONTEXT.power(10, t))
+
+    def iter_d_digit_decimals(self, d: int, offset: int = 0) -> Generator[Decimal, None, None]:
+        """Return a generator of the d-digit decimal numbers that map to the given double-precision floating-point number,
+        in ascending order and skipping the first 'offset' ones
+        """
+        if offset < 0:
+            raise ValueError("offset must be a non-negative integer")
+        for first, count, t in self._d_digit_lattice(d)[0]:
+            for n in range(first + offset, first + count):
+                yield Decimal(f"{n}E{t}")
+            offset = max(0, offset - count)
+
+    def get_d_digit_decimals(self, d: int, offset: int = 0, limit: Optional[int] = None):
         """Return the list of d-digit decimal numbers that map to the given double-precision floating-point number
         The list is ordered in ascending order
 
+        The d-digit numbers are the multiples of the distance 10**t that lie in the rounding interval of the float,
+        i.e. between the midpoints to both neighbours (included when the significand is even, as ties round to even);
+        where the interval crosses a power of 10, the distance is ten times smaller below it than above it.
+        They are counted arithmetically, so the count is O(1); the list can be restricted to a page with 'offset'
+        and 'limit', since for large d it is astronomically long.
+
         Args:
             fp (FP): double-precision floating-point number
             d (int): number of significant digits (thus leading zeros not included) to be considered
+            offset (int): number of d-digit numbers to skip at the start of the list
+            limit (int): maximum length of the list, or None for the whole list
 
         Returns:
             tuple[int, Decimal, list[Decimal]]: number of d-digit decimal numbers that map to the given double-precision floating-point number, 
-            the distance between consecutive d-digit numbers, and the list of numbers
-        """
-        sign, digits, exp = self.exact_decimal.as_tuple()
-        match exp:
-            case str(exp):
-                raise ValueError("dec must be a finite number")
-            case _:
-                exp = int(exp)
-
-        dec_len = len(digits)
-        if dec_len < d:
-            raise ValueError(f"Number of specified digits {d} must be less than the number of digits {dec_len} in the exact decimal representation of the floating-point number {self.exact_decimal}")
-
-        # when exp + dec_len <=0, then exp + dec_len - 1 is the number of leading zeros
-        number_significant_digits_before_decimal_point = exp + dec_len
-        # distance between consecutive d-digit numbers
-        distance = Decimal(10)**(number_significant_digits_before_decimal_point - d)
-
-        # first d-digit number smaller than the given number
-        lower_d_digit_number = Decimal((sign, zero_last_n_elements(digits, dec_len - d), exp))
-        # first d-digit number greater than the given number
-        upper_d_digit_number = lower_d_digit_number + distance
-
-        getcontext().prec = d
-        numbers = []
-        # checking d-digit numbers smaller than the given number
-        while float(lower_d_digit_number) == self.fp:
-            numbers.append(+lower_d_digit_number)
-            lower_d_digit_number -= distance
-
-        # checking d-digit numbers greater than the given number
-        while float(upper_d_digit_number) == self.fp:
-            numbers.append(+upper_d_digit_number)
-            upper_d_digit_number += distance
-
-        return (len(numbers), distance, sorted(numbers))
+            the distance between consecutive d-digit numbers, and the list (or page) of numbers
+        """
+        if limit is not None and limit < 0:
+            raise ValueError("limit must be a non-negative integer")
+        count, distance = self.count_d_digit_decimals(d)
+        numbers = list(islice(self.iter_d_digit_decimals(d, offset), limit))
+        return (count, distance, numbers)
 
     @staticmethod
     def get_number_significant_digits(decimal: str) -> int:
         """Return the number of significant digits of a decimal number.
 
-        Precision of an individual decimal number defined as the minimum amount of digits to identify its floating-point number.
+        Precision of an individual decimal number defined as the minimum amount of digits to identify its floating-point number,
+        i.e. the length of the shortest decimal that rounds to the same floating-point number (see shortest_decimal_digits()).
+        The cost does not depend on the number of digits of the shortest decimal, only on parsing the input once.
+
+        "1023.99999999999988" --> 17 (1023.9999999999999)
+        """
+        return shortest_decimal_digits(float(decimal))
+
+    @staticmethod
+    def get_numbers_significant_digits(decimals: Iterable[str]) -> List[Optional[int]]:
+        """Return the number of significant digits of each decimal number in 'decimals', see get_number_significant_digits()
+
+        Items that are not finite decimal numbers get None instead of raising, so that a whole column can be classified at once.
+        """
+        precisions: List[Optional[int]] = []
+        append = precisions.append
+        for decimal in decimals:
+            try:
+                append(shortest_decimal_digits(float(decimal)))
+            except ValueError:
+                append(None)
+        return precisions
+
+    @staticmethod
+    def from_decimal(dec: Decimal, fmt: BinaryFormat = FLOAT64) -> "FP":
+        """Return a FP object from the given Decimal number, rounded to the nearest number of the format 'fmt'
+        """
+        if fmt == FLOAT64:
+            return FP.from_float(float(dec))
+        return FP.from_pattern(fmt.round_fraction(Fraction(dec)), fmt)
+
+    @staticmethod
+    def from_float(f: float, fmt: BinaryFormat = FLOAT64) -> "FP":
+        """Return a FP object from the given float number, rounded to the nearest number of the format 'fmt'
+        """
+        if fmt == FLOAT64:
+            return FP.from_uint64(float_to_uint64(f))
+        return FP.from_pattern(fmt.from_float(f), fmt)
+
+    @staticmethod
+    def from_binary(bits: str) -> "FP":
+        """Return a FP from the given binary representation       
+        """
+        return FP.from_uint64(bits_to_uint64(bits))
+
+    @staticmethod
+    def from_uint64(u: int) -> "FP":
+        """Return a FP from the given bit pattern held in an unsigned 64-bit integer
+
+        The bit pattern is only rendered as a '0'/'1' string for the 'bits' attribute.
+        """
+        check_infinity_or_nan_uint64(u)
+        unbiased_exp = unpack_uint64_fp(u)[3]
+        return FP(uint64_to_float(u), uint64_to_bits(u), uint64_to_exact_decimal(u), unbiased_exp)
+
+    @staticmethod
+    def from_pattern(u: int, fmt: BinaryFormat) -> "FP":
+        """Return a FP from the bit pattern 'u' of a number of the binary format 'fmt', e.g. fputil.FLOAT32
+
+        'fp' is the number as a float and 'bits' its fmt.width-bit pattern.
+        """
+        if fmt == FLOAT64:
+            return FP.from_uint64(u)
+        fmt.check_pattern(u)
+        return FP(fmt.to_float(u), fmt.to_bits(u), fmt.exact_decimal(u), fmt.unpack(u)[3], fmt)
+
+
+def _d_digit_lattice(u: int, adjusted: int, d: int, fmt: BinaryFormat = FLOAT64) -> Tuple[List[Tuple[int, int, int]], int]:
+    """FP._d_digit_lattice() of the number of the format 'fmt' with bit pattern 'u', whose exact decimal has its
+    leading digit at 10**adjusted
+    """
+    if d < 1:
+        raise ValueError("Number of digits must be a positive integer")
+
+    lo, hi, closed = rounding_interval(u) if fmt == FLOAT64 else fmt.rounding_interval(u)
+    if lo < 0 < hi:
+        # a zero: only 0 itself lies in its interval
+        return ([_lattice_piece(lo, hi, closed, closed, adjusted + 1 - d)], adjusted + 1 - d)
+    negative = hi <= 0
+    if negative:
+        lo, hi = -hi, -lo
+    # the interval can reach into the decades below and above the one of the number, where the leading digit,
+    # and so the distance between consecutive d-digit numbers, is one position lower or higher
+    pieces = []
+    for k in (adjusted - 1, adjusted, adjusted + 1):
+        bottom, top = Fraction(10)**k, Fraction(10)**(k + 1)
+        piece_lo, lo_included = (lo, closed) if lo >= bottom else (bottom, True)
+        piece_hi, hi_included = (hi, closed) if hi < top else (top, False)
+        if piece_lo <= piece_hi:
+            first, count, t = _lattice_piece(piece_lo, piece_hi, lo_included, hi_included, k + 1 - d)
+            if count:
+                pieces.append((first, count, t))
+    if negative:
+        pieces = [(-(first + count - 1), count, t) for first, count, t in reversed(pieces)]
+    return (pieces, adjusted + 1 - d)
+
+
+def _lattice_piece(lo: Fraction, hi: Fraction, lo_included: bool, hi_included: bool, t: int) -> Tuple[int, int, int]:
+    """Return (first, count, t): the multiples of 10**t from lo to hi are the 'count' consecutive (first + i) * 10**t
+    """
+    spacing = Fraction(10)**t
+    first = -(-lo // spacing) if lo_included else lo // spacing + 1
+    last = hi // spacing if hi_included else -(-hi // spacing) - 1
+    return (first, max(0, last - first + 1), t)
+
+
+def d_digit_count(u: int, adjusted: int, d: int, fmt: BinaryFormat = FLOAT64) -> int:
+    """Return the number of d-digit decimals that map to the number of the format 'fmt' with bit pattern 'u', whose
+    exact decimal has its leading digit at 10**adjusted, as FP.count_d_digit_decimals() counts them for doubles
+    """
+    return sum(count for _, count, _ in _d_digit_lattice(u, adjusted, d, fmt)[0])
+
+
+class CompactFP:
+    """Compact, lazily-evaluated counterpart of FP
+
+    Only the 64-bit pattern is stored on construction; 'bits', 'exact_decimal' and 'unbiased_exp'
+    are computed on first access and cached in the instance slots. Equality and hashing are based
+    on the bit pattern, so CompactFP objects can be used as dict keys or set members.
+    """
+
+    __slots__ = ("_u", "_bits", "_exact_decimal", "_unbiased_exp")
+
+    # the format is always double precision (a class attribute, not a slot)
+    fmt = FLOAT64
+
+    def __init__(self, u: int):
+        self._u = u
+        self._bits = None
+        self._exact_decimal = None
+        self._unbiased_exp = None
+
+    def __repr__(self):
+        return f"CompactFP(float={self.fp}, bits={hex(self._u)})"
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactFP):
+            return NotImplemented
+        return self._u == other._u
+
+    def __hash__(self):
+        return hash(self._u)
+
+    @property
+    def uint64(self) -> int:
+        """Bit pattern of the floating-point number as an unsigned 64-bit integer"""
+        return self._u
+
+    @property
+    def fp(self) -> float:
+        """The floating-point number as a Python float"""
+        return uint64_to_float(self._u)
+
+    @property
+    def bits(self) -> str:
+        """The binary representation of the floating-point number"""
+        if self._bits is None:
+            self._bits = uint64_to_bits(self._u)
+        return self._bits
+
+    @property
+    def exact_decimal(self) -> Decimal:
+        """The exact decimal representation of the floating-point number"""
+        if self._exact_decimal is None:
+            self._exact_decimal = uint64_to_exact_decimal(self._u)
+        return self._exact_decimal
+
+    @property
+    def unbiased_exp(self) -> int:
+        """The unbiased exponent of the floating-point number"""
+        if self._unbiased_exp is None:
+            self._unbiased_exp = unpack_uint64_fp(self._u)[3]
+        return self._unbiased_exp
+
+    def to_fp(self) -> FP:
+        """Return the equivalent, fully materialised FP object
+        """
+        return FP(self.fp, self.bits, self.exact_decimal, self.unbiased_exp)
+
+    def next(self) -> "CompactFP":
+        """Return the next double-precision floating-point number
+        """
+        return CompactFP(next_uint64_fp(self._u))
 
-        Recursive implementation: on each iteration, the number of digits is reduced by one until the resulting decimal number
-        points to a different floating-point number.
+    def fp_gen(self) -> Generator["CompactFP", None, None]:
+        """Return a generator of consecutive CompactFP objects in ascending order and starting from this one
+        In case of reaching the values "Infinity" or "NaN", the generator throws an OverflowError.
         """
+        assert self.fp >= 0, "seed must be positive or zero"
+        u = self._u
+        while True:
+            yield CompactFP(u)
+            u = next_uint64_fp(u)
 
-        fp = FP.from_decimal(Decimal(decimal)).fp
+    def ordinal(self) -> int:
+        """Return the position of this floating-point number on the line of floats, see float_to_ordinal()
+        """
+        return uint64_to_ordinal(self._u)
 
-        def truncate(aux_decimal: Decimal, d: int) -> int:
-            _, digits, exp = aux_decimal.normalize().as_tuple()
-            match exp:
-                case str(exp):
-                    raise ValueError("dec must be a finite number")
-                case _:
-                    exp = int(exp)
+    def skip(self, k: int) -> "CompactFP":
+        """Return the k-th floating-point number after this one (before it for negative k), in O(1)
+        """
+        return CompactFP(ordinal_to_uint64(_skip_ordinal(self.ordinal(), k)))
 
-            dec_len = len(digits)
+    def _d_digit_lattice(self, d: int) -> Tuple[List[Tuple[int, int, int]], int]:
+        """See FP._d_digit_lattice(); the exact decimal is not materialised, the position of its leading digit is
+        floor(log10(|x|)), read from the table of powers of 10 (see float_floor_log10())
+        """
+        x = abs(self.fp)
+        return _d_digit_lattice(self._u, float_floor_log10(x) if x else 0, d)
 
-            # first d-digit number smaller than the given number
-            lower_d_digit_number = Decimal(f"{str(aux_decimal)[:(d if exp >= 0 else d+1)]}{'0' * (dec_len - d)}")
-            if float(lower_d_digit_number) == fp:
-                return truncate(lower_d_digit_number, d - 1)
-            return d + 1
+    def exact_decimal_digits(self, start: int = 0, count: Optional[int] = None) -> Tuple[str, int, int]:
+        """See FP.exact_decimal_digits()
+        """
+        return exact_decimal_digits(self._u, start, count)
 
-        return truncate(Decimal(decimal), len(decimal))
+    ulp_distance = FP.ulp_distance
+    count_d_digit_decimals = FP.count_d_digit_decimals
+    iter_d_digit_decimals = FP.iter_d_digit_decimals
+    get_d_digit_decimals = FP.get_d_digit_decimals
 
     @staticmethod
-    def from_decimal(dec: Decimal) -> "FP":
-        """Return a FP object from the given Decimal number
+    def from_decimal(dec: Decimal) -> "CompactFP":
+        """Return a CompactFP object from the given Decimal number
         """
-        return FP.from_float(float(dec))
+        return CompactFP.from_float(float(dec))
 
     @staticmethod
-    def from_float(f: float) -> "FP":
-        """Return a FP object from the given float number
+    def from_float(f: float) -> "CompactFP":
+        """Return a CompactFP object from the given float number
         """
-        setcontext(Context(prec=400, rounding=ROUND_HALF_UP))
-        bits = from_decimal_to_binary(f)[0]
-        return FP.from_binary(bits)
+        return CompactFP.from_uint64(float_to_uint64(f))
 
     @staticmethod
-    def from_binary(bits: str) -> "FP":
-        """Return a FP from the given binary representation       
+    def from_binary(bits: str) -> "CompactFP":
+        """Return a CompactFP from the given binary representation
         """
-        sign, fraction_bits, exponent_bits, unbiased_exp = unpack_double_precision_fp(bits)
-        check_infinity_or_nan(fraction_bits, exponent_bits)
+        return CompactFP.from_uint64(bits_to_uint64(bits))
 
-        half = Decimal(0.5)
-        mantissa = Decimal(1)
-        for i in range(1, len(fraction_bits) + 1):
-            place_value = fraction_bits[i - 1] * half**i
-            mantissa += place_value
-        exact_decimal = (sign * mantissa * Decimal(2)**unbiased_exp).normalize()
-        return FP(float(exact_decimal), bits, exact_decimal, unbiased_exp)
+    @staticmethod
+    def from_uint64(u: int) -> "CompactFP":
+        """Return a CompactFP from the given bit pattern held in an unsigned 64-bit integer
+
+        Raise OverflowError if the bit pattern is either 'Infinity' or 'NaN', as FP does.
+        """
+        check_infinity_or_nan_uint64(u)
+        return CompactFP(u)
 
 
 class Segment:
-    """Class representing a segment of double-precision floating-point numbers, with the following attributes:
+    """Class representing a segment (binade) of double-precision floating-point numbers, or of the numbers of
+    another binary format, with the following attributes:
     - unbiased_exp: the unbiased exponent that defines the segment
     - min_val: the minimum floating-point number in the segment represented as an exact decimal
     - max_val: the maximum floating-point number in the segment represented as an exact decimal
     - distance: the distance between consecutive binary floating-point numbers in the segment represented as an exact decimal
     - length: the real-number span of the binade (max_val - min_val) represented as an exact decimal
+    - fmt: the binary format of the numbers, FLOAT64 by default
     """
 
-    def __init__(self, unbiased_exp: int, min_val: Decimal, max_val: Decimal, distance: Decimal, length: Decimal) -> None:
+    def __init__(self, unbiased_exp: int, min_val: Decimal, max_val: Decimal, distance: Decimal, length: Decimal,
+                 fmt: BinaryFormat = FLOAT64) -> None:
         self.unbiased_exp = unbiased_exp
         self.min_val = min_val
         self.max_val = max_val
         self.distance = distance
         self.length = length
+        self.fmt = fmt
 
     def __repr__(self):
-        return f"Segment(unbiased_exp={self.unbiased_exp}, min_val={self.min_val}, max_val={self.max_val}, distance={self.distance}, length={self.length})"
+        fmt = "" if self.fmt == FLOAT64 else f", fmt={self.fmt.name}"
+        return f"Segment(unbiased_exp={self.unbiased_exp}, min_val={self.min_val}, max_val={self.max_val}, distance={self.distance}, length={self.length}{fmt})"
 
     def __eq__(self, other):
         return (self.unbiased_exp == other.unbiased_exp
                 and self.min_val == other.min_val
                 and self.max_val == other.max_val
                 and self.distance == other.distance
-                and self.length == other.length)
+                and self.length == other.length
+                and self.fmt == other.fmt)
+
+    def float_index(self, f: float) -> int:
+        """Return the 0-based position of |f| among the 2**52 floats of the segment (2**fraction_bits for other
+        formats), read from its fraction bits
+
+        Raise ValueError if 'f' does not belong to the segment.
+        """
+        fmt = self.fmt
+        if fmt == FLOAT64:
+            u = float_to_uint64(f)
+        else:
+            u = fmt.from_float(f)
+            if fmt.to_float(u) != f:
+                raise ValueError(f"{f!r} is not a {fmt.name} number")
+        if fmt.unpack(u)[3] != self.unbiased_exp:
+            raise ValueError(f"{f!r} does not belong to the segment with unbiased exponent {self.unbiased_exp}")
+        return u & fmt.fraction_mask
+
+    def float_at(self, index: int) -> float:
+        """Return the float at the 0-based position 'index' of the segment, the inverse of float_index()
+        """
+        fmt = self.fmt
+        if not 0 <= index <= fmt.fraction_mask:
+            raise ValueError(f"Index {index} out of the range of the 2**{fmt.fraction_bits} floats of a segment")
+        u = (self.unbiased_exp + fmt.bias) << fmt.fraction_bits | index
+        return uint64_to_float(u) if fmt == FLOAT64 else fmt.to_float(u)
 
     @staticmethod
-    def from_exponent(e: int, ctx: Context) -> "Segment":
-        """Calculate the segment corresponding to the unbiased exponent 'e'
-        """
-        setcontext(ctx)
-        p = 52
-        two = Decimal(2)
-        min_val: Decimal = two**e
-        max_val: Decimal = two**(e + 1) * (1 - two**(-p - 1))
-        distance: Decimal = two**(e - p)
-        length: Decimal = (max_val - min_val).normalize()
-        return Segment(e, min_val.normalize(), max_val.normalize(), distance.normalize(), length)
+    def from_exponent(e: int, ctx: Context, fmt: BinaryFormat = FLOAT64) -> "Segment":
+        """Calculate the segment corresponding to the unbiased exponent 'e' in the binary format 'fmt'
+
+        e = -1023 (all-zero exponent bits) is the segment of zero and the subnormal numbers, [0, 2**-1022)
+        (e = -fmt.bias in other formats)
+
+        Segments are computed under 'ctx' only once per exponent and context precision and then served from a
+        memoised table (see segment_table_info()), or read from a precomputed table (see use_segment_table());
+        the current decimal context is left untouched.
+        """
+        return _segment(e, ctx.prec, ctx.rounding, fmt)
 
     @staticmethod
-    def from_fp(f: float, ctx: Context) -> "Segment":
-        """Calculate the segment containing the given floating-point number 'f'    
+    def from_fp(f: float, ctx: Context, fmt: BinaryFormat = FLOAT64) -> "Segment":
+        """Calculate the segment containing the given floating-point number 'f' (rounded to the format 'fmt')
         """
-        bits: str = from_decimal_to_binary(f)[0]
-        unbiased_exp: int = unpack_double_precision_fp(bits)[3]
-        return Segment.from_exponent(unbiased_exp, ctx)
+        if fmt == FLOAT64:
+            biased_exp: int = (float_to_uint64(f) & EXPONENT_MASK) >> DOUBLE_PRECISION_FRACTION_BITS
+            return _segment(biased_exp - DOUBLE_PRECISION_EXPONENT_BIAS, ctx.prec, ctx.rounding)
+        return _segment(fmt.unpack(fmt.from_float(f))[3], ctx.prec, ctx.rounding, fmt)
+
+    @staticmethod
+    def compute(e: int, prec: int, rounding: str, fmt: BinaryFormat = FLOAT64) -> "Segment":
+        """Compute the segment with unbiased exponent 'e' of the format 'fmt' with 'prec' significant digits and
+        the given rounding mode, every time: from_exponent() memoises it, and building a segment table file or
+        timing the computation need it uncached
+        """
+        with localcontext(Context(prec=prec, rounding=rounding)):
+            p = fmt.fraction_bits
+            two = Decimal(2)
+            if e == fmt.subnormal_unbiased_exp:
+                # zero and the subnormals: no implicit leading 1, same spacing as the smallest normal binade
+                distance: Decimal = two**(e + 1 - p)
+                min_val: Decimal = Decimal(0)
+                max_val: Decimal = two**(e + 1) - distance
+            else:
+                min_val = two**e
+                max_val = two**(e + 1) * (1 - two**(-p - 1))
+                distance = two**(e - p)
+            length: Decimal = (max_val - min_val).normalize()
+            return Segment(e, min_val.normalize(), max_val.normalize(), distance.normalize(), length, fmt)
+
+
+def _segment(e: int, prec: int, rounding: str, fmt: BinaryFormat = FLOAT64) -> Segment:
+    """Return the segment with unbiased exponent 'e' from the precomputed table if it was computed with the same
+    precision and rounding mode, and from the memoised table otherwise
+    """
+    table = _SEGMENT_TABLE
+    if table is not None and fmt == FLOAT64 and table.prec == prec and table.rounding == rounding and e in table:
+        return table.get(e)
+    return _segment_entry(e, prec, rounding, fmt)
 
 
-def get_segments(start: int, end: int, ctx: Context) -> List[Segment]:
-    """Return a list of Segment objects corresponding to the unbiased exponents in the interval [start, end-1]
+def use_segment_table(table) -> None:
+    """Serve Segment.from_exponent(), Segment.from_fp() and get_segments() from 'table' for the precision and
+    rounding mode it was computed with, or stop doing so if 'table' is None
+
+    'table' is typically a segment_table.SegmentTable: the segments are then decoded from a memory-mapped file
+    shared by all the processes instead of being computed and memoised in each of them.
+    """
+    global _SEGMENT_TABLE
+    _SEGMENT_TABLE = table
+
+
+def get_segment_table():
+    """Return the table set with use_segment_table(), or None if the segments are computed and memoised in process
+    """
+    return _SEGMENT_TABLE
+
+
+def _compute_segment_entry(e: int, prec: int, rounding: str, fmt: BinaryFormat = FLOAT64) -> Segment:
+    """Entry of the memoised segment table, see Segment.compute() and Segment.from_exponent()
+    """
+    return Segment.compute(e, prec, rounding, fmt)
+
+
+# wrapped rather than decorated, so that pylint sees the cache_info() and cache_clear() of the lru_cache wrapper
+_segment_entry = lru_cache(maxsize=None)(_compute_segment_entry)
+
+
+def segment_table_info():
+    """Return the hits, misses and current size of the memoised segment table, as functools.lru_cache does
+    """
+    return _segment_entry.cache_info()
+
+
+def segment_table_clear() -> None:
+    """Empty the memoised segment table
     """
-    return [Segment.from_exponent(e, ctx) for e in range(start, end)]
+    _segment_entry.cache_clear()
+
+
+def get_segments(start: int, end: int, ctx: Context, fmt: BinaryFormat = FLOAT64) -> List[Segment]:
+    """Return a list of Segment objects of the format 'fmt' corresponding to the unbiased exponents in the interval [start, end-1]
+
+    The segments are served from the memoised segment table, see Segment.from_exponent().
+    """
+    prec, rounding = ctx.prec, ctx.rounding
+    return [_segment(e, prec, rounding, fmt) for e in range(start, end)]
 
 
 def pretty_print_segments(segments: List[Segment]) -> None:
+    """Print the segments as a table of their unbiased exponent, minimum, maximum and distance, each column as wide
+    as its longest value
+    """
     max_e = 5
-    max_min = max([len(str(segment.min_val)) for segment in segments])
-    max_max = max([len(str(segment.max_val)) for segment in segments])
-    max_distance = max([len(str(segment.distance)) for segment in segments])
+    max_min = max([len("min")] + [len(str(segment.min_val)) for segment in segments])
+    max_max = max([len("max")] + [len(str(segment.max_val)) for segment in segments])
+    max_distance = max([len("distance")] + [len(str(segment.distance)) for segment in segments])
 
-    header = f"| e{'':{max_e-1}}| min{'':{max_min-3}}| max{'':{max_max-3}}| distance{'':{max_distance-len('distance') if len('distance') < max_distance else 1}}|"
-    row_separator = f"|{'-' * (max_e + max_min + max_max + max_distance + 12)}|"
+    header = f"| {'e':^{max_e}}| {'min':{max_min}}| {'max':{max_max}}| {'distance':{max_distance}}|"
+    row_separator = f"|{'-' * (max_e + max_min + max_max + max_distance + 7)}|"
 
-    def prettify(r):
-        return f"| {r[0]:^{max_e}}| {r[1]:{max_min}}| {r[2]:{max_max}}| {r[3]:{max_distance+5}}|"
+    def prettify(segment: Segment) -> str:
+        return f"| {segment.unbiased_exp:^{max_e}}| {str(segment.min_val):{max_min}}| {str(segment.max_val):{max_max}}| {str(segment.distance):{max_distance}}|"
 
     print('\n')
     print(header)
@@ -235,101 +613,375 @@ def pretty_print_segments(segments: List[Segment]) -> None:
 
 
 def tabulate_esegments(start: int, end: int) -> None:
-    segments: List[Segment] = get_segments(start, end, Context(prec=400, rounding=ROUND_HALF_UP))
+    segments: List[Segment] = get_segments(start, end, _CONTEXT)
     pretty_print_segments(segments)
 
 
 def next_n_binary_fp(start: FP, n: int) -> list[FP]:
     """Convenience function to return the next n double-precision floating-point numbers in ascending order
 
-    See next_binary_fp() for more details
+    The numbers are of the same class as 'start': pass a CompactFP to avoid materialising the bits and
+    exact decimal of every number. See next_binary_fp() for more details
     """
     assert n > 0, "n must be a positive integer"
     fp_generator = start.fp_gen()
     return [next(fp_generator) for _ in range(n)]
 
 
+def _float_range_uint64(start: float, count: int, step: int) -> List[range]:
+    """Bit patterns of float_range(), as ranges of unsigned 64-bit integers"""
+    if count < 0:
+        raise ValueError("count must be a non-negative integer")
+    if step == 0:
+        raise ValueError("step must not be zero")
+    u = float_to_uint64(start)
+    check_infinity_or_nan_uint64(u)
+    first = uint64_to_ordinal(u)
+    # stop at the largest finite float on either side
+    available = (MAX_FINITE_ORDINAL - first) // step + 1 if step > 0 else (MAX_FINITE_ORDINAL + first) // -step + 1
+    count = min(count, available)
+    return ordinal_range_to_uint64(range(first, first + count * step, step))
+
+
+def float_range(start: float, count: int, step: int = 1, output: str = "float") -> Iterator:
+    """Return a generator of 'count' consecutive floats starting from 'start', 'step' floats apart
+
+    A negative step walks downwards. The walk crosses zero (yielded once, as 0.0) and the subnormals, and stops
+    early at the largest finite float on either side instead of raising OverflowError like fp_gen().
+    'output' selects what is yielded per float:
+    - 'float': the float itself (converted in bulk, see float_range_array())
+    - 'uint64': its bit pattern as an unsigned 64-bit integer
+    - 'decimal': its exact decimal, only computed on request as it is by far the most expensive
+    """
+    ranges = _float_range_uint64(start, count, step)
+    if output == "float":
+        return (f for r in ranges for i in range(0, len(r), _RANGE_CHUNK) for f in _uint64_to_doubles(r[i:i + _RANGE_CHUNK]))
+    if output == "uint64":
+        return (u for r in ranges for u in r)
+    if output == "decimal":
+        return (uint64_to_exact_decimal(u) for r in ranges for u in r)
+    raise ValueError(f"Unknown output {output!r}: use 'float', 'uint64' or 'decimal'")
+
+
+def float_range_array(start: float, count: int, step: int = 1, typecode: str = "Q") -> array:
+    """Columnar counterpart of float_range() for large counts: return the floats as a single array, either of
+    bit patterns (typecode 'Q') or of floats (typecode 'd'), without creating a Python object per float
+    """
+    if typecode not in ("Q", "d"):
+        raise ValueError(f"Unknown typecode {typecode!r}: use 'Q' or 'd'")
+    bit_patterns = array("Q")
+    for r in _float_range_uint64(start, count, step):
+        bit_patterns.extend(r)
+    return bit_patterns if typecode == "Q" else _uint64_to_doubles(bit_patterns)
+
+
+def _uint64_to_doubles(bit_patterns) -> array:
+    """Reinterpret a sequence of bit patterns as an array of floats"""
+    doubles = array("d")
+    doubles.frombytes(array("Q", bit_patterns).tobytes())
+    return doubles
+
+
+def float_to_ordinal(x: float) -> int:
+    """Return the position of the float 'x' on the line of floats: 0 for both zeros, n for the n-th float above
+    zero and -n for the n-th float below zero, subnormals included
+
+    The ordinal is monotone and consecutive floats have consecutive ordinals, which turns float stepping,
+    counting and ULP distances into integer arithmetic. Raise OverflowError for 'Infinity' and 'NaN'.
+    """
+    u = float_to_uint64(x)
+    check_infinity_or_nan_uint64(u)
+    return uint64_to_ordinal(u)
+
+
+def ordinal_to_float(o: int) -> float:
+    """Return the float with ordinal 'o', the inverse of float_to_ordinal() (0.0 for 0)
+
+    Raise OverflowError if there is no finite float with that ordinal.
+    """
+    if abs(o) > MAX_FINITE_ORDINAL:
+        raise OverflowError("Infinity")
+    return uint64_to_float(ordinal_to_uint64(o))
+
+
+def _skip_ordinal(o: int, k: int) -> int:
+    """Return the ordinal k floats after ordinal 'o', raising OverflowError beyond the largest finite float"""
+    o += k
+    if abs(o) > MAX_FINITE_ORDINAL:
+        raise OverflowError("Infinity")
+    return o
+
+
+def float_after(x: float, k: int) -> float:
+    """Return the k-th float after 'x' (before it for negative k) in O(1), instead of k calls to FP.next()
+
+    float_after(1.0, 1) == math.nextafter(1.0, math.inf)
+    """
+    return uint64_to_float(ordinal_to_uint64(_skip_ordinal(float_to_ordinal(x), k)))
+
+
+def ulp_distance(x: float, y: float) -> int:
+    """Return the number of floats from 'x' to 'y', i.e. how many ULPs apart they are: negative if y < x,
+    0 for equal floats (and for 0.0 and -0.0)
+    """
+    return float_to_ordinal(y) - float_to_ordinal(x)
+
+
+def count_floats(a: float, b: float) -> int:
+    """Return the number of floats in the interval [a, b], zero counted once, or 0 if b < a
+    """
+    return max(0, ulp_distance(a, b) + 1)
+
+
 def identify_surrounding_powers_of_2_and_10(x: float) -> List[Tuple[int, int]]:
     """Given a float, calculate the nearest powers of 10 and 2 and return them in ascending order
 
     72057594037927956 -> [(10, 16), (2, 56), (10, 17), (2, 57)] that reads: 
     10^16 < 2^56 < 72057594037927956 < 10^17 < 2^57
 
+    The exponents are exact, also at and next to exact powers where floor(log2(x)) and floor(log10(x)) can be
+    off by one: see float_floor_log2() and float_floor_log10(). The four powers are ordered by their position in
+    the interleaving map of the powers of 2 and 10 (see powers_of_2_and_10_interleaving()).
+
     https://www.exploringbinary.com/how-the-positive-powers-of-ten-and-two-are-interleaved/
     https://www.exploringbinary.com/7-bits-are-not-enough-for-2-digit-accuracy/
     """
-    previous_power_of_2 = floor(log2(x))
-    previous_power_of_10 = floor(log10(x))
+    previous_power_of_2 = float_floor_log2(x)
+    previous_power_of_10 = float_floor_log10(x)
     next_power_of_2 = previous_power_of_2 + 1
     next_power_of_10 = previous_power_of_10 + 1
-    return sorted([(2, previous_power_of_2), (10, previous_power_of_10), (2, next_power_of_2), (10, next_power_of_10)], key=lambda x: x[0]**x[1])
+    position = _interleaving_positions()
+    return sorted([(2, previous_power_of_2), (10, previous_power_of_10), (2, next_power_of_2), (10, next_power_of_10)], key=position.__getitem__)
+
+
+def identify_surrounding_powers_of_2_and_10_bulk(values: Iterable[float]) -> List[List[Tuple[int, int]]]:
+    """identify_surrounding_powers_of_2_and_10() for every value in 'values' (see fparray.surrounding_powers()
+    for NumPy arrays)
+    """
+    return [identify_surrounding_powers_of_2_and_10(x) for x in values]
+
+
+def float_floor_log2(x: float) -> int:
+    """Return floor(log2(x)) for a positive finite float, exactly: the unbiased exponent of a normal number,
+    or the position of the leading fraction bit of a subnormal one
+    """
+    u = _positive_finite_uint64(x)
+    biased_exp = u >> DOUBLE_PRECISION_FRACTION_BITS
+    if biased_exp == 0:
+        return u.bit_length() - 1 + SUBNORMAL_UNBIASED_EXP + 1 - DOUBLE_PRECISION_FRACTION_BITS
+    return biased_exp - DOUBLE_PRECISION_EXPONENT_BIAS
+
+
+def float_floor_log10(x: float) -> int:
+    """Return floor(log10(x)) for a positive finite float, exactly, by bisecting the table of the smallest
+    floats that are greater than or equal to each power of 10 (see power_of_10_thresholds())
+    """
+    _positive_finite_uint64(x)
+    return bisect_right(power_of_10_thresholds(), x) - 1 + MIN_POWER_OF_10
+
+
+def _positive_finite_uint64(x: float) -> int:
+    """Return the bit pattern of 'x', raising ValueError unless it is a positive finite float"""
+    u = float_to_uint64(x)
+    if u & SIGN_MASK or u == 0 or u & EXPONENT_MASK == EXPONENT_MASK:
+        raise ValueError(f"{x!r} must be a positive finite number")
+    return u
+
+
+@lru_cache(maxsize=None)
+def power_of_10_thresholds() -> Tuple[float, ...]:
+    """Return, for k from MIN_POWER_OF_10 to MAX_POWER_OF_10, the smallest float greater than or equal to 10**k
+    (Infinity past the largest float), so that x >= 10**k if and only if x >= thresholds[k - MIN_POWER_OF_10]
+
+    The table is built once, exactly, from rational powers of 10.
+    """
+    thresholds = []
+    for k in range(MIN_POWER_OF_10, MAX_POWER_OF_10 + 1):
+        power = Fraction(10)**k
+        if power > _MAX_DOUBLE:
+            thresholds.append(inf)
+            continue
+        threshold = float(power)
+        if Fraction(threshold) < power:
+            threshold = nextafter(threshold, inf)
+        thresholds.append(threshold)
+    return tuple(thresholds)
+
+
+def _power_of_2_less_than_power_of_10(a: int, b: int) -> bool:
+    """Return whether 2**a < 10**b, exactly: 2**a < 10**b if and only if 2**(a - b) < 5**b"""
+    c = a - b
+    if b >= 0:
+        return c < 0 or 1 << c < 5**b
+    return c < 0 and 5**-b < 1 << -c
+
+
+@lru_cache(maxsize=None)
+def powers_of_2_and_10_interleaving() -> Tuple[Tuple[int, int], ...]:
+    """Return every power of 2 and of 10 that bounds a positive finite float, from 10**-324 and 2**-1074 up to
+    2**1024 and 10**309, as (base, exponent) pairs in ascending order of value (1 appears as both (2, 0) and
+    (10, 0), in that order)
+
+    The map is built once by merging both sequences with exact integer comparisons.
+    """
+    interleaving: List[Tuple[int, int]] = []
+    a, b = MIN_POWER_OF_2, MIN_POWER_OF_10
+    while a <= MAX_POWER_OF_2 or b <= MAX_POWER_OF_10:
+        if b > MAX_POWER_OF_10 or (a <= MAX_POWER_OF_2 and (a == b == 0 or _power_of_2_less_than_power_of_10(a, b))):
+            interleaving.append((2, a))
+            a += 1
+        else:
+            interleaving.append((10, b))
+            b += 1
+    return tuple(interleaving)
+
+
+@lru_cache(maxsize=None)
+def _interleaving_positions() -> Dict[Tuple[int, int], int]:
+    """Position of each (base, exponent) pair in powers_of_2_and_10_interleaving()"""
+    return {power: i for i, power in enumerate(powers_of_2_and_10_interleaving())}
+
+
+def _floor_log2(q: Fraction) -> int:
+    """Return floor(log2(q)) for a positive Fraction, exactly"""
+    e = q.numerator.bit_length() - q.denominator.bit_length()
+    return e if q >= Fraction(2)**e else e - 1
+
+
+def _floor_log10(q: Fraction) -> int:
+    """Return floor(log10(q)) for a positive Fraction, exactly"""
+    j = len(str(q.numerator)) - len(str(q.denominator))
+    return j if q >= Fraction(10)**j else j - 1
+
+
+def _d_digit_decimals_collide(x: Fraction, y: Fraction, fmt: BinaryFormat = FLOAT64) -> bool:
+    """Return whether the decimals x and y round to the same floating-point number of the format 'fmt'"""
+    if fmt == FLOAT64:
+        return float(x) == float(y)
+    return fmt.round_fraction(x) == fmt.round_fraction(y)
+
+
+def _first_collision_in_piece(n_lo: int, n_hi: int, s: Fraction, u: Fraction, fmt: BinaryFormat = FLOAT64) -> Optional[int]:
+    """Return the smallest n in [n_lo, n_hi] such that the lattice points n * s and (n + 1) * s round to the
+    same multiple of u, or None. All of them must lie within one binade, where the floats are the multiples of u.
+
+    With r = s / u = P / Q, n * s and (n + 1) * s can only round to the same float if no rounding boundary
+    (an odd multiple of u / 2) lies strictly between them, i.e. if (2 * P * n + Q) % (2 * Q) <= 2 * (Q - P).
+    The smallest such n is found with first_multiple_mod_in_range(). The condition treats ties as collisions,
+    so each candidate is confirmed with an exact conversion and the search resumes after a false positive.
+    """
+    if s >= u:
+        # decimals more than one float apart never round to the same float (s == u only happens for s = u = 1)
+        return None
+    r = s / u
+    p, q = r.numerator, r.denominator
+    a, m, c = 2 * p % (2 * q), 2 * q, 2 * (q - p)
+    while n_lo <= n_hi:
+        b = (a * n_lo + q) % m
+        k = 0 if b <= c else first_multiple_mod_in_range(a, m, m - b, m - b + c)
+        if k is None or n_lo + k > n_hi:
+            return None
+        n = n_lo + k
+        if _d_digit_decimals_collide(n * s, (n + 1) * s, fmt):
+            return n
+        n_lo = n + 1
+    return None
+
+
+def find_precision_collision(start: Decimal, end: Decimal, d: int) -> Optional[Decimal]:
+    """Return the smallest d-digit decimal in [start, end] that rounds to the same double-precision floating-point
+    number as the next d-digit decimal, or None if every d-digit decimal in [start, end] maps to a different float
+
+    Instead of walking the floats in the interval, [start, end] is split at the powers of 2 and 10 into pieces with
+    a constant float spacing u (the ULP of the binade) and a constant d-digit decimal spacing s. A piece with s >= u
+    cannot have collisions; otherwise the first colliding lattice point is found in closed form (see
+    _first_collision_in_piece()). The pairs of decimals straddling a piece boundary are checked directly.
+
+    Requires 0 < start <= end <= the largest double-precision floating-point number.
+    """
+    if d < 1:
+        raise ValueError("Number of digits must be a positive integer")
+    return _find_precision_collision(Fraction(start), Fraction(end), d)
+
+
+def _find_precision_collision(lo: Fraction, hi: Fraction, d: int, fmt: BinaryFormat = FLOAT64) -> Optional[Decimal]:
+    """find_precision_collision() over an interval [lo, hi] given as Fractions, for the numbers of the format 'fmt'
+    """
+    max_finite = _MAX_DOUBLE if fmt == FLOAT64 else fmt.to_fraction(fmt.max_finite)
+    if not 0 < lo <= hi <= max_finite:
+        raise ValueError(f"The interval must satisfy 0 < start <= end <= the largest {fmt.name} number")
+
+    x = lo
+    while x <= hi:
+        # zero and the subnormals share the float spacing of the smallest normal binade
+        e = max(_floor_log2(x), fmt.subnormal_unbiased_exp + 1)
+        j = _floor_log10(x)
+        u = Fraction(2)**(e - fmt.fraction_bits)
+        s = Fraction(10)**(j - d + 1)
+        b = min(Fraction(2)**(e + 1), Fraction(10)**(j + 1))
+
+        # pairs of lattice points n * s, (n + 1) * s within the piece [x, b) and within [start, end]
+        last = min(-(-b // s) - 1, hi // s)
+        n = _first_collision_in_piece(-(-x // s), last - 1, s, u, fmt)
+        if n is not None:
+            return Decimal(f"{n}E{j - d + 1}")
+
+        # the pair straddling b: the last lattice point below b and the first one at or above b
+        y = -(-b // s) * s
+        if lo <= y - s and y <= hi and _d_digit_decimals_collide(y - s, y, fmt):
+            return Decimal(f"{-(-b // s) - 1}E{j - d + 1}")
+        x = b
+    return None
 
 
 def is_segment_precision(start: Decimal, end: Decimal, d: int) -> bool:
     """Determines whether the precision of the segment [start, end] is 'd' digits
 
     The precision of the segment is 'd' digits if each d-digit number in the segment maps to
-    a different double-precision floating-point number
+    a different double-precision floating-point number. See find_precision_collision() for the method.
     """
-    generator = FP.from_decimal(start).fp_gen()
-    current_fp: FP = next(generator)
-    num_mapped_decimals = current_fp.get_d_digit_decimals(d)[0]
-    while num_mapped_decimals < 2 and current_fp.exact_decimal < end:
-        current_fp = next(generator)
-        num_mapped_decimals = current_fp.get_d_digit_decimals(d)[0]
-
-    if num_mapped_decimals < 2:
+    witness = find_precision_collision(start, end, d)
+    if witness is None:
         return True
 
-    print(f"{num_mapped_decimals} {d}-digit decimals mapped to {current_fp.exact_decimal.normalize()}")
+    neighbour = _CONTEXT.add(witness, _CONTEXT.scaleb(1, witness.as_tuple().exponent))
+    print(f"{d}-digit decimals {witness} and {neighbour} mapped to {FP.from_decimal(witness).exact_decimal}")
     return False
 
 
-def print_decimal(fp: FP) -> None:
-    _, digits, exp = fp.exact_decimal.normalize().as_tuple()
-    print(f"Decimal: {fp.exact_decimal}, digits: {digits}, exp: {exp}, len(digits): {len(digits)}")
+@lru_cache(maxsize=None)
+def segment_precision(e: int, fmt: BinaryFormat = FLOAT64) -> int:
+    """Return the guaranteed decimal precision of the segment with unbiased exponent 'e': the largest d such that
+    every d-digit decimal between its smallest and largest float maps to a different floating-point number
+
+    e = -1023 is the range of the subnormals, from the smallest subnormal to the largest one (e = -fmt.bias in
+    other formats). The result is 0 when not even 1-digit decimals are guaranteed to map to different floats.
+    """
+    p = fmt.fraction_bits
+    if e == fmt.subnormal_unbiased_exp:
+        smallest = Fraction(2)**(e + 1 - p)
+        start, end = smallest, Fraction(2)**(e + 1) - smallest
+    elif fmt.subnormal_unbiased_exp < e <= fmt.max_unbiased_exp:
+        start, end = Fraction(2)**e, Fraction(2)**(e + 1) - Fraction(2)**(e - p)
+    else:
+        raise ValueError(f"Unbiased exponent {e} out of the range of finite {fmt.name} numbers")
+
+    d = 0
+    # a (d-1)-digit decimal is also a d-digit decimal, so the precision is the first d that fails minus 1
+    while _find_precision_collision(start, end, d + 1, fmt) is None:
+        d += 1
+    return d
+
+
+def segment_precision_table(fmt: BinaryFormat = FLOAT64) -> Dict[int, int]:
+    """Return the guaranteed decimal precision of every segment of the format 'fmt', keyed by unbiased exponent
+    (-1023 for the subnormals of float64)
+
+    See segment_precision(). The table is computed once and cached.
+    """
+    return {e: segment_precision(e, fmt) for e in range(fmt.subnormal_unbiased_exp, fmt.max_unbiased_exp + 1)}
 
 
-if __name__ == "__main__":
-    # print(mpf(7.1))
-    # print(to_double_precision_floating_point_binary(7.2))
-    # print(to_single_precision_floating_point_binary_manual(52))
-    # print(double_precision_significant_digits("72057594037927956"))
-    # print(identify_range(1023.999999999999887))
-    # print(identify_range(72057594037927956))
-    # print(segment_params(9, Context(prec=100, rounding=ROUND_HALF_UP)))
-    # print(explore_segment_precision(mpf(1023), mpf(1024), mpf(1e-18)))
-    # fp_generator = fp_gen(72057594037927870)
-    # print(next(fp_generator))
-    # print(next(fp_generator))
-    # print(next(fp_generator))
-    # print(next(fp_generator))
-    # print(next(fp_generator))
-    # print(next(fp_generator))
-    # print(next(fp_generator))
-    # print(get_n_fp(72057594037927956, 3))
-    # print(normalise_to_significant_digits(72057594037927956, 16))
-    # print(normalise_to_significant_digits(0.0454, 1))
-    # print(FP.from_float(1023.99999999999988))
-    # print(FP.from_float(0.1))
-    print(FP.from_decimal(Decimal(72057594037927956)).get_d_digit_decimals(18))
-    # print(FP.get_number_significant_digits("1023.99999999999988"))
-
-    # decimal = 72057594037927945
-    # binary_val = to_double_precision_floating_point_binary(decimal)[0]
-    # exact_decimal = to_exact_decimal(str_to_list(binary_val))
-    # print(decimal)
-    # print(binary_val)
-    # print(exact_decimal)
-    # tabulate_esegments(50,59)
-    # print(is_segment_precision(Decimal(72057594037927945), Decimal(72057594037928000), 16))
-    # print(Segment.from_fp(1.0, Context(prec=400, rounding=ROUND_HALF_UP)))
-
-    # print_decimal(FP.from_float(0.1))
-    # print_decimal(FP.from_float(1.1))
-    # print_decimal(FP.from_float(1023.9999999999999))
-    # print_decimal(FP.from_float(72057594037927945))
-    # 0.100000000000000000
-    # 72057594037927945
-    # 0.010000000000000000
-    # 0.10000000000000000
+def print_decimal(fp: FP) -> None:
+    _, digits, exp = fp.exact_decimal.as_tuple()
+    print(f"Decimal: {fp.exact_decimal}, digits: {digits}, exp: {exp}, len(digits): {len(digits)}")
@@ -1,4 +1,7 @@
+import math
+import random
 import pytest
+from decimal import getcontext
 from fp import *
 # from sp_fp import *
 from fputil import *
@@ -111,6 +114,19 @@ def test_segment_from_fp(data, expected):
     assert Segment.from_fp(*data) == expected
 
 
+def test_segment_table_memoised():
+    before = getcontext()
+    prec = before.prec
+    seg = Segment.from_exponent(9, ctx)
+    assert Segment.from_exponent(9, Context(prec=100, rounding=ROUND_HALF_UP)) is seg
+    assert Segment.from_fp(1023.0, ctx) is seg
+    assert Segment.from_exponent(9, Context(prec=400, rounding=ROUND_HALF_UP)) is not seg
+    assert getcontext() is before and getcontext().prec == prec
+    assert segment_table_info().currsize >= 2
+    assert get_segments(8, 11, ctx) == [Segment.from_exponent(e, ctx) for e in (8, 9, 10)]
+    assert get_segments(9, 10, ctx)[0] is seg
+
+
 @pytest.mark.parametrize(
     "exponent,expected_length",
     [
@@ -129,9 +145,10 @@ def test_segment_length(exponent, expected_length):
         (
             0.1, # value
             17, # num significant digits
-            2, # count
+            3, # count
             Decimal('1E-17'), # distance
             [
+                Decimal('0.099999999999999999'),
                 Decimal('0.10000000000000000'),
                 Decimal('0.10000000000000001')
             ]
@@ -139,9 +156,15 @@ def test_segment_length(exponent, expected_length):
         (
             0.01, # value
             17, # num significant digits
-            2, # count
+            8, # count
             Decimal('1E-18'), # distance
             [
+                Decimal('0.0099999999999999994'),
+                Decimal('0.0099999999999999995'),
+                Decimal('0.0099999999999999996'),
+                Decimal('0.0099999999999999997'),
+                Decimal('0.0099999999999999998'),
+                Decimal('0.0099999999999999999'),
                 Decimal('0.010000000000000000'),
                 Decimal('0.010000000000000001')
             ]
@@ -232,3 +255,558 @@ def test_get_d_digit_decimals_invalid_decimal():
     with pytest.raises(ValueError, match="dec must be a finite number"):
         dummy.get_d_digit_decimals(5)
 
+
+def _d_digit_decimals_by_walking(value: float, d: int) -> list:
+    """Reference: step along the d-digit decimals around the float until the conversions change
+
+    Context.next_minus() and next_plus() give the neighbouring d-digit decimals, also across a power of 10.
+    """
+    ctx = Context(prec=d, Emin=-9999, Emax=9999)
+    n = ctx.plus(Decimal(value))
+    while float(n) == value:
+        n = ctx.next_minus(n)
+    numbers = []
+    n = ctx.next_plus(n)
+    while float(n) == value:
+        numbers.append(n)
+        n = ctx.next_plus(n)
+    return numbers
+
+
+@pytest.mark.parametrize(
+    "value,d",
+    [(0.1, 17), (0.1, 18), (1.0, 17), (1.0, 18), (2.0, 17), (0.5, 18), (-1.2, 17), (9007199254740993.0, 17),
+     (72057594037927945.0, 17), (5e-324, 3), (2.2250738585072014e-308, 19), (1.7976931348623157e+308, 18),
+     (1e-299, 17), (1e-300, 17), (-1e-300, 17), (1e22, 17), (1e23, 17), (100.0, 17), (0.001, 18), (1e-323, 2)]
+)
+def test_count_d_digit_decimals_matches_walking(value, d):
+    fp = FP.from_float(value)
+    expected = _d_digit_decimals_by_walking(value, d)
+    count, distance = fp.count_d_digit_decimals(d)
+    assert count == len(expected)
+    assert list(fp.iter_d_digit_decimals(d)) == sorted(expected)
+
+
+def test_d_digit_decimals_across_a_power_of_10():
+    # 1e-299 is just below 10**-299: the decimals above it have their leading digit one position higher
+    count, distance, numbers = FP.from_float(1e-299).get_d_digit_decimals(17)
+    assert count == 8 and distance == Decimal("1E-316")
+    assert str(numbers[0]) == "9.9999999999999993E-300" and str(numbers[-1]) == "1.0000000000000000E-299"
+    assert all(float(n) == 1e-299 and len(n.as_tuple().digits) == 17 for n in numbers)
+    # 1e-300 is just above 10**-300: the decimals below it are ten times closer
+    count, _, numbers = FP.from_float(1e-300).get_d_digit_decimals(17)
+    assert count == 7 and str(numbers[0]) == "9.9999999999999995E-301" and str(numbers[-1]) == "1.0000000000000001E-300"
+    assert all(float(n) == 1e-300 for n in numbers)
+    count, _, numbers = FP.from_float(1e-300).get_d_digit_decimals(17, offset=4, limit=2)
+    assert count == 7 and [str(n) for n in numbers] == ["9.9999999999999999E-301", "1.0000000000000000E-300"]
+    count, _, numbers = FP.from_float(-1e-300).get_d_digit_decimals(17, limit=1)
+    assert count == 7 and str(numbers[0]) == "-1.0000000000000001E-300"
+
+
+def test_count_d_digit_decimals_ties_to_even():
+    # 2**53 + 1 is the midpoint between 2**53 (even significand) and 2**53 + 2 (odd significand)
+    assert FP.from_float(9007199254740992.0).count_d_digit_decimals(16) == (2, Decimal(1))
+    count, _, numbers = FP.from_float(9007199254740992.0).get_d_digit_decimals(16)
+    assert count == 2 and numbers == [Decimal(9007199254740992), Decimal(9007199254740993)]
+    count, _, numbers = FP.from_float(9007199254740994.0).get_d_digit_decimals(16)
+    assert count == 1 and numbers == [Decimal(9007199254740994)]
+
+
+def test_get_d_digit_decimals_large_d_paginated():
+    fp = FP.from_float(0.1)
+    count, distance = fp.count_d_digit_decimals(50)
+    # one ULP of 0.1 is 2**-56: about 2**-57 / 10**-50 lattice points above 0.1 round to it, and ten times as
+    # many below 0.1, where the lattice spacing is 10**-51
+    assert count == 2636779683484746783506125211715698 and distance == Decimal("1E-50")
+    count, _, numbers = fp.get_d_digit_decimals(50, offset=count - 13, limit=3)
+    assert len(numbers) == 3 and Fraction(numbers[1]) - Fraction(numbers[0]) == Fraction(distance)
+    assert all(float(n) == 0.1 for n in numbers)
+    assert float(Fraction(numbers[2]) + 11 * Fraction(distance)) != 0.1
+    assert fp.get_d_digit_decimals(50, offset=count, limit=3)[2] == []
+    with pytest.raises(ValueError):
+        fp.get_d_digit_decimals(50, offset=-1)
+    with pytest.raises(ValueError):
+        fp.get_d_digit_decimals(50, limit=-1)
+
+
+
+@pytest.mark.parametrize(
+    "value",
+    [0.0, -0.0, 5e-324, 2.2250738585072014e-308, 0.1, -1.2, 1023.99999999999983, 72057594037927945.0, 1.7976931348623157e+308]
+)
+def test_uint64_engine_matches_string_engine(value):
+    bits, hexrepr = from_decimal_to_binary(value)
+    u = float_to_uint64(value)
+    assert hex(u) == hexrepr
+    assert uint64_to_bits(u) == bits
+    assert uint64_to_float(u) == value
+    sign, fraction, biased_exp, unbiased_exp = unpack_uint64_fp(u)
+    str_sign, fraction_bits, exponent_bits, str_unbiased_exp = unpack_double_precision_fp(bits)
+    assert (sign, unbiased_exp) == (str_sign, str_unbiased_exp)
+    assert fraction == int(list_to_str(fraction_bits), 2)
+    assert biased_exp == int(list_to_str(exponent_bits), 2)
+    if value != 1.7976931348623157e+308:
+        assert uint64_to_bits(next_uint64_fp(u)) == next_binary_fp(bits)
+
+
+@pytest.mark.parametrize(
+    "bits,expected_message",
+    [
+        ("0111111111110011001100110011001100110011001100110011001100110011", "NaN"),
+        ("0111111111101111111111111111111111111111111111111111111111111111", "Infinity"),
+    ]
+)
+def test_next_uint64_fp_overflow(bits, expected_message):
+    with pytest.raises(OverflowError, match=expected_message):
+        next_uint64_fp(bits_to_uint64(bits))
+
+
+def test_previous_uint64_fp():
+    u = float_to_uint64(1.0)
+    assert previous_uint64_fp(next_uint64_fp(u)) == u
+    assert uint64_to_float(previous_uint64_fp(u)) == 0.9999999999999999
+    assert uint64_to_float(previous_uint64_fp(float_to_uint64(-5e-324))) == -0.0
+    with pytest.raises(OverflowError, match="Zero"):
+        previous_uint64_fp(float_to_uint64(-0.0))
+    with pytest.raises(OverflowError, match="Infinity"):
+        previous_uint64_fp(float_to_uint64(float("inf")))
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        (0.0, "0"),
+        (-0.0, "-0"),
+        (10.0, "1E+1"),
+        (1e22, "1E+22"),
+        (-1.5, "-1.5"),
+        (0.1, "0.1000000000000000055511151231257827021181583404541015625"),
+    ]
+)
+def test_uint64_to_exact_decimal(value, expected):
+    assert str(uint64_to_exact_decimal(float_to_uint64(value))) == expected
+
+
+@pytest.mark.parametrize("value", [5e-324, -5e-324, 2.2250738585072009e-308, 2.2250738585072014e-308, 1e-310, 1.7976931348623157e+308])
+def test_from_float_exact_at_any_magnitude(value):
+    fp = FP.from_float(value)
+    # Decimal(float) is exact, independently of the context precision
+    assert fp.exact_decimal == Decimal(value)
+    assert fp.fp == value
+
+
+def test_from_float_smallest_subnormal_digits():
+    # 2**-1074 has 751 significant digits, more than the 400-digit context
+    _, digits, exp = FP.from_float(5e-324).exact_decimal.as_tuple()
+    assert len(digits) == 751
+    assert exp == -1074
+
+
+def test_compact_fp_matches_fp():
+    compact = CompactFP.from_float(0.00000000000012343)
+    assert compact.to_fp() == FP.from_float(0.00000000000012343)
+    assert compact.next().to_fp() == FP.from_float(0.00000000000012343).next()
+    assert compact.get_d_digit_decimals(17) == FP.from_float(0.00000000000012343).get_d_digit_decimals(17)
+
+
+def test_compact_fp_lazy_and_cached():
+    compact = CompactFP.from_float(0.1)
+    assert not hasattr(compact, "__dict__")
+    assert compact._exact_decimal is None and compact._bits is None
+    assert compact.exact_decimal is compact.exact_decimal
+    assert compact.bits == "0011111110111001100110011001100110011001100110011001100110011010"
+    assert compact.unbiased_exp == -4
+
+
+def test_compact_fp_hashable():
+    generated = next_n_binary_fp(CompactFP.from_float(1.0), 3)
+    index = {fp: i for i, fp in enumerate(generated)}
+    assert index[CompactFP.from_float(1.0000000000000002)] == 1
+    assert CompactFP.from_float(0.0) != CompactFP.from_float(-0.0)
+    assert len({CompactFP.from_float(0.5), CompactFP.from_binary(from_decimal_to_binary(0.5)[0])}) == 1
+
+
+def test_compact_fp_special_values():
+    with pytest.raises(OverflowError, match="Infinity"):
+        CompactFP.from_float(float("inf"))
+    fp_generator = CompactFP.from_float(1.7976931348623157e+308).fp_gen()
+    next(fp_generator)
+    with pytest.raises(OverflowError, match="Infinity"):
+        next(fp_generator)
+
+
+def test_first_multiple_mod_in_range():
+    for m in range(1, 40):
+        for a in range(0, 2 * m):
+            for lo in range(m):
+                for hi in (lo, m - 1):
+                    expected = next((k for k in range(2 * m) if lo <= a * k % m <= hi), None)
+                    assert first_multiple_mod_in_range(a, m, lo, hi) == expected
+
+
+def _first_collision_by_walking(start: Decimal, end: Decimal, d: int):
+    """Reference: walk every d-digit decimal in [start, end] and compare consecutive ones"""
+    previous = None
+    current = start
+    while current <= end:
+        spacing = Decimal(10)**(current.adjusted() - d + 1)
+        current = (current / spacing).to_integral_value(rounding="ROUND_CEILING") * spacing
+        if current > end:
+            break
+        if previous is not None and float(previous) == float(current):
+            return previous
+        previous = current
+        current += spacing
+    return None
+
+
+@pytest.mark.parametrize(
+    "start,end,d",
+    [
+        ("72057594037927945", "72057594037928000", 17),
+        ("72057594037927945", "72057594037928000", 16),
+        ("9007199254740990", "9007199254741100", 16),
+        ("0.09999999999999990", "0.1000000000000002", 17),
+        ("8.5e-323", "1.2e-322", 2),
+        ("1e-322", "1.2e-322", 3),
+        ("1023.99999999999", "1024.00000000001", 17),
+    ]
+)
+def test_find_precision_collision_matches_walking(start, end, d):
+    witness = find_precision_collision(Decimal(start), Decimal(end), d)
+    assert witness == _first_collision_by_walking(Decimal(start), Decimal(end), d)
+
+
+def test_find_precision_collision_witness():
+    witness = find_precision_collision(Decimal(72057594037927945), Decimal(72057594037928000), 16)
+    assert str(witness) == "7.205759403792796E+16"
+    assert float(witness) == float(Decimal("72057594037927970"))
+    assert find_precision_collision(Decimal(1), Decimal(2), 15) is None
+    assert is_segment_precision(Decimal(1), Decimal(2), 15)
+    assert not is_segment_precision(Decimal(72057594037927945), Decimal(72057594037928000), 17)
+
+
+def test_find_precision_collision_invalid_interval():
+    with pytest.raises(ValueError):
+        find_precision_collision(Decimal(0), Decimal(1), 15)
+    with pytest.raises(ValueError):
+        find_precision_collision(Decimal(2), Decimal(1), 15)
+    with pytest.raises(ValueError):
+        find_precision_collision(Decimal(1), Decimal("1e309"), 15)
+
+
+def test_segment_precision_table():
+    table = segment_precision_table()
+    assert len(table) == 2047
+    assert table[SUBNORMAL_UNBIASED_EXP] == 0
+    assert all(table[e] in (15, 16) for e in range(-1022, 1024))
+    assert table[0] == 16 and table[9] == 15
+
+
+@pytest.mark.parametrize(
+    "decimal,expected",
+    [("0.1", 1), ("0.10000000000000001", 1), ("100", 1), ("0.000123", 3), ("123.456", 6), ("-1.5", 2), ("0", 1),
+     ("1023.99999999999988", 17), ("72057594037927956", 16), ("5e-324", 1), ("1.7976931348623157e308", 17),
+     ("0." + "3" * 5000, 16)]
+)
+def test_get_number_significant_digits(decimal, expected):
+    assert FP.get_number_significant_digits(decimal) == expected
+    # the shortest decimal with that many digits round-trips, and none with one digit fewer does
+    f = float(decimal)
+    assert float(f"{f:.{expected - 1}e}") == f
+    if expected > 1:
+        assert float(f"{f:.{expected - 2}e}") != f
+
+
+def test_get_number_significant_digits_invalid():
+    with pytest.raises(ValueError, match="dec must be a finite number"):
+        FP.get_number_significant_digits("inf")
+    with pytest.raises(ValueError):
+        FP.get_number_significant_digits("abc")
+
+
+def test_get_numbers_significant_digits():
+    assert FP.get_numbers_significant_digits(["0.1", "nan", "1023.99999999999988", "x", "1e300"]) == [1, None, 17, None, 1]
+
+
+@pytest.mark.parametrize("value", [0.0, -0.0, 5e-324, -5e-324, 2.2250738585072014e-308, 1.0, -1.0, 1.7976931348623157e+308])
+def test_ordinal_is_monotone_and_invertible(value):
+    u = float_to_uint64(value)
+    o = uint64_to_ordinal(u)
+    assert uint64_to_float(ordinal_to_uint64(o)) == value
+    assert uint64_to_ordinal(float_to_uint64(math.nextafter(value, math.inf))) == o + 1
+    assert uint64_to_ordinal(float_to_uint64(math.nextafter(value, -math.inf))) == o - 1
+
+
+def test_float_range_crosses_zero():
+    assert list(float_range(-1e-323, 5)) == [-1e-323, -5e-324, 0.0, 5e-324, 1e-323]
+    assert list(float_range(1e-323, 5, -1)) == [1e-323, 5e-324, 0.0, -5e-324, -1e-323]
+    assert list(float_range(-1e-323, 3, 2, output="uint64")) == [0x8000000000000002, 0, 2]
+
+
+@pytest.mark.parametrize("start,step", [(1.0, 1), (1.0, -1), (-2.0, -7), (0.1, 1000), (-1e-320, 3), (5e-324, -1)])
+def test_float_range_matches_nextafter(start, step):
+    expected = [start]
+    for _ in range(99):
+        x = expected[-1]
+        for _ in range(abs(step)):
+            x = math.nextafter(x, math.inf if step > 0 else -math.inf)
+        expected.append(0.0 if x == 0 else x)
+    expected[0] = 0.0 if start == 0 else start
+    assert list(float_range(start, 100, step)) == expected
+    assert list(float_range_array(start, 100, step, "d")) == expected
+    assert list(float_range_array(start, 100, step)) == [float_to_uint64(x) for x in expected]
+    assert list(float_range(start, 3, step, output="decimal")) == [Decimal(x) for x in expected[:3]]
+
+
+def test_float_range_stops_at_largest_finite():
+    assert list(float_range(1.7976931348623157e+308, 5, -1))[1] == math.nextafter(1.7976931348623157e+308, 0)
+    assert list(float_range(1.7976931348623157e+308, 5)) == [1.7976931348623157e+308]
+    assert list(float_range(-1.7976931348623157e+308, 5, -1)) == [-1.7976931348623157e+308]
+    assert len(float_range_array(1.0, 10_000_000, 2**60)) == 4
+
+
+def test_float_range_invalid():
+    with pytest.raises(OverflowError):
+        float_range(math.inf, 3)
+    with pytest.raises(ValueError):
+        float_range(1.0, 3, 0)
+    with pytest.raises(ValueError):
+        float_range(1.0, -1)
+    with pytest.raises(ValueError):
+        float_range(1.0, 3, output="bits")
+    with pytest.raises(ValueError):
+        float_range_array(1.0, 3, typecode="f")
+
+
+def test_float_after_and_ulp_distance():
+    assert float_after(1.0, 1) == math.nextafter(1.0, math.inf)
+    assert float_after(1.0, -1) == math.nextafter(1.0, -math.inf)
+    assert float_after(-5e-324, 2) == 5e-324
+    assert float_after(2.0, -(2**52)) == 1.0
+    assert ulp_distance(1.0, 2.0) == 2**52
+    assert ulp_distance(2.0, 1.0) == -(2**52)
+    assert ulp_distance(-0.0, 0.0) == 0
+    assert ulp_distance(-5e-324, 5e-324) == 2
+    assert ulp_distance(-1.7976931348623157e+308, 1.7976931348623157e+308) == 2 * MAX_FINITE_ORDINAL
+    assert count_floats(0.0, 1e-323) == 3
+    assert count_floats(1.0, 2.0) == 2**52 + 1
+    assert count_floats(1.0, 0.5) == 0
+    assert ordinal_to_float(float_to_ordinal(0.1)) == 0.1
+    with pytest.raises(OverflowError):
+        float_after(1.7976931348623157e+308, 1)
+    with pytest.raises(OverflowError):
+        float_to_ordinal(math.nan)
+    with pytest.raises(OverflowError):
+        ordinal_to_float(MAX_FINITE_ORDINAL + 1)
+
+
+def test_fp_skip_and_ulp_distance():
+    fp = FP.from_float(0.1)
+    assert fp.skip(0) == fp
+    assert fp.skip(3) == fp.next().next().next()
+    assert fp.skip(3).ulp_distance(fp) == -3
+    assert CompactFP.from_float(0.1).skip(-1).fp == math.nextafter(0.1, 0)
+    assert CompactFP.from_float(-1.0).ulp_distance(CompactFP.from_float(1.0)) == ulp_distance(-1.0, 1.0)
+
+
+def test_fp_skip_and_ulp_distance_in_other_formats():
+    one = FP.from_float(1.0, FLOAT16)
+    assert one.ordinal() == 0x3C00 and FP.from_float(-1.0, FLOAT16).ordinal() == -0x3C00
+    assert one.skip(3) == one.next().next().next() and one.skip(3).fmt == FLOAT16
+    assert FP.from_pattern(1, BFLOAT16).skip(-2) == FP.from_pattern(BFLOAT16.sign_mask | 1, BFLOAT16)
+    assert FP.from_float(-1.0, FLOAT32).ulp_distance(FP.from_float(1.0, FLOAT32)) == 2 * 0x3F800000
+    assert FP.from_pattern(FLOAT16.max_finite, FLOAT16).skip(-1).fp == 65472.0
+    with pytest.raises(OverflowError):
+        FP.from_pattern(FLOAT16.max_finite, FLOAT16).skip(1)
+    with pytest.raises(ValueError):
+        one.ulp_distance(FP.from_float(1.0))
+    with pytest.raises(ValueError):
+        CompactFP.from_float(1.0).ulp_distance(one)
+
+
+def test_segment_float_index():
+    seg = Segment.from_fp(1.5, ctx)
+    assert seg.float_index(1.0) == 0
+    assert seg.float_index(1.5) == 2**51
+    assert seg.float_index(-1.5) == 2**51
+    assert seg.float_at(2**51) == 1.5
+    assert seg.float_at(2**52 - 1) == math.nextafter(2.0, 0)
+    assert Segment.from_exponent(SUBNORMAL_UNBIASED_EXP, ctx).float_index(1e-323) == 2
+    with pytest.raises(ValueError):
+        seg.float_index(2.0)
+    with pytest.raises(ValueError):
+        seg.float_at(2**52)
+
+
+@pytest.mark.parametrize(
+    "x,expected",
+    [
+        (72057594037927956, [(10, 16), (2, 56), (10, 17), (2, 57)]),
+        (1.0, [(2, 0), (10, 0), (2, 1), (10, 1)]),
+        (1000.0, [(2, 9), (10, 3), (2, 10), (10, 4)]),
+        (1024.0, [(10, 3), (2, 10), (2, 11), (10, 4)]),
+        # 1e23 is the float just below 10**23, where floor(log10(1e23)) == 23
+        (1e23, [(10, 22), (2, 76), (10, 23), (2, 77)]),
+        (5e-324, [(10, -324), (2, -1074), (2, -1073), (10, -323)]),
+        (1.7976931348623157e+308, [(2, 1023), (10, 308), (2, 1024), (10, 309)]),
+    ]
+)
+def test_identify_surrounding_powers_of_2_and_10(x, expected):
+    assert identify_surrounding_powers_of_2_and_10(x) == expected
+
+
+def test_float_floor_logs_exact_at_powers():
+    for k in range(-323, 309):
+        power = Fraction(10)**k
+        for x in (math.nextafter(float(power), 0), float(power), math.nextafter(float(power), math.inf)):
+            assert float_floor_log10(x) == (k if Fraction(x) >= power else k - 1)
+    for e in range(-1074, 1024):
+        x = math.ldexp(1.0, e)
+        assert float_floor_log2(x) == e
+        assert x == 5e-324 or float_floor_log2(math.nextafter(x, 0)) == e - 1
+    with pytest.raises(ValueError):
+        float_floor_log10(0.0)
+    with pytest.raises(ValueError):
+        float_floor_log2(-1.0)
+    with pytest.raises(ValueError):
+        identify_surrounding_powers_of_2_and_10(math.inf)
+
+
+def test_powers_of_2_and_10_interleaving():
+    interleaving = powers_of_2_and_10_interleaving()
+    assert len(interleaving) == (MAX_POWER_OF_2 - MIN_POWER_OF_2 + 1) + (MAX_POWER_OF_10 - MIN_POWER_OF_10 + 1)
+    values = [Fraction(base)**exp for base, exp in interleaving]
+    assert values == sorted(values)
+    assert interleaving[0] == (10, -324) and interleaving[-1] == (10, 309)
+    assert identify_surrounding_powers_of_2_and_10_bulk([1.0, 1000.0]) == [
+        identify_surrounding_powers_of_2_and_10(1.0), identify_surrounding_powers_of_2_and_10(1000.0)]
+
+
+@pytest.mark.parametrize("value", [0.1, -0.1, 1e22, 1e23, 5e-324, 1e-310, 2.0**-1022, 1.7976931348623157e308, 0.0, -0.0, 1.0, 3.0, 2.0**70, 123456789.0])
+def test_exact_decimal_digits(value):
+    exact = uint64_to_exact_decimal(float_to_uint64(value))
+    significant = "".join(map(str, exact.as_tuple().digits))
+    u = float_to_uint64(value)
+    assert exact_decimal_digits(u) == (significant, len(significant), exact.adjusted())
+    assert exact_decimal_digits(u, 0, 5)[0] == significant[:5]
+    assert exact_decimal_digits(u, 3, 7)[0] == significant[3:10]
+    assert exact_decimal_digits(u, len(significant), 5)[0] == ""
+    assert FP.from_float(value).exact_decimal_digits(1, 2) == CompactFP.from_float(value).exact_decimal_digits(1, 2)
+    with pytest.raises(ValueError):
+        exact_decimal_digits(u, -1)
+
+
+def test_exact_decimal_digits_random_bit_patterns():
+    rng = random.Random(0)
+    for _ in range(2000):
+        u = rng.getrandbits(64)
+        if u & EXPONENT_MASK == EXPONENT_MASK:
+            continue
+        exact = uint64_to_exact_decimal(u)
+        assert exact_decimal_digits(u) == ("".join(map(str, exact.as_tuple().digits)), len(exact.as_tuple().digits), exact.adjusted())
+    with pytest.raises(OverflowError):
+        exact_decimal_digits(float_to_uint64(math.inf))
+
+
+def test_exact_decimal_digits_windows():
+    rng = random.Random(1)
+    # random bit patterns, and the floats at and next to every power of 10, where the estimate of 'adjusted' is closest
+    patterns = [rng.getrandbits(63) for _ in range(300)]
+    for k in range(-323, 309):
+        u = float_to_uint64(float(f"1e{k}"))
+        patterns += [u - 1, u, u + 1]
+    for u in patterns:
+        if u & EXPONENT_MASK == EXPONENT_MASK:
+            continue
+        exact = uint64_to_exact_decimal(u)
+        significant = "".join(map(str, exact.as_tuple().digits))
+        start, count = rng.randrange(len(significant) + 2), rng.randrange(80)
+        assert exact_decimal_digits(u, start, count) == (significant[start:start + count], len(significant), exact.adjusted())
+
+
+def test_compact_d_digit_lattice_without_exact_decimal():
+    for value in (0.1, 5e-324, 1e-310, 72057594037927945.0, 1.7976931348623157e308):
+        compact = CompactFP.from_float(value)
+        assert compact.get_d_digit_decimals(17, limit=3) == FP.from_float(value).get_d_digit_decimals(17, limit=3)
+        assert compact._exact_decimal is None
+
+
+def test_binary_format_float64_agrees_with_uint64_functions():
+    rng = random.Random(0)
+    for _ in range(2000):
+        u = rng.getrandbits(64)
+        assert FLOAT64.unpack(u) == unpack_uint64_fp(u)
+        if u & EXPONENT_MASK == EXPONENT_MASK:
+            with pytest.raises(OverflowError):
+                FLOAT64.check_pattern(u)
+            continue
+        f = uint64_to_float(u)
+        assert FLOAT64.to_float(u) == f and FLOAT64.from_float(f) == u
+        assert FLOAT64.rounding_interval(u) == rounding_interval(u)
+        assert FLOAT64.significand_and_exponent(u) == uint64_to_significand_and_exponent(u)
+    assert FLOAT64.decimal_digits == 17 and FLOAT32.decimal_digits == 9 and FLOAT16.decimal_digits == 5
+    assert FLOAT64.max_finite == MAX_FINITE_ORDINAL
+
+
+def test_binary_format_small_formats():
+    assert (FLOAT16.width, FLOAT16.bias, BFLOAT16.bias, FLOAT32.subnormal_unbiased_exp) == (16, 15, 127, -127)
+    assert FLOAT16.to_float(FLOAT16.max_finite) == 65504.0
+    assert FLOAT16.to_float(1) == 2.0**-24 and BFLOAT16.to_float(0x3F80) == 1.0 and FLOAT32.to_float(0x3DCCCCCD) == 0.10000000149011612
+    assert FLOAT16.from_float(65519.99) == FLOAT16.max_finite and FLOAT16.from_float(65520.0) == 0x7C00
+    assert FLOAT16.from_float(-0.0) == 0x8000 and math.isnan(FLOAT16.to_float(FLOAT16.from_float(math.nan)))
+    assert FLOAT16.from_float(2.0**-25) == 0 and FLOAT16.from_float(2.0**-25 + 2.0**-40) == 1
+    assert unpack_double_precision_fp(FLOAT16.to_bits(0x3C01), FLOAT16) == (1, [0] * 9 + [1], [0, 1, 1, 1, 1], 0)
+    assert FLOAT16.exact_decimal(1) == Decimal("5.9604644775390625E-8")
+    with pytest.raises(OverflowError):
+        FLOAT16.next_pattern(FLOAT16.max_finite)
+    with pytest.raises(ValueError):
+        FLOAT16.check_pattern(1 << 16)
+
+
+def test_fp_in_other_formats():
+    fp = FP.from_decimal(Decimal("0.1"), FLOAT32)
+    assert fp.bits == "00111101110011001100110011001101" and fp.fmt == FLOAT32 and fp.unbiased_exp == -4
+    assert fp.exact_decimal == Decimal("0.100000001490116119384765625")
+    assert fp.next().bits == "00111101110011001100110011001110"
+    assert FP.from_float(0.1, FLOAT32) == fp and FP.from_pattern(0x3DCCCCCD, FLOAT32) == fp
+    # every 7-digit decimal maps to a different float32 around 0.1, 8-digit decimals do not
+    assert fp.count_d_digit_decimals(7)[0] == 1
+    count, _, decimals = fp.get_d_digit_decimals(8)
+    assert decimals == [Decimal("0.099999998"), Decimal("0.099999999"), Decimal("0.10000000")]
+    count, _, decimals = fp.get_d_digit_decimals(9)
+    assert count == 28 and all(FP.from_decimal(dec, FLOAT32) == fp for dec in decimals)
+    # 1.0 is at the bottom of its decade: 0.9998 and 0.9999 round to it as well
+    assert FP.from_pattern(0x3C00, FLOAT16).get_d_digit_decimals(4) == (3, Decimal("0.001"), [Decimal("0.9998"), Decimal("0.9999"), Decimal("1.000")])
+
+
+def test_segments_in_other_formats():
+    ctx = Context(prec=100, rounding=ROUND_HALF_UP)
+    segment = Segment.from_exponent(0, ctx, FLOAT16)
+    assert segment == Segment(0, Decimal(1), Decimal("1.9990234375"), Decimal("0.0009765625"), Decimal("0.9990234375"), FLOAT16)
+    assert segment != Segment.from_exponent(0, ctx)
+    assert Segment.from_fp(1.5, ctx, FLOAT16) == segment and segment.float_index(1.5) == 512 and segment.float_at(512) == 1.5
+    with pytest.raises(ValueError):
+        segment.float_index(1.0001)
+    subnormals = Segment.from_exponent(-15, ctx, FLOAT16)
+    assert subnormals.min_val == 0 and subnormals.distance == Decimal(2)**-24
+    assert [s.unbiased_exp for s in get_segments(14, 16, ctx, FLOAT16)] == [14, 15]
+
+
+def test_segment_precision_of_float16_by_enumeration():
+    from fp import _floor_log10
+
+    def has_collision(lo, hi, d):
+        decimals = set()
+        for k in range(_floor_log10(lo), _floor_log10(hi) + 1):
+            s = Fraction(10)**(k + 1 - d)
+            # the d-digit decimals of the decade [10**k, 10**(k + 1)) that lie in [lo, hi]
+            decimals.update(m * s for m in range(-(-max(lo, Fraction(10)**k) // s), min(hi // s, 10**d - 1) + 1))
+        return len({FLOAT16.round_fraction(x) for x in decimals}) < len(decimals)
+
+    for e in range(-15, 16):
+        first = max(e + 15 << 10, 1)
+        lo, hi = FLOAT16.to_fraction(first), FLOAT16.to_fraction((e + 16 << 10) - 1)
+        d = segment_precision(e, FLOAT16)
+        assert (d == 0 or not has_collision(lo, hi, d)) and has_collision(lo, hi, d + 1), e
+    assert segment_precision_table(FLOAT16)[0] == 4
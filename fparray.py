@@ -0,0 +1,174 @@
+"""Vectorised (NumPy) counterparts of the scalar FP and Segment analysis, for whole arrays of doubles
+
+The input array is reinterpreted in place as unsigned 64-bit integers and every attribute is
+extracted with masks and shifts over the whole array, so no Python object is built per element.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from fp import power_of_10_thresholds, powers_of_2_and_10_interleaving, MIN_POWER_OF_2, MIN_POWER_OF_10
+from fputil import DOUBLE_PRECISION_FRACTION_BITS, DOUBLE_PRECISION_EXPONENT_BIAS, FRACTION_MASK, SIGN_MASK, shortest_decimal_digits
+
+_EXPONENT_ALL_ONES = 0x7FF
+
+
+class FPArray:
+    """Columnar analysis of an array of double-precision floating-point numbers, with the following attributes
+    (one element per input number):
+    - bits: the bit patterns, a zero-copy uint64 view of the input
+    - sign: 1 or -1, as FP.from_float(x).exact_decimal's sign
+    - unbiased_exp: the unbiased exponent, as FP.unbiased_exp (-1023 for zero and subnormals, 1024 for Infinity and NaN)
+    - fraction: the 52 fraction bits as an integer
+    - ulp: the distance to the next float of larger magnitude, as float(Segment.from_fp(x).distance) (NaN for Infinity and NaN)
+    - float_index: the 0-based position of |x| among the 2**52 floats of its segment
+    - is_subnormal, is_inf, is_nan: special-value flags
+    - ordinal: the position on the line of floats, as fp.float_to_ordinal(x) (see ordinal())
+    """
+
+    def __init__(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        bits = values.view(np.uint64)
+        biased_exp = ((bits >> np.uint64(DOUBLE_PRECISION_FRACTION_BITS)) & np.uint64(_EXPONENT_ALL_ONES)).astype(np.int16)
+        fraction = bits & np.uint64(FRACTION_MASK)
+        exponent_all_ones = biased_exp == _EXPONENT_ALL_ONES
+
+        self.bits = bits
+        self.sign = np.where(np.signbit(values), -1, 1).astype(np.int8)
+        self.unbiased_exp = biased_exp - np.int16(DOUBLE_PRECISION_EXPONENT_BIAS)
+        self.fraction = fraction
+        self.float_index = fraction
+        self.is_subnormal = (biased_exp == 0) & (fraction != 0)
+        self.is_inf = exponent_all_ones & (fraction == 0)
+        self.is_nan = exponent_all_ones & (fraction != 0)
+        # the subnormals share the spacing of the smallest normal binade, 2**(1 - 1023 - 52)
+        ulp_exp = np.maximum(biased_exp, 1).astype(np.int32) - (DOUBLE_PRECISION_EXPONENT_BIAS + DOUBLE_PRECISION_FRACTION_BITS)
+        self.ulp = np.where(exponent_all_ones, np.nan, np.ldexp(1.0, ulp_exp))
+        self.ordinal = _bits_to_ordinal(bits)
+
+    def __len__(self) -> int:
+        return len(self.bits)
+
+    def __repr__(self):
+        return f"FPArray(size={len(self)})"
+
+
+def analyze(values: np.ndarray) -> FPArray:
+    """Return the columnar analysis of an array of double-precision floating-point numbers
+
+    'values' is reinterpreted without copying when it is already a float64 array.
+    """
+    return FPArray(values)
+
+
+def shortest_digits(values: np.ndarray) -> np.ndarray:
+    """Return the number of significant digits of the shortest decimal of each double as uint8, as
+    fputil.shortest_decimal_digits() element by element (0 for Infinity and NaN)
+
+    Unlike the other attributes, this needs the shortest round-trip decimal of each element, which only repr()
+    produces: it costs a Python call per finite element.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    digits = np.zeros(values.shape, dtype=np.uint8)
+    finite = np.isfinite(values)
+    digits[finite] = list(map(shortest_decimal_digits, values[finite].tolist()))
+    return digits
+
+
+def _bits_to_ordinal(bits: np.ndarray) -> np.ndarray:
+    """Vectorised fputil.uint64_to_ordinal()"""
+    magnitude = (bits & np.uint64(~SIGN_MASK & 0xFFFFFFFFFFFFFFFF)).view(np.int64)
+    return np.where(bits >= np.uint64(SIGN_MASK), -magnitude, magnitude)
+
+
+def ordinal(values: np.ndarray) -> np.ndarray:
+    """Return the ordinals of an array of doubles as int64, as fp.float_to_ordinal() element by element
+
+    Infinities get the ordinals just past the largest finite float; the ordinals of NaNs are meaningless.
+    """
+    return _bits_to_ordinal(np.asarray(values, dtype=np.float64).view(np.uint64))
+
+
+def from_ordinal(ordinals: np.ndarray) -> np.ndarray:
+    """Return the doubles with the given int64 ordinals, as fp.ordinal_to_float() element by element
+    """
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    bits = np.where(ordinals < 0, np.uint64(SIGN_MASK) | (-ordinals).view(np.uint64), ordinals.view(np.uint64))
+    return bits.view(np.float64)
+
+
+def ulp_distance(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Return the absolute number of floats between x and y element by element, as abs(fp.ulp_distance(x, y)),
+    for example to gate numeric regression tests on a maximum ULP error
+
+    The result is uint64: the distance between the two largest floats of opposite signs does not fit in int64.
+    """
+    ox, oy = np.broadcast_arrays(ordinal(x), ordinal(y))
+    ux, uy = ox.view(np.uint64), oy.view(np.uint64)
+    # modulo 2**64 subtraction is exact, since the true distance is below 2**64
+    return np.where(oy >= ox, uy - ux, ux - uy)
+
+
+def floor_log2(values: np.ndarray) -> np.ndarray:
+    """Return floor(log2(x)) exactly for an array of positive finite doubles, as fp.float_floor_log2() element by element
+    """
+    values = _positive_finite(values)
+    bits = values.view(np.uint64)
+    biased_exp = (bits >> np.uint64(DOUBLE_PRECISION_FRACTION_BITS)).astype(np.int64)
+    # subnormals: the position of the leading fraction bit, which frexp() gives exactly
+    subnormal_exp = np.frexp(values)[1].astype(np.int64) - 1
+    return np.where(biased_exp == 0, subnormal_exp, biased_exp - DOUBLE_PRECISION_EXPONENT_BIAS)
+
+
+def floor_log10(values: np.ndarray) -> np.ndarray:
+    """Return floor(log10(x)) exactly for an array of positive finite doubles, as fp.float_floor_log10() element by element
+    """
+    values = _positive_finite(values)
+    return np.searchsorted(_power_of_10_thresholds(), values, side="right") - 1 + MIN_POWER_OF_10
+
+
+def surrounding_powers(values: np.ndarray) -> np.ndarray:
+    """Vectorised fp.identify_surrounding_powers_of_2_and_10(): return an array of shape (n, 4, 2) with, for each value,
+    the four (base, exponent) pairs of the powers of 2 and 10 around it in ascending order
+    """
+    p2 = floor_log2(values)
+    p10 = floor_log10(values)
+    positions_of_2, positions_of_10 = _interleaving_positions()
+    powers = np.stack([
+        np.stack([np.full_like(p2, 2), p2], axis=-1),
+        np.stack([np.full_like(p10, 10), p10], axis=-1),
+        np.stack([np.full_like(p2, 2), p2 + 1], axis=-1),
+        np.stack([np.full_like(p10, 10), p10 + 1], axis=-1),
+    ], axis=1)
+    positions = np.stack([
+        positions_of_2[p2 - MIN_POWER_OF_2],
+        positions_of_10[p10 - MIN_POWER_OF_10],
+        positions_of_2[p2 + 1 - MIN_POWER_OF_2],
+        positions_of_10[p10 + 1 - MIN_POWER_OF_10],
+    ], axis=1)
+    order = np.argsort(positions, axis=1)
+    return np.take_along_axis(powers, order[:, :, np.newaxis], axis=1)
+
+
+@lru_cache(maxsize=None)
+def _power_of_10_thresholds() -> np.ndarray:
+    """fp.power_of_10_thresholds() as an array"""
+    return np.array(power_of_10_thresholds())
+
+
+@lru_cache(maxsize=None)
+def _interleaving_positions():
+    """Positions in fp.powers_of_2_and_10_interleaving() of the powers of 2 and of 10, indexed by exponent - minimum"""
+    interleaving = powers_of_2_and_10_interleaving()
+    positions_of_2 = np.array([i for i, (base, _) in enumerate(interleaving) if base == 2])
+    positions_of_10 = np.array([i for i, (base, _) in enumerate(interleaving) if base == 10])
+    return positions_of_2, positions_of_10
+
+
+def _positive_finite(values: np.ndarray) -> np.ndarray:
+    """Return 'values' as a float64 array, raising ValueError unless all of them are positive and finite"""
+    values = np.asarray(values, dtype=np.float64)
+    if not np.all(np.isfinite(values) & (values > 0)):
+        raise ValueError("All values must be positive finite numbers")
+    return values
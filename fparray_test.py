@@ -0,0 +1,84 @@
+import math
+from decimal import Context, ROUND_HALF_UP, localcontext
+
+import numpy as np
+import pytest
+
+from fp import FP, Segment
+from fp import float_to_ordinal, ulp_distance as scalar_ulp_distance
+from fp import identify_surrounding_powers_of_2_and_10, float_floor_log2, float_floor_log10
+from fparray import analyze, ordinal, from_ordinal, ulp_distance, floor_log2, floor_log10, surrounding_powers, shortest_digits
+from fputil import shortest_decimal_digits
+
+ctx = Context(prec=800, rounding=ROUND_HALF_UP)
+
+VALUES = [0.0, -0.0, 5e-324, 1e-310, 2.2250738585072014e-308, 0.1, -1.2, 1.0, 1023.99999999999983,
+          4503599627370497.0, 72057594037927945.0, -1.7976931348623157e+308]
+
+
+def test_analyze_matches_scalar():
+    result = analyze(np.array(VALUES))
+    for i, value in enumerate(VALUES):
+        fp = FP.from_float(value)
+        seg = Segment.from_fp(value, ctx)
+        assert result.sign[i] == (-1 if math.copysign(1.0, value) < 0 else 1)
+        assert result.unbiased_exp[i] == fp.unbiased_exp == seg.unbiased_exp
+        assert result.fraction[i] == int(fp.bits[12:], 2)
+        assert result.ulp[i] == float(seg.distance)
+        with localcontext(ctx):
+            assert result.float_index[i] == int((abs(fp.exact_decimal) - seg.min_val) / seg.distance)
+        assert not result.is_inf[i] and not result.is_nan[i]
+        assert result.is_subnormal[i] == (value != 0 and abs(value) < 2.2250738585072014e-308)
+
+
+def test_analyze_special_values():
+    result = analyze(np.array([math.inf, -math.inf, math.nan, 1.0]))
+    assert list(result.is_inf) == [True, True, False, False]
+    assert list(result.is_nan) == [False, False, True, False]
+    assert list(result.unbiased_exp[:3]) == [1024, 1024, 1024]
+    assert np.isnan(result.ulp[:3]).all()
+    assert result.ulp[3] == 2.0**-52
+
+
+def test_analyze_is_zero_copy():
+    values = np.linspace(1.0, 2.0, 10)
+    result = analyze(values[::2])
+    assert np.shares_memory(result.bits, values)
+    assert len(result) == 5
+    assert list(result.unbiased_exp) == [0, 0, 0, 0, 0]
+
+
+def test_analyze_rejects_non_numeric():
+    with pytest.raises(ValueError):
+        analyze(np.array(["a"]))
+
+
+def test_shortest_digits_matches_scalar():
+    digits = shortest_digits(np.array(VALUES + [math.inf, -math.inf, math.nan]))
+    assert digits.dtype == np.uint8
+    assert digits.tolist() == [shortest_decimal_digits(value) for value in VALUES] + [0, 0, 0]
+
+
+def test_ordinal_matches_scalar():
+    values = np.array(VALUES)
+    ordinals = ordinal(values)
+    assert ordinals.tolist() == [float_to_ordinal(value) for value in VALUES]
+    assert analyze(values).ordinal.tolist() == ordinals.tolist()
+    assert from_ordinal(ordinals).tolist() == [value + 0.0 for value in VALUES]
+
+
+def test_ulp_distance_matches_scalar():
+    x = np.array(VALUES)
+    y = np.roll(x, 1)
+    assert ulp_distance(x, y).tolist() == [abs(scalar_ulp_distance(a, b)) for a, b in zip(x.tolist(), y.tolist())]
+    assert ulp_distance(np.array([1.0]), 1.0 + 2.0 ** -50).tolist() == [4]
+
+
+def test_surrounding_powers_matches_scalar():
+    values = np.array([abs(value) for value in VALUES if value != 0] + [1e23, 1000.0, 1024.0, 1e-323, 2.0 ** -1030])
+    assert floor_log2(values).tolist() == [float_floor_log2(value) for value in values.tolist()]
+    assert floor_log10(values).tolist() == [float_floor_log10(value) for value in values.tolist()]
+    assert surrounding_powers(values).tolist() == [
+        [list(power) for power in identify_surrounding_powers_of_2_and_10(value)] for value in values.tolist()]
+    with pytest.raises(ValueError):
+        surrounding_powers(np.array([1.0, 0.0]))
@@ -2,9 +2,218 @@
 numbers according to the IEEE 754 standard
 """
 
+import math
 import struct
-from typing import List, Tuple
-from functools import reduce
+from decimal import Context, Decimal
+from fractions import Fraction
+from typing import List, Optional, Tuple
+from functools import lru_cache, reduce
+
+DOUBLE_PRECISION_FRACTION_BITS = 52
+DOUBLE_PRECISION_EXPONENT_BIAS = 1023
+SUBNORMAL_UNBIASED_EXP = -DOUBLE_PRECISION_EXPONENT_BIAS
+SIGN_MASK = 1 << 63
+EXPONENT_MASK = 0x7FF << DOUBLE_PRECISION_FRACTION_BITS
+FRACTION_MASK = (1 << DOUBLE_PRECISION_FRACTION_BITS) - 1
+MAX_FINITE_ORDINAL = 0x7FEFFFFFFFFFFFFF
+
+_DOUBLE = struct.Struct('>d')
+_UINT64 = struct.Struct('>Q')
+_EXACT_CONTEXT = Context(prec=800)
+
+
+class BinaryFormat:
+    """IEEE 754 binary floating-point format, with the following attributes:
+    - name: e.g. 'float32'
+    - exponent_bits: width of the biased exponent field
+    - fraction_bits: width of the fraction field (the precision is fraction_bits + 1 bits, with the implicit leading 1)
+    - bias: exponent bias (2**(exponent_bits - 1) - 1 by default)
+
+    Bit patterns are unsigned integers of 1 + exponent_bits + fraction_bits bits, sign bit first. The methods are
+    the format-generic counterparts of the uint64 functions of this module. The conversions to float and Decimal
+    are exact for the formats whose values are all doubles: float16, bfloat16, float32 and float64 itself.
+    """
+
+    __slots__ = ("name", "exponent_bits", "fraction_bits", "bias")
+
+    def __init__(self, name: str, exponent_bits: int, fraction_bits: int, bias: Optional[int] = None) -> None:
+        if exponent_bits < 2 or fraction_bits < 1:
+            raise ValueError("A binary format needs at least 2 exponent bits and 1 fraction bit")
+        self.name = name
+        self.exponent_bits = exponent_bits
+        self.fraction_bits = fraction_bits
+        self.bias = (1 << (exponent_bits - 1)) - 1 if bias is None else bias
+
+    def __repr__(self):
+        return f"BinaryFormat({self.name!r}, exponent_bits={self.exponent_bits}, fraction_bits={self.fraction_bits}, bias={self.bias})"
+
+    def __eq__(self, other):
+        return isinstance(other, BinaryFormat) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def _key(self) -> Tuple[str, int, int, int]:
+        return (self.name, self.exponent_bits, self.fraction_bits, self.bias)
+
+    @property
+    def width(self) -> int:
+        return 1 + self.exponent_bits + self.fraction_bits
+
+    @property
+    def sign_mask(self) -> int:
+        return 1 << (self.width - 1)
+
+    @property
+    def exponent_mask(self) -> int:
+        return ((1 << self.exponent_bits) - 1) << self.fraction_bits
+
+    @property
+    def fraction_mask(self) -> int:
+        return (1 << self.fraction_bits) - 1
+
+    @property
+    def subnormal_unbiased_exp(self) -> int:
+        """Unbiased exponent of zero and the subnormals (all-zero exponent bits), -1023 for float64"""
+        return -self.bias
+
+    @property
+    def max_unbiased_exp(self) -> int:
+        """Unbiased exponent of the largest finite numbers"""
+        return (1 << self.exponent_bits) - 2 - self.bias
+
+    @property
+    def max_finite(self) -> int:
+        """Bit pattern of the largest finite number"""
+        return self.exponent_mask - 1
+
+    @property
+    def decimal_digits(self) -> int:
+        """Number of significant digits that always round-trip: every float of the format is the nearest float of
+        its shortest decimal, and that decimal never has more digits (17 for float64, 9 for float32)
+
+        The smallest d with 10**(d - 1) > 2**(fraction_bits + 1).
+        """
+        d = 1
+        while 10**(d - 1) <= 1 << (self.fraction_bits + 1):
+            d += 1
+        return d
+
+    def check_pattern(self, u: int) -> None:
+        """Raise ValueError if 'u' is not a bit pattern of the format, and OverflowError if it is 'Infinity' or 'NaN'"""
+        if not 0 <= u < 1 << self.width:
+            raise ValueError(f"{u:#x} is not a {self.width}-bit pattern")
+        if u & self.exponent_mask == self.exponent_mask:
+            raise OverflowError("NaN" if u & self.fraction_mask else "Infinity")
+
+    def unpack(self, u: int) -> Tuple[int, int, int, int]:
+        """Decompose the bit pattern 'u' into sign (1 or -1), fraction, biased exponent and unbiased exponent,
+        as unpack_uint64_fp()
+        """
+        sign = -1 if u & self.sign_mask else 1
+        biased_exp = (u & self.exponent_mask) >> self.fraction_bits
+        return (sign, u & self.fraction_mask, biased_exp, biased_exp - self.bias)
+
+    def to_bits(self, u: int) -> str:
+        """Return the binary string of the bit pattern 'u', MSB first"""
+        return format(u, f"0{self.width}b")
+
+    def significand_and_exponent(self, u: int) -> Tuple[int, int]:
+        """Return M and E such that the magnitude of the finite number with bit pattern 'u' is exactly M * 2**E,
+        as uint64_to_significand_and_exponent()
+        """
+        _, fraction, biased_exp, unbiased_exp = self.unpack(u)
+        if biased_exp == 0:
+            return (fraction, self.subnormal_unbiased_exp + 1 - self.fraction_bits)
+        return (fraction | 1 << self.fraction_bits, unbiased_exp - self.fraction_bits)
+
+    def to_fraction(self, u: int) -> Fraction:
+        """Return the exact value of the finite number with bit pattern 'u' (both zeros give 0)"""
+        self.check_pattern(u)
+        significand, exponent = self.significand_and_exponent(u)
+        value = significand * Fraction(2)**exponent
+        return -value if u & self.sign_mask else value
+
+    def to_float(self, u: int) -> float:
+        """Return the number with bit pattern 'u' as a float, signed zeros, infinities and NaN included"""
+        if not 0 <= u < 1 << self.width:
+            raise ValueError(f"{u:#x} is not a {self.width}-bit pattern")
+        if u & self.exponent_mask != self.exponent_mask:
+            magnitude = float(self.to_fraction(u & ~self.sign_mask))
+        else:
+            magnitude = math.nan if u & self.fraction_mask else math.inf
+        return -magnitude if u & self.sign_mask else magnitude
+
+    def exact_decimal(self, u: int) -> Decimal:
+        """Return the exact decimal value of the finite number with bit pattern 'u', as uint64_to_exact_decimal()"""
+        self.check_pattern(u)
+        return Decimal(self.to_float(u)).normalize(_EXACT_CONTEXT)
+
+    def round_fraction(self, q: Fraction) -> int:
+        """Return the bit pattern of the number of the format nearest to 'q', ties to even, as a correctly rounded
+        conversion does: magnitudes from the midpoint above the largest finite number round to Infinity
+        """
+        sign = self.sign_mask if q < 0 else 0
+        q = abs(q)
+        if q == 0:
+            return sign
+        p = self.fraction_bits
+        e = q.numerator.bit_length() - q.denominator.bit_length()
+        if q < Fraction(2)**e:
+            e -= 1
+        e = max(e, self.subnormal_unbiased_exp + 1)
+        significand = round(q / Fraction(2)**(e - p))
+        if significand == 2 << p:
+            significand, e = 1 << p, e + 1
+        if e > self.max_unbiased_exp:
+            return sign | self.exponent_mask
+        biased_exp = e + self.bias if significand >> p else 0
+        return sign | biased_exp << p | significand & self.fraction_mask
+
+    def from_float(self, f: float) -> int:
+        """Return the bit pattern of the number of the format nearest to 'f', see round_fraction()
+        (Infinity maps to Infinity and NaN to a quiet NaN)
+        """
+        if math.isnan(f):
+            return self.exponent_mask | 1 << (self.fraction_bits - 1)
+        if math.isinf(f):
+            return (self.sign_mask if f < 0 else 0) | self.exponent_mask
+        u = self.round_fraction(Fraction(f))
+        return u | self.sign_mask if math.copysign(1.0, f) < 0 else u
+
+    def next_pattern(self, u: int) -> int:
+        """Return the bit pattern of the next number with the same sign and the next larger magnitude, as
+        next_uint64_fp(): raise OverflowError if the argument or the result is either 'Infinity' or 'NaN'
+        """
+        self.check_pattern(u)
+        u += 1
+        self.check_pattern(u)
+        return u
+
+    def rounding_interval(self, u: int) -> Tuple[Fraction, Fraction, bool]:
+        """Return the interval of real numbers that round to the finite number with bit pattern 'u' under
+        round-half-to-even, and whether its ends are included, as rounding_interval()
+        """
+        self.check_pattern(u)
+        significand, exponent = self.significand_and_exponent(u)
+        biased_exp = (u & self.exponent_mask) >> self.fraction_bits
+        # in units of 2**(exponent - 2)
+        lower = 4 * significand - (1 if significand == 1 << self.fraction_bits and biased_exp > 1 else 2)
+        upper = 4 * significand + 2
+        if significand == 0:
+            lower = -upper
+        unit = Fraction(2)**(exponent - 2)
+        closed = significand % 2 == 0
+        if u & self.sign_mask:
+            return (-upper * unit, -lower * unit, closed)
+        return (lower * unit, upper * unit, closed)
+
+
+FLOAT16 = BinaryFormat("float16", 5, 10)
+BFLOAT16 = BinaryFormat("bfloat16", 8, 7)
+FLOAT32 = BinaryFormat("float32", 8, 23)
+FLOAT64 = BinaryFormat("float64", 11, DOUBLE_PRECISION_FRACTION_BITS)
+FORMATS = {fmt.name: fmt for fmt in (FLOAT16, BFLOAT16, FLOAT32, FLOAT64)}
 
 
 def str_to_list(s: str) -> List[int]:
@@ -42,19 +251,18 @@ def next_binary_value(bits) -> bool:
     return True
 
 
-def unpack_double_precision_fp(bits: str) -> Tuple[int, List[int], List[int], int]:
+def unpack_double_precision_fp(bits: str, fmt: BinaryFormat = FLOAT64) -> Tuple[int, List[int], List[int], int]:
     """Decompose the binary representation of a double-precision floating-point number 
-    into its elements: 
+    (or of a number of the binary format 'fmt') into its elements: 
     - sign
     - fraction bits
     - exponent bits
     - unbiased exponent
     """
-    exponent_bits = bits[1:12]
+    exponent_bits = bits[1:1 + fmt.exponent_bits]
     biased_exp = int(exponent_bits, 2)
-    double_precision_exponent_bias = 1023
-    unbiased_exp = biased_exp - double_precision_exponent_bias
-    fraction_bits = bits[12:]
+    unbiased_exp = biased_exp - fmt.bias
+    fraction_bits = bits[1 + fmt.exponent_bits:]
     sign = 1 if bits[0] == '0' else -1
     return (sign, str_to_list(fraction_bits), str_to_list(exponent_bits), unbiased_exp)
 
@@ -80,10 +288,8 @@ def from_decimal_to_binary(number: float) -> Tuple[str, str]:
 
     7.2 --> ('0100000000011100110011001100110011001100110011001100110011001101', '0x401ccccccccccccd')    
     """
-    packed: bytes = struct.pack('>d', number)
-    bits: str = ''.join(format(byte, '08b') for byte in packed)
-    hexrepr: str = hex(int(bits, 2))
-    return (bits, hexrepr)
+    u: int = float_to_uint64(number)
+    return (uint64_to_bits(u), hex(u))
 
 def next_binary_fp(strbits: str) -> str:
     """Return the binary representation of the next double-precision floating-point number
@@ -123,3 +329,277 @@ def zero_last_n_elements(l: tuple[int, ...], n: int) -> tuple[int, ...]:
     if n < 0 or n > len(l):
         raise ValueError("n must be between 0 and the number of elements in the tuple")
     return l[:-n] + (0,) * n if n > 0 else l
+
+
+def float_to_uint64(number: float) -> int:
+    """Return the bit pattern of a double-precision floating-point number as an unsigned 64-bit integer
+
+    1.0 --> 0x3ff0000000000000
+    """
+    return _UINT64.unpack(_DOUBLE.pack(number))[0]
+
+
+def uint64_to_float(u: int) -> float:
+    """Return the double-precision floating-point number whose bit pattern is the unsigned 64-bit integer 'u'
+
+    0x3ff0000000000000 --> 1.0
+    """
+    return _DOUBLE.unpack(_UINT64.pack(u))[0]
+
+
+def uint64_to_bits(u: int) -> str:
+    """Return the 64-character binary string of the unsigned 64-bit integer 'u', MSB first
+    """
+    return format(u, '064b')
+
+
+def bits_to_uint64(bits: str) -> int:
+    """Return the unsigned 64-bit integer of the given 64-character binary string, MSB first
+    """
+    return int(bits, 2)
+
+
+def unpack_uint64_fp(u: int) -> Tuple[int, int, int, int]:
+    """Integer counterpart of unpack_double_precision_fp(): decompose the bit pattern 'u'
+    of a double-precision floating-point number into its elements:
+    - sign (1 or -1)
+    - fraction (52-bit integer)
+    - biased exponent (11-bit integer)
+    - unbiased exponent
+    """
+    sign = -1 if u & SIGN_MASK else 1
+    biased_exp = (u & EXPONENT_MASK) >> DOUBLE_PRECISION_FRACTION_BITS
+    return (sign, u & FRACTION_MASK, biased_exp, biased_exp - DOUBLE_PRECISION_EXPONENT_BIAS)
+
+
+def uint64_to_exact_decimal(u: int) -> Decimal:
+    """Return the exact decimal value of the finite double-precision floating-point number with bit pattern 'u'
+
+    Decimal(float) converts the integer ratio M / 2**k of the float exactly, at any magnitude and
+    subnormals included, without consulting the decimal context. Trailing zeros are then stripped
+    under _EXACT_CONTEXT, whose precision exceeds the 767 significant digits of the longest double,
+    so the normalisation never rounds.
+
+    0x3fb999999999999a --> Decimal('0.1000000000000000055511151231257827021181583404541015625')
+    """
+    return Decimal(uint64_to_float(u)).normalize(_EXACT_CONTEXT)
+
+
+_LOG10_2 = math.log10(2)
+
+
+@lru_cache(maxsize=4096)
+def _power(base: int, exponent: int) -> int:
+    """base**exponent, memoised: exact_decimal_digits() only needs powers of 5 and 10 below 2**11"""
+    return base**exponent
+
+
+def exact_decimal_digits(u: int, start: int = 0, count: Optional[int] = None) -> Tuple[str, int, int]:
+    """Return a window of the significant digits of the exact decimal value of the finite double-precision
+    floating-point number with bit pattern 'u': (digits, total, adjusted)
+
+    'digits' are the significant digits at 0-based positions start to start + count - 1 (to the last one if
+    'count' is None, fewer past the end), 'total' the number of significant digits of the exact value and
+    'adjusted' the exponent of its leading digit, as in Decimal.adjusted().
+
+    The full expansion is never built. With its significand M made odd, the value is M * 2**E. For E < 0 its
+    expansion M * 5**-E * 10**E ends with a non-zero digit at 10**E, so 'total' is adjusted - E + 1; for E >= 0 it
+    is an integer whose trailing zeros are the factors of 5 of M. The digits up to the end of the window are
+    floor(M * 2**E * 10**(end - 1 - adjusted)), an integer of 'end' digits: the cost grows with the end of the
+    window, not with the length of the expansion (767 digits for some subnormals). 'adjusted' is estimated with
+    floats, to the exact value or one less, and corrected when that integer has one digit too many.
+
+    0x3fb999999999999a, 0, 5 --> ('10000', 55, -1)   (0.1000000000000000055511151231257827021181583404541015625)
+    """
+    if start < 0 or (count is not None and count < 0):
+        raise ValueError("start and count must be non-negative integers")
+    biased_exp = (u & EXPONENT_MASK) >> DOUBLE_PRECISION_FRACTION_BITS
+    significand = u & FRACTION_MASK
+    if biased_exp == 0:
+        if significand == 0:
+            return ("0"[start:None if count is None else start + count], 1, 0)
+        exponent = SUBNORMAL_UNBIASED_EXP + 1 - DOUBLE_PRECISION_FRACTION_BITS
+    else:
+        check_infinity_or_nan_uint64(u)
+        significand |= 1 << DOUBLE_PRECISION_FRACTION_BITS
+        exponent = biased_exp - DOUBLE_PRECISION_EXPONENT_BIAS - DOUBLE_PRECISION_FRACTION_BITS
+    twos = (significand & -significand).bit_length() - 1
+    significand, exponent = significand >> twos, exponent + twos
+    trailing_zeros = 0
+    if exponent > 0:
+        odd = significand
+        while trailing_zeros < exponent and odd % 5 == 0:
+            odd, trailing_zeros = odd // 5, trailing_zeros + 1
+
+    # the float estimate is within 1e-12 of log10: lowered by 1e-9 it is floor(log10) or one less
+    adjusted = math.floor(math.log10(significand) + exponent * _LOG10_2 - 1e-9)
+    while True:
+        total = adjusted - exponent + 1 if exponent < 0 else adjusted + 1 - trailing_zeros
+        end = total if count is None else min(total, start + count)
+        # the leading 'last' digits, at least one so that 'adjusted' is checked
+        last = max(end, 1)
+        scale = last - 1 - adjusted
+        if scale >= 0:
+            leading, shift = significand * _power(5, scale), exponent + scale
+            leading = leading << shift if shift >= 0 else leading >> -shift
+        else:
+            leading = (significand << exponent if exponent >= 0 else significand >> -exponent) // _power(10, -scale)
+        if leading < _power(10, last):
+            break
+        adjusted += 1
+    if start >= end:
+        return ("", total, adjusted)
+    return (f"{leading % _power(10, end - start):0{end - start}d}", total, adjusted)
+
+
+def shortest_decimal_digits(f: float) -> int:
+    """Return the number of significant digits of the shortest decimal that rounds to the finite
+    double-precision floating-point number 'f'
+
+    repr() already produces the shortest round-trip decimal (David Gay's algorithm), so its significand only
+    needs its point and leading/trailing zeros removed. Zero has 1 significant digit.
+
+    0.1 --> 1, 100.0 --> 1, 1023.9999999999999 --> 17
+    Raise ValueError if 'f' is either 'Infinity' or 'NaN'
+    """
+    if f - f != 0:
+        raise ValueError("dec must be a finite number")
+    significand = repr(abs(f)).partition('e')[0].replace('.', '').strip('0')
+    return len(significand) or 1
+
+
+def uint64_to_significand_and_exponent(u: int) -> Tuple[int, int]:
+    """Return the integer significand M and the exponent E such that the magnitude of the
+    double-precision floating-point number with bit pattern 'u' is exactly M * 2**E
+
+    Normal numbers carry the implicit leading 1; zeros and subnormals do not and have E = -1074.
+    """
+    _, fraction, biased_exp, unbiased_exp = unpack_uint64_fp(u)
+    if biased_exp == 0:
+        return (fraction, SUBNORMAL_UNBIASED_EXP + 1 - DOUBLE_PRECISION_FRACTION_BITS)
+    return (fraction | 1 << DOUBLE_PRECISION_FRACTION_BITS, unbiased_exp - DOUBLE_PRECISION_FRACTION_BITS)
+
+
+def rounding_interval(u: int) -> Tuple[Fraction, Fraction, bool]:
+    """Return the interval [lo, hi] of real numbers that round to the finite double-precision floating-point number
+    with bit pattern 'u' under round-half-to-even, and whether its ends are included
+
+    The ends are the midpoints to both neighbours. They are included when the significand is even, as ties round to
+    even. At the bottom of a binade the lower neighbour is twice as close; the interval of the largest double stops
+    at the midpoint to 2**1024, which rounds to Infinity. The interval of a zero is [-2**-1075, 2**-1075].
+    """
+    check_infinity_or_nan_uint64(u)
+    significand, exponent = uint64_to_significand_and_exponent(u)
+    biased_exp = (u & EXPONENT_MASK) >> DOUBLE_PRECISION_FRACTION_BITS
+    # in units of 2**(exponent - 2)
+    lower = 4 * significand - (1 if significand == 1 << DOUBLE_PRECISION_FRACTION_BITS and biased_exp > 1 else 2)
+    upper = 4 * significand + 2
+    if significand == 0:
+        lower = -upper
+    unit = Fraction(2)**(exponent - 2)
+    closed = significand % 2 == 0
+    if u & SIGN_MASK:
+        return (-upper * unit, -lower * unit, closed)
+    return (lower * unit, upper * unit, closed)
+
+
+def check_infinity_or_nan_uint64(u: int) -> None:
+    """Integer counterpart of check_infinity_or_nan(): raise an OverflowError if the bit pattern 'u'
+    corresponds to 'Infinity' or 'NaN', else return None
+    """
+    if u & EXPONENT_MASK == EXPONENT_MASK:
+        if u & FRACTION_MASK == 0:
+            raise OverflowError("Infinity")
+        raise OverflowError("NaN")
+
+
+def next_uint64_fp(u: int) -> int:
+    """Integer counterpart of next_binary_fp(): return the bit pattern of the next double-precision
+    floating-point number, i.e. the one with the same sign and the next larger magnitude
+
+    An overflow of the fraction carries into the exponent, exactly as in next_binary_fp().
+    Raise OverflowError if the argument or the resulting value is either 'Infinity' or 'NaN'
+    """
+    check_infinity_or_nan_uint64(u)
+    u += 1
+    check_infinity_or_nan_uint64(u)
+    return u
+
+
+def previous_uint64_fp(u: int) -> int:
+    """Return the bit pattern of the previous double-precision floating-point number, i.e. the one
+    with the same sign and the next smaller magnitude
+
+    Raise OverflowError if the argument is either 'Infinity' or 'NaN', or if it is a zero
+    (whose magnitude cannot be decreased)
+    """
+    check_infinity_or_nan_uint64(u)
+    if u & ~SIGN_MASK == 0:
+        raise OverflowError("Zero")
+    return u - 1
+
+
+def uint64_to_ordinal(u: int) -> int:
+    """Return the position of the double-precision floating-point number with bit pattern 'u' on the line
+    of floats: 0 for both zeros, n for the n-th float above zero and -n for the n-th float below zero
+
+    The ordinal is monotone, x < y if and only if ordinal(x) < ordinal(y), and consecutive floats have
+    consecutive ordinals across zero, the subnormals and the binade boundaries.
+
+    1.0 --> 0x3ff0000000000000, -5e-324 --> -1
+    """
+    return -(u & ~SIGN_MASK) if u & SIGN_MASK else u
+
+
+def ordinal_to_uint64(o: int) -> int:
+    """Inverse of uint64_to_ordinal(): return the bit pattern of the float with ordinal 'o' (+0.0 for 0)
+    """
+    return SIGN_MASK | -o if o < 0 else o
+
+
+def ordinal_range_to_uint64(ordinals: range) -> List[range]:
+    """Return the bit patterns of the floats with the given ordinals, as at most two ranges of bit patterns
+    (the floats below zero and the ones at or above it, in the order of 'ordinals')
+
+    Bit patterns are sign-magnitude, so they run backwards below zero: u = SIGN_MASK - o for o < 0.
+    """
+    if ordinals.step > 0:
+        split = max(0, min(len(ordinals), (-ordinals.start + ordinals.step - 1) // ordinals.step))
+    else:
+        split = max(0, min(len(ordinals), ordinals.start // -ordinals.step + 1))
+    head, tail = ordinals[:split], ordinals[split:]
+    negative, non_negative = (head, tail) if ordinals.step > 0 else (tail, head)
+    negative = range(SIGN_MASK - negative.start, SIGN_MASK - negative.stop, -negative.step)
+    ranges = [negative, non_negative] if ordinals.step > 0 else [non_negative, negative]
+    return [r for r in ranges if r]
+
+
+def first_multiple_mod_in_range(a: int, m: int, lo: int, hi: int) -> Optional[int]:
+    """Return the smallest k >= 0 such that lo <= (a * k) % m <= hi, or None if there is none
+
+    Requires 0 <= lo <= hi < m. Instead of trying k = 0, 1, 2, ... the problem is reduced, Euclid-like,
+    to the same problem with modulus a (at most half of m), so the cost is O(log m) steps.
+
+    first_multiple_mod_in_range(7, 10, 5, 6) --> 8 (7 * 8 = 56)
+    """
+    frames: List[Tuple[int, int, int]] = []
+    while True:
+        a %= m
+        if lo == 0:
+            k = 0
+            break
+        if a == 0:
+            return None
+        if 2 * a > m:
+            # (m - a) * k % m == m - (a * k % m) whenever the latter is not 0, and lo > 0 excludes 0
+            a, lo, hi = m - a, m - hi, m - lo
+        k = -(-lo // a)
+        if a * k <= hi:
+            break
+        # no multiple of a lies in [lo, hi], so a * k - m * j must wrap for some j >= 1:
+        # look for the smallest such j, which is the same problem with modulus a
+        frames.append((a, m, lo))
+        a, m, lo, hi = -m % a, a, lo % a, hi % a
+    for frame_a, frame_m, frame_lo in reversed(frames):
+        k = -(-(frame_lo + frame_m * k) // frame_a)
+    return k
@@ -0,0 +1,340 @@
+"""Load generator for app.py: a sweep of concurrency levels with throughput, latency percentiles and error rates
+
+    python loadtest.py                                         # start the app locally and sweep 1 to 32 clients
+    python loadtest.py --concurrency 1,4,16 --duration 5 --json report.json
+    python loadtest.py --server single                         # one request at a time, no threads
+    python loadtest.py --offload 2                             # offload mode with 2 worker processes
+    python loadtest.py --inputs distinct                       # every tool request misses the result caches
+    python loadtest.py --url http://127.0.0.1:8080             # a server started otherwise, e.g. by gunicorn
+
+Unless --url is given, the app is started in a child process on a free local port with the Werkzeug server:
+'threaded' (a thread per request, as 'python app.py'), 'single' (one request at a time) or 'processes' (a forked
+process per request). Each concurrency level runs that many client threads for --duration seconds; each client
+sends one request after the other, each on a new connection, drawn from a weighted mix of POST /exact-decimal (with
+a digit count drawn from --digits), POST /segment and GET of the static pages. The latency of a request runs from
+the connection to the last byte of the body. A request fails when the server answers with a 4xx or 5xx status or
+when the connection fails.
+
+The values sent to the tools are either drawn from a small fixed set ('repeated', mostly served from the result
+caches once warm) or random doubles over the whole range ('distinct', every request computed). A warm-up run, not
+reported, precedes the sweep.
+
+The clients are threads of this process: on a machine with few cores they compete with the server for the CPU, so
+compare reports produced on the same machine with the same settings, which the JSON report records.
+"""
+
+import argparse
+import http.client
+import logging
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from bench_results import environment, save_results
+from fputil import uint64_to_float
+
+VERSION = 1
+DEFAULT_CONCURRENCY = (1, 2, 4, 8, 16, 32)
+DEFAULT_DURATION = 10.0
+DEFAULT_WARMUP = 2.0
+DEFAULT_MIX = "exact_decimal=4,segment=3,page=3"
+DEFAULT_DIGITS = (1, 5, 15, 17, 20, 50)
+SERVERS = ("threaded", "single", "processes")
+PERCENTILES = (50, 95, 99)
+
+STATIC_PAGES = ("/", "/exact-decimal", "/segment", "/notes")
+# values of the 'repeated' inputs: the ends of the double range, the subnormals, and values at and next to powers
+# of 2 and 10
+REPEATED_VALUES = ("0.1", "1.0", "0.3", "3.14159", "1e-310", "5e-324", "2.2250738585072014e-308", "4503599627370496",
+                   "9007199254740993", "1e22", "1e23", "123456.789", "-2.5", "1e300", "1.7976931348623157e308", "72057594037927945")
+# largest biased exponent of the finite doubles, shifted into place
+_MAX_FINITE_EXPONENT = 0x7FE
+
+# a request to send: kind, method, path, form body
+Request = Tuple[str, str, str, Optional[Dict[str, str]]]
+# a completed request: kind, status (0 if the connection failed) and seconds
+Sample = Tuple[str, int, float]
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Return the weights of 'kind=weight,...', e.g. 'exact_decimal=4,segment=3,page=3'; raise ValueError if invalid"""
+    weights = {}
+    for item in mix.split(","):
+        kind, _, weight = item.partition("=")
+        kind = kind.strip()
+        if kind not in ("exact_decimal", "segment", "page"):
+            raise ValueError(f"Unknown request kind {kind!r} in the mix (exact_decimal, segment or page)")
+        try:
+            weights[kind] = float(weight) if weight else 1.0
+        except ValueError:
+            raise ValueError(f"Invalid weight {weight!r} for {kind}") from None
+        if not weights[kind] >= 0:
+            raise ValueError(f"Invalid weight {weight!r} for {kind}")
+    if not sum(weights.values()) > 0:
+        raise ValueError("The mix has no request with a positive weight")
+    return weights
+
+
+def _random_value(rng: random.Random) -> str:
+    """Return the shortest repr of a random finite double, uniform over the bit patterns"""
+    exponent = rng.randint(0, _MAX_FINITE_EXPONENT)
+    return repr(uint64_to_float(rng.getrandbits(1) << 63 | exponent << 52 | rng.getrandbits(52)))
+
+
+def request_stream(mix: Dict[str, float], digits: Sequence[int], inputs: str, seed: int) -> Iterator[Request]:
+    """Yield an endless, reproducible sequence of requests drawn from 'mix'"""
+    rng = random.Random(seed)
+    kinds, weights = list(mix), list(mix.values())
+    while True:
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "page":
+            yield kind, "GET", rng.choice(STATIC_PAGES), None
+            continue
+        value = rng.choice(REPEATED_VALUES) if inputs == "repeated" else _random_value(rng)
+        if kind == "exact_decimal":
+            yield kind, "POST", "/exact-decimal", {"decimal": value, "digits": str(rng.choice(digits))}
+        else:
+            yield kind, "POST", "/segment", {"decimal": value}
+
+
+def send(host: str, port: int, request: Request, timeout: float = 30.0) -> Sample:
+    """Send 'request' on a new connection, read the whole response and return its sample"""
+    kind, method, path, form = request
+    headers = {"Accept-Encoding": "gzip"}
+    body = None
+    if form is not None:
+        body = urlencode(form)
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+    start = time.perf_counter()
+    connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        connection.request(method, path, body, headers)
+        response = connection.getresponse()
+        response.read()
+        status = response.status
+    except (OSError, http.client.HTTPException):
+        status = 0
+    finally:
+        connection.close()
+    return kind, status, time.perf_counter() - start
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    """Return the 'p'th percentile of 'sorted_values' by the nearest-rank method (NaN if there is none)"""
+    if not sorted_values:
+        return math.nan
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def _latency_ms(seconds: List[float]) -> Dict[str, float]:
+    seconds = sorted(seconds)
+    latency = {f"p{p}": percentile(seconds, p) * 1000 for p in PERCENTILES}
+    latency["max"] = seconds[-1] * 1000 if seconds else math.nan
+    return latency
+
+
+def summarize(samples: List[Sample], concurrency: int, elapsed: float) -> dict:
+    """Return the report of a concurrency level from its samples"""
+    statuses: Dict[str, int] = {}
+    for _, status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    errors = sum(1 for _, status, _ in samples if not 200 <= status < 400)
+    kinds = {}
+    for kind in sorted({kind for kind, _, _ in samples}):
+        of_kind = [(status, seconds) for k, status, seconds in samples if k == kind]
+        kinds[kind] = {"requests": len(of_kind), "errors": sum(1 for status, _ in of_kind if not 200 <= status < 400),
+                       "latency_ms": _latency_ms([seconds for _, seconds in of_kind])}
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "seconds": elapsed,
+        "throughput": len(samples) / elapsed if elapsed > 0 else math.nan,
+        "latency_ms": _latency_ms([seconds for _, _, seconds in samples]),
+        "errors": errors,
+        "error_rate": errors / len(samples) if samples else math.nan,
+        "statuses": statuses,
+        "kinds": kinds,
+    }
+
+
+def run_level(host: str, port: int, concurrency: int, duration: float, streams: Callable[[int], Iterator[Request]],
+              timeout: float = 30.0) -> dict:
+    """Run 'concurrency' clients for 'duration' seconds, client i sending the requests of streams(i), and return the
+    report of the level; requests in flight at the deadline are completed and counted"""
+    samples: List[Sample] = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+    deadline = start + duration
+
+    def client(i: int) -> None:
+        mine = []
+        for request in streams(i):
+            if time.perf_counter() >= deadline:
+                break
+            mine.append(send(host, port, request, timeout))
+        with lock:
+            samples.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(samples, concurrency, time.perf_counter() - start)
+
+
+def sweep(url: str, concurrency: Sequence[int], duration: float, mix: Dict[str, float], digits: Sequence[int],
+          inputs: str = "repeated", warmup: float = DEFAULT_WARMUP, seed: int = 0, timeout: float = 30.0,
+          progress: Optional[Callable[[dict], None]] = None) -> List[dict]:
+    """Run a level per concurrency in 'concurrency' against the server at 'url' and return their reports"""
+    parts = urlsplit(url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    if warmup > 0:
+        run_level(host, port, 1, warmup, lambda i: request_stream(mix, digits, inputs, seed - 1), timeout)
+    levels = []
+    for level, clients in enumerate(concurrency):
+        # a different stream per client and per level, the same from one run to the next
+        def streams(i: int, level: int = level) -> Iterator[Request]:
+            return request_stream(mix, digits, inputs, seed * 1_000_003 + level * 1009 + i)
+
+        levels.append(run_level(host, port, clients, duration, streams, timeout))
+        if progress is not None:
+            progress(levels[-1])
+    return levels
+
+
+class LocalServer:
+    """Context manager running app.py in a child process on a free local port, with the Werkzeug server 'server'
+    and 'offload' offload workers; entering it returns the base URL"""
+
+    def __init__(self, server: str = "threaded", processes: int = 8, offload: int = 0, startup_timeout: float = 60.0) -> None:
+        if server not in SERVERS:
+            raise ValueError(f"Unknown server {server!r} ({', '.join(SERVERS)})")
+        self.server = server
+        self.processes = processes
+        self.offload = offload
+        self.startup_timeout = startup_timeout
+        self._process: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> str:
+        env = dict(os.environ, FP_OFFLOAD_WORKERS=str(self.offload))
+        self._process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve", self.server, "--processes", str(self.processes)],
+            stdout=subprocess.PIPE, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+        # the child prints its port once it listens; a timer kills it if it never does
+        timer = threading.Timer(self.startup_timeout, self._process.kill)
+        timer.start()
+        try:
+            line = self._process.stdout.readline()
+        finally:
+            timer.cancel()
+        if not line.strip().isdigit():
+            self.__exit__()
+            raise RuntimeError(f"The app did not start (exit status {self._process.returncode})")
+        return f"http://127.0.0.1:{int(line)}"
+
+    def __exit__(self, *exc_info) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            try:
+                self._process.wait(10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+            self._process.stdout.close()
+
+
+def _serve(server: str, processes: int) -> None:
+    """Serve app.py on a free local port and print the port (in the child process of LocalServer)"""
+    from werkzeug.serving import make_server
+
+    from app import app
+
+    # a line per request would cost the server more than some of the requests
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    httpd = make_server("127.0.0.1", 0, app, threaded=server == "threaded",
+                        processes=processes if server == "processes" else 1)
+    print(httpd.server_port, flush=True)
+    httpd.serve_forever()
+
+
+_HEADER = (f"{'clients':>7} {'requests':>9} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} "
+           f"{'errors':>8}")
+
+
+def _row(level: dict) -> str:
+    latency = level["latency_ms"]
+    return (f"{level['concurrency']:>7} {level['requests']:>9} {level['throughput']:>9.1f} {latency['p50']:>9.2f} "
+            f"{latency['p95']:>9.2f} {latency['p99']:>9.2f} {latency['max']:>9.2f} {level['error_rate']:>8.2%}")
+
+
+def _int_list(text: str) -> List[int]:
+    values = [int(value) for value in text.split(",")]
+    if not values or min(values) < 1:
+        raise argparse.ArgumentTypeError("expected positive integers separated by commas")
+    return values
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point: start the app unless --url is given, run the sweep, print it and save it with --json"""
+    parser = argparse.ArgumentParser(description="Drive app.py under load at increasing concurrency and report "
+                                                 "throughput, latency percentiles and error rates")
+    parser.add_argument("--url", help="base URL of a running server; by default the app is started locally")
+    parser.add_argument("--server", choices=SERVERS, default="threaded", help="Werkzeug server of the local app (default: threaded)")
+    parser.add_argument("--processes", type=int, default=8, help="maximum forked processes of --server processes (default: 8)")
+    parser.add_argument("--offload", type=int, default=0, metavar="WORKERS", help="offload workers of the local app (default: 0, off)")
+    parser.add_argument("--concurrency", type=_int_list, default=list(DEFAULT_CONCURRENCY),
+                        help=f"client counts of the sweep (default: {','.join(map(str, DEFAULT_CONCURRENCY))})")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help=f"seconds per level (default: {DEFAULT_DURATION:g})")
+    parser.add_argument("--warmup", type=float, default=DEFAULT_WARMUP, help=f"seconds of unreported warm-up (default: {DEFAULT_WARMUP:g})")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weights of the request kinds (default: {DEFAULT_MIX})")
+    parser.add_argument("--digits", type=_int_list, default=list(DEFAULT_DIGITS),
+                        help=f"digit counts of the exact decimal requests (default: {','.join(map(str, DEFAULT_DIGITS))})")
+    parser.add_argument("--inputs", choices=("repeated", "distinct"), default="repeated",
+                        help="values from a small fixed set, or random doubles (default: repeated)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the request streams")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds before a request fails")
+    parser.add_argument("--json", metavar="FILE", help="also save the report as JSON")
+    parser.add_argument("--serve", choices=SERVERS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.serve:
+        _serve(args.serve, args.processes)
+        return
+    if args.duration <= 0 or args.warmup < 0 or args.timeout <= 0 or args.processes < 1 or args.offload < 0:
+        parser.error("--duration, --timeout and --processes must be positive, --warmup and --offload not negative")
+    if max(args.digits) > 50:
+        parser.error("--digits must be between 1 and 50")
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    settings = {"url": args.url, "server": None if args.url else args.server, "offload": None if args.url else args.offload,
+                "concurrency": args.concurrency, "duration": args.duration, "warmup": args.warmup, "mix": mix,
+                "digits": args.digits, "inputs": args.inputs, "seed": args.seed}
+    if args.server == "processes" and not args.url:
+        settings["processes"] = args.processes
+    print(_HEADER, flush=True)
+    try:
+        if args.url:
+            levels = sweep(args.url, args.concurrency, args.duration, mix, args.digits, args.inputs, args.warmup,
+                           args.seed, args.timeout, lambda level: print(_row(level), flush=True))
+        else:
+            with LocalServer(args.server, args.processes, args.offload) as url:
+                levels = sweep(url, args.concurrency, args.duration, mix, args.digits, args.inputs, args.warmup,
+                               args.seed, args.timeout, lambda level: print(_row(level), flush=True))
+    except RuntimeError as exc:
+        parser.exit(2, f"error: {exc}\n")
+    if args.json:
+        save_results({"version": VERSION, "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "environment": environment(),
+                      "settings": settings, "levels": levels}, args.json)
+
+
+if __name__ == "__main__":
+    main()
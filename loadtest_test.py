@@ -0,0 +1,76 @@
+import itertools
+import json
+import math
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+import loadtest
+from app import app
+from loadtest import LocalServer, main, parse_mix, percentile, request_stream, summarize, sweep
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_percentile_and_summary():
+    values = list(range(1, 101))
+    assert [percentile(values, p) for p in (50, 95, 99, 100)] == [50, 95, 99, 100]
+    assert percentile([7], 99) == 7 and math.isnan(percentile([], 50))
+    level = summarize([("page", 200, 0.001), ("segment", 200, 0.003), ("segment", 503, 0.002), ("page", 0, 0.004)], 2, 2.0)
+    assert level["requests"] == 4 and level["throughput"] == 2.0
+    assert level["errors"] == 2 and level["error_rate"] == 0.5
+    assert level["statuses"] == {"200": 2, "503": 1, "0": 1}
+    assert level["latency_ms"]["p50"] == pytest.approx(2) and level["latency_ms"]["max"] == pytest.approx(4)
+    assert level["kinds"]["segment"] == {"requests": 2, "errors": 1,
+                                         "latency_ms": {"p50": pytest.approx(2), "p95": pytest.approx(3),
+                                                        "p99": pytest.approx(3), "max": pytest.approx(3)}}
+
+
+def test_mix_and_request_stream():
+    assert parse_mix(loadtest.DEFAULT_MIX) == {"exact_decimal": 4, "segment": 3, "page": 3}
+    for invalid in ("exact_decimal=4,other=1", "segment=x", "page=-1", "page=0"):
+        with pytest.raises(ValueError):
+            parse_mix(invalid)
+
+    requests = list(itertools.islice(request_stream(parse_mix("exact_decimal=1,page=1"), [5, 17], "distinct", 1), 200))
+    assert requests == list(itertools.islice(request_stream(parse_mix("exact_decimal=1,page=1"), [5, 17], "distinct", 1), 200))
+    assert {kind for kind, *_ in requests} == {"exact_decimal", "page"}
+    forms = [form for kind, method, path, form in requests if kind == "exact_decimal"]
+    assert {form["digits"] for form in forms} == {"5", "17"}
+    assert len({form["decimal"] for form in forms}) == len(forms) and all(math.isfinite(float(form["decimal"])) for form in forms)
+    assert {path for kind, method, path, form in requests if kind == "page"} == set(loadtest.STATIC_PAGES)
+
+
+def test_sweep(server_url):
+    levels = sweep(server_url, [1, 3], 0.3, parse_mix(loadtest.DEFAULT_MIX), [1, 17, 50], "distinct", warmup=0.1)
+    assert [level["concurrency"] for level in levels] == [1, 3]
+    for level in levels:
+        assert level["requests"] > 0 and level["errors"] == 0 and level["throughput"] > 0
+        assert set(level["kinds"]) <= {"exact_decimal", "segment", "page"}
+        assert level["latency_ms"]["p50"] <= level["latency_ms"]["p95"] <= level["latency_ms"]["p99"] <= level["latency_ms"]["max"]
+
+
+def test_main_report(tmp_path, capsys):
+    path = tmp_path / "report.json"
+    main(["--url", "http://127.0.0.1:1", "--concurrency", "2", "--duration", "0.1", "--warmup", "0", "--json", str(path)])
+    out = capsys.readouterr().out.splitlines()
+    assert out[0].split() == ["clients", "requests", "req/s", "p50", "ms", "p95", "ms", "p99", "ms", "max", "ms", "errors"]
+    assert out[1].split()[0] == "2" and out[1].endswith("100.00%")
+    report = json.loads(path.read_text())
+    assert report["version"] == loadtest.VERSION and report["environment"]["python"]
+    assert report["settings"]["concurrency"] == [2] and report["levels"][0]["statuses"].keys() == {"0"}
+
+
+def test_local_server():
+    with LocalServer("threaded") as url:
+        level = sweep(url, [2], 0.3, parse_mix("page=1,segment=1"), [5], warmup=0)[0]
+    assert level["requests"] > 0 and level["errors"] == 0
+    with pytest.raises(ValueError):
+        LocalServer("gunicorn")
@@ -0,0 +1,234 @@
+"""In-process counters, gauges and latency histograms, exported in the Prometheus text exposition format
+
+Recording a value costs one dictionary lookup and a few additions under the lock of its metric; nothing is
+formatted until the registry is rendered, so the instrumentation is negligible when nobody scrapes. Each process
+has its own registry: behind several worker processes, each one reports its own series.
+
+Timing spans measure a block of code into a histogram:
+
+    with span(STAGE_SECONDS, stage="parse") as labels:
+        ...
+        labels["exponent"] = bucket
+
+Spans run in a worker process by record_spans() are returned with the result instead of being recorded there,
+and replay() records them in the calling process.
+"""
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# upper bounds in seconds, from 10 µs (a cached lookup) to 10 s (a time budget)
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# a span recorded in a worker process: metric name, labels and seconds
+RecordedSpan = Tuple[str, Dict[str, str], float]
+
+_local = threading.local()
+
+
+class Registry:
+    """Named metrics, rendered together"""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric") -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> "_Metric":
+        return self._metrics[name]
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.render() for metric in metrics)
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    """Metric with a fixed set of label names; label values are strings, a missing one is empty"""
+
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), registry: Optional[Registry] = REGISTRY) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._names = frozenset(self.labelnames)
+        self._missing = ("",) * len(self.labelnames)
+        self._series: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r}, labelnames={self.labelnames})"
+
+    def _key(self, labels: Dict[str, str]) -> tuple:
+        if not labels.keys() <= self._names:
+            raise ValueError(f"Unknown labels {sorted(labels.keys() - self._names)} for {self.name}")
+        return tuple(map(labels.get, self.labelnames, self._missing))
+
+    def _labels(self, key: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key) if value]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, value in series:
+            yield f"{self.name}{self._labels(key)} {_number(value)}\n"
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {_escape(self.help_text, quotes=False)}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(self._samples())
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. of errors"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._series.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. requests in flight"""
+
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    def value(self, **labels) -> float:
+        return self._series.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets, with their count and sum"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS,
+                 registry: Optional[Registry] = REGISTRY) -> None:
+        if list(buckets) != sorted(set(buckets)) or not buckets:
+            raise ValueError("Histogram buckets must be increasing")
+        if "le" in labelnames:
+            raise ValueError("'le' is reserved for the bucket bounds")
+        self.buckets = tuple(buckets)
+        super().__init__(name, help_text, labelnames, registry)
+
+    def observe(self, value: float, **labels) -> None:
+        """Count 'value' in its bucket of the series with 'labels', and add it to their sum"""
+        key = self._key(labels)
+        # bucket i counts the values <= buckets[i]; the last one is +Inf
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                yield f"{self.name}_bucket{self._labels(key, le)} {cumulative}\n"
+            yield f"{self.name}_sum{self._labels(key)} {_number(total)}\n"
+            yield f"{self.name}_count{self._labels(key)} {cumulative}\n"
+
+
+def _escape(value: str, quotes: bool = True) -> str:
+    value = value.replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quotes else value
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Span:
+    """Context manager observing the seconds spent in its block into 'histogram', with 'labels' and any label the
+    block adds to the dict it yields; the time is observed when the block raises too"""
+
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, **labels: str) -> None:
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self) -> Dict[str, str]:
+        self.start = time.perf_counter()
+        return self.labels
+
+    def __exit__(self, *exc_info) -> None:
+        elapsed = time.perf_counter() - self.start
+        recorded = getattr(_local, "recorded", None)
+        if recorded is None:
+            self.histogram.observe(elapsed, **self.labels)
+        else:
+            recorded.append((self.histogram.name, self.labels, elapsed))
+
+
+def span(histogram: Histogram, **labels: str) -> Span:
+    """Return a Span timing a block into 'histogram' with 'labels', see Span"""
+    return Span(histogram, **labels)
+
+
+def record_spans(func: Callable, *args) -> Tuple[object, List[RecordedSpan]]:
+    """Return func(*args) and the spans it ran, recorded instead of observed: call it in a worker process and pass
+    the spans to replay() in the parent"""
+    _local.recorded = recorded = []
+    try:
+        return func(*args), recorded
+    finally:
+        _local.recorded = None
+
+
+def replay(spans: List[RecordedSpan], registry: Registry = REGISTRY) -> None:
+    """Observe spans returned by record_spans() into the histograms of the same names in 'registry'"""
+    for name, labels, elapsed in spans:
+        registry.get(name).observe(elapsed, **labels)
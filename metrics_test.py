@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+
+from metrics import Counter, Gauge, Histogram, Registry, record_spans, replay, span
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+def test_counter_and_gauge(registry):
+    errors = Counter("errors_total", "Errors", ["route"], registry=registry)
+    in_flight = Gauge("in_flight", "In flight", registry=registry)
+    errors.inc(route="/a")
+    errors.inc(2, route='/b "quoted"\n')
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+    assert errors.value(route="/a") == 1 and in_flight.value() == 1
+    assert registry.render() == (
+        "# HELP errors_total Errors\n"
+        "# TYPE errors_total counter\n"
+        'errors_total{route="/a"} 1\n'
+        'errors_total{route="/b \\"quoted\\"\\n"} 2\n'
+        "# HELP in_flight In flight\n"
+        "# TYPE in_flight gauge\n"
+        "in_flight 1\n"
+    )
+    with pytest.raises(ValueError):
+        errors.inc(path="/a")
+    with pytest.raises(ValueError):
+        Counter("errors_total", "Again", registry=registry)
+
+
+def test_histogram(registry):
+    latency = Histogram("latency_seconds", "Latency", ["stage", "digits"], buckets=[0.1, 1], registry=registry)
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value, stage="parse")
+    assert latency.count(stage="parse") == 4 and latency.count(stage="other") == 0
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{stage="parse",le="0.1"} 2',
+        'latency_seconds_bucket{stage="parse",le="1"} 3',
+        'latency_seconds_bucket{stage="parse",le="+Inf"} 4',
+        'latency_seconds_sum{stage="parse"} 3.65',
+        'latency_seconds_count{stage="parse"} 4',
+    ]
+    with pytest.raises(ValueError):
+        Histogram("bad", "Bad", buckets=[1, 0.1], registry=None)
+
+
+def test_concurrent_observations(registry):
+    latency = Histogram("latency_seconds", "Latency", ["thread"], registry=registry)
+
+    def observe():
+        for i in range(10000):
+            latency.observe(i * 1e-6, thread="all")
+
+    threads = [threading.Thread(target=observe) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert latency.count(thread="all") == 80000
+    assert 'latency_seconds_count{thread="all"} 80000' in registry.render()
+
+
+def test_span_records_labels_added_in_the_block(registry):
+    stages = Histogram("stage_seconds", "Stages", ["stage", "exponent"], registry=registry)
+    with span(stages, stage="parse") as labels:
+        labels["exponent"] = "0..255"
+    with pytest.raises(ZeroDivisionError):
+        with span(stages, stage="compute"):
+            1 / 0
+    assert stages.count(stage="parse", exponent="0..255") == 1
+    assert stages.count(stage="compute") == 1
+
+
+def timed_square(stages, x):
+    with span(stages, stage="square"):
+        return x * x
+
+
+def test_record_spans_and_replay(registry):
+    stages = Histogram("stage_seconds", "Stages", ["stage"], registry=registry)
+    result, spans = record_spans(timed_square, stages, 7)
+    assert result == 49 and [(name, labels) for name, labels, _ in spans] == [("stage_seconds", {"stage": "square"})]
+    assert stages.count(stage="square") == 0
+    replay(spans, registry)
+    assert stages.count(stage="square") == 1
+    timed_square(stages, 3)
+    assert stages.count(stage="square") == 2
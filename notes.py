@@ -0,0 +1,193 @@
+"""Server-side rendering of the notes page: Markdown to HTML, TeX math to MathML, code highlighted with Pygments
+
+The notes are rendered once on the server instead of in every browser, and the page needs no script: browsers
+lay MathML out natively. The Markdown is parsed by markdown-it-py (CommonMark with GitHub tables and
+strikethrough), the math by its dollarmath plugin: $$...$$ for display math and $...$ within a line for inline math,
+as in the KaTeX version of the page. The TeX is converted to MathML by latex2mathml.
+
+Raw HTML in the notes is escaped rather than passed through, and links and images may only point to http, https,
+relative or '#' URLs, so the rendered page needs no sanitiser. TeX that latex2mathml cannot convert, or leaves as an
+unknown command, and code blocks in a language Pygments does not know raise UnsupportedSyntax with their line
+instead of being rendered as something else. The page itself is served with render_notes_or_fallback(), so that
+such an edit logs the error instead of breaking it.
+"""
+
+import html
+import inspect
+import logging
+import re
+from typing import Dict, Sequence
+
+import latex2mathml.exceptions
+from latex2mathml.converter import convert
+from markdown_it import MarkdownIt
+from markdown_it.token import Token
+from mdit_py_plugins.anchors import anchors_plugin
+from mdit_py_plugins.dollarmath import dollarmath_plugin
+from pygments import highlight
+from pygments.formatters import HtmlFormatter
+from pygments.lexers import get_lexer_by_name
+from pygments.util import ClassNotFound
+
+CODE_STYLE = "github-dark"
+# URL schemes links and images may use; URLs without a scheme (relative paths, '#' anchors) are allowed too
+LINK_SCHEMES = ("http", "https")
+
+_LOGGER = logging.getLogger(__name__)
+
+# last successful render_notes_or_fallback() of each notes file
+_LAST_GOOD: Dict[str, str] = {}
+
+_FORMATTER = HtmlFormatter(style=CODE_STYLE)
+
+# the errors latex2mathml raises on malformed TeX: its own exceptions, and those of its parser on truncated input
+_TEX_ERRORS = (ValueError, IndexError, KeyError) + tuple(
+    cls for _, cls in inspect.getmembers(latex2mathml.exceptions, inspect.isclass) if issubclass(cls, Exception))
+# a TeX command latex2mathml did not know, which it leaves as an identifier
+_UNKNOWN_COMMAND = re.compile(r"<mi>\\[A-Za-z]+</mi>")
+_SCHEME = re.compile(r"^\s*([A-Za-z][A-Za-z0-9+.-]*):")
+
+
+class UnsupportedSyntax(ValueError):
+    """Markdown or TeX the renderer does not support, at the 1-based 'line' of the document (0 if unknown)"""
+
+    def __init__(self, message: str, line: int = 0) -> None:
+        super().__init__(f"Line {line}: {message}" if line else message)
+        self.line = line
+
+
+def tex_to_mathml(tex: str, display: bool = False) -> str:
+    """Return the MathML of the TeX formula 'tex'
+
+    Raise UnsupportedSyntax if latex2mathml cannot convert the formula or leaves one of its commands unknown.
+    """
+    try:
+        mathml = convert(tex.strip(), display="block" if display else "inline")
+    except _TEX_ERRORS as error:
+        raise UnsupportedSyntax(f"Invalid TeX {tex.strip()!r}: {type(error).__name__} {error}".rstrip()) from None
+    unknown = _UNKNOWN_COMMAND.search(mathml)
+    if unknown:
+        raise UnsupportedSyntax(f"Unsupported TeX {unknown[0][4:-5]!r}")
+    return mathml
+
+
+def is_allowed_link(url: str) -> bool:
+    """Return whether a link or image may point to 'url': an http or https URL, or one without a scheme"""
+    scheme = _SCHEME.match(url)
+    return scheme is None or scheme[1].lower() in LINK_SCHEMES
+
+
+def heading_id(text: str) -> str:
+    """Return the anchor of a heading as the client-side renderer made it: lowercase text without punctuation, with
+    hyphens for spaces"""
+    text = html.unescape(re.sub(r"<[^>]+>", "", text)).lower()
+    return re.sub(r"\s+", "-", re.sub(r"[^\w\s-]", "", text, flags=re.ASCII).strip())
+
+
+def highlight_code(code: str, language: str) -> str:
+    """Return a highlighted block of code, or a plain one if no 'language' is given
+
+    Raise UnsupportedSyntax if Pygments has no lexer for 'language'.
+    """
+    if not language:
+        return f"<pre><code>{html.escape(code, quote=False)}</code></pre>\n"
+    try:
+        lexer = get_lexer_by_name(language)
+    except ClassNotFound:
+        raise UnsupportedSyntax(f"Unknown code block language {language!r}") from None
+    return highlight(code, lexer, _FORMATTER)
+
+
+def code_css() -> str:
+    """Return the CSS of the highlighted code blocks"""
+    return _FORMATTER.get_style_defs(".highlight")
+
+
+def _line(token: Token) -> int:
+    """Return the 1-based line of the document 'token' starts on (0 if unknown)"""
+    return token.map[0] + 1 if token.map else 0
+
+
+def _at_line(func, token: Token, *args) -> str:
+    """Return func(*args), with the line of 'token' added to the UnsupportedSyntax it raises"""
+    try:
+        return func(*args)
+    except UnsupportedSyntax as error:
+        if error.line:
+            raise
+        raise UnsupportedSyntax(str(error), _line(token)) from None
+
+
+def _inherit_lines(state) -> None:
+    """Give the inline tokens, which markdown-it leaves without lines, the lines of their block"""
+    for token in state.tokens:
+        for child in token.children or ():
+            if child.map is None:
+                child.map = token.map
+
+
+def _render_fence(_renderer, tokens: Sequence[Token], idx: int, _options, _env) -> str:
+    """Render a fenced code block with highlight_code(), its language being the first word of the info string"""
+    token = tokens[idx]
+    language = token.info.split(maxsplit=1)[0] if token.info.strip() else ""
+    return _at_line(highlight_code, token, token.content, language)
+
+
+def _render_math_inline(_renderer, tokens: Sequence[Token], idx: int, _options, _env) -> str:
+    """Render $...$ math as inline MathML"""
+    return _at_line(tex_to_mathml, tokens[idx], tokens[idx].content)
+
+
+def _render_math_block(_renderer, tokens: Sequence[Token], idx: int, _options, _env) -> str:
+    """Render $$...$$ math as display MathML, in a paragraph of its own"""
+    return f"<p>{_at_line(tex_to_mathml, tokens[idx], tokens[idx].content, True)}</p>\n"
+
+
+def _markdown() -> MarkdownIt:
+    """Return the Markdown renderer of the notes"""
+    md = MarkdownIt("commonmark", {"html": False}).enable(["table", "strikethrough"])
+    md.validateLink = is_allowed_link
+    dollarmath_plugin(md, allow_labels=False, allow_blank_lines=False)
+    anchors_plugin(md, min_level=1, max_level=6, slug_func=heading_id)
+    md.core.ruler.push("inherit_lines", _inherit_lines)
+    md.add_render_rule("fence", _render_fence)
+    md.add_render_rule("math_inline", _render_math_inline)
+    md.add_render_rule("math_block", _render_math_block)
+    return md
+
+
+_MARKDOWN = _markdown()
+
+
+def render_markdown(text: str) -> str:
+    """Return the HTML of a Markdown document
+
+    Raise UnsupportedSyntax, with its line, on TeX or a code block language the renderer does not support.
+    """
+    return _MARKDOWN.render(text)
+
+
+def render_notes(path: str) -> str:
+    """Return the HTML of the Markdown notes file at 'path'
+
+    Raise UnsupportedSyntax on TeX or a code block language the renderer does not support, see render_markdown().
+    """
+    with open(path, encoding="utf-8") as f:
+        return render_markdown(f.read())
+
+
+def render_notes_or_fallback(path: str) -> str:
+    """Return the HTML of the Markdown notes file at 'path', or, if it uses syntax the renderer does not support,
+    its last good render (its escaped source before any) under a notice, and log the error
+    """
+    try:
+        rendered = render_notes(path)
+    except UnsupportedSyntax as error:
+        _LOGGER.error("Cannot render the notes %s: %s", path, error)
+        fallback = _LAST_GOOD.get(path)
+        if fallback is None:
+            with open(path, encoding="utf-8") as f:
+                fallback = f"<pre>{html.escape(f.read(), quote=False)}</pre>\n"
+        return f'<p class="notes-error">These notes could not be rendered in full ({html.escape(str(error))}).</p>\n' + fallback
+    _LAST_GOOD[path] = rendered
+    return rendered
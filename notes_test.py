@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from notes import (UnsupportedSyntax, heading_id, is_allowed_link, render_markdown, render_notes, render_notes_or_fallback,
+                   tex_to_mathml)
+
+NOTES = os.path.join(os.path.dirname(__file__), "docs", "floating-point-distribution-and-precision.md")
+
+
+def test_tex_to_mathml():
+    assert tex_to_mathml("x^2") == (
+        '<math xmlns="http://www.w3.org/1998/Math/MathML" display="inline"><mrow><msup><mi>x</mi><mn>2</mn></msup></mrow></math>')
+    assert '<math xmlns="http://www.w3.org/1998/Math/MathML" display="block"><mrow><mfrac>' in tex_to_mathml(r"\frac{1}{2}", display=True)
+    assert "<munderover>" in tex_to_mathml(r"\sum_{i=0}^{n} i", display=True)
+    cases = tex_to_mathml(r"f(x) = \begin{cases} 0 & x < 0 \\ 1 & x \ge 0 \end{cases}")
+    assert cases.count("<mtr>") == 2 and "&#x0003C;" in cases
+    for tex in (r"\unknowncommand{x}", r"\left( x", r"x^"):
+        with pytest.raises(UnsupportedSyntax):
+            tex_to_mathml(tex)
+
+
+def test_render_markdown():
+    html = render_markdown("# A *b*\n\ntext\nmore\n\n| a | b |\n|---|---|\n| 1 | 2 |\n\n- i\n- j\n\n1. k\n\n"
+                           "> quote\n\n---\n\n```python\nx = 1\n```\n\n$$\nx_1\n$$\n\na $y$ b\n")
+    assert html.startswith('<h1 id="a-b">A <em>b</em></h1>\n<p>text\nmore</p>')
+    assert render_markdown("3. a\n4. b").startswith('<ol start="3">\n<li>a</li>')
+    for fragment in ("<td>1</td>\n<td>2</td>", "<li>i</li>\n<li>j</li>", "<ol>\n<li>k</li>", "<blockquote>",
+                     "<hr />", '<div class="highlight"><pre>', '<span class="n">x</span>', 'display="block"',
+                     'display="inline"><mrow><mi>y</mi></mrow></math> b'):
+        assert fragment in html
+    assert render_markdown("a <b>bold</b> word") == "<p>a &lt;b&gt;bold&lt;/b&gt; word</p>\n"
+    assert heading_id("Why 0.1 + 0.2 ≠ 0.3?") == "why-01-02-03"
+
+
+def test_links_are_limited_to_safe_schemes():
+    html = render_markdown("[a](https://g.h) [b](http://g.h) [c](/notes) [d](other.md) [e](#precision)")
+    for href in ("https://g.h", "http://g.h", "/notes", "other.md", "#precision"):
+        assert f'href="{href}"' in html
+    for url in ("javascript:alert(1)", "JavaScript:alert(1)", " javascript:alert(1)", "vbscript:x", "data:text/html,x",
+                "file:///etc/passwd", "mailto:a@b.c"):
+        assert not is_allowed_link(url)
+        html = render_markdown(f"[x]({url}) ![y]({url}) <{url}>")
+        assert "<a " not in html and "<img " not in html
+    assert "<a " not in render_markdown('[x](<javascript:alert(1)>) [y]: javascript:alert(1)\n\n[z][y]')
+
+
+@pytest.mark.parametrize("markdown, line", [
+    ("costs $\\unknowncommand$", 1),
+    ("text\n\n$$\n\\unknowncommand\n$$", 3),
+    ("text\n\n$\\left( x$", 3),
+    ("> quote\n>\n> $x^$", 3),
+    ("| a |\n|---|\n| $\\unknowncommand$ |", 3),
+    ("```nosuchlanguage\ncode\n```", 1),
+    ("- a\n\n  ```nosuchlanguage\n  code\n  ```", 3),
+])
+def test_unsupported_syntax_raises(markdown, line):
+    with pytest.raises(UnsupportedSyntax) as error:
+        render_markdown(markdown)
+    assert error.value.line == line
+
+
+def test_notes_render_without_errors():
+    # raises UnsupportedSyntax when the notes use Markdown or TeX the renderer does not cover
+    html = render_notes(NOTES)
+    assert "math-error" not in html
+    assert html.count('display="block"') >= 10 and html.count("<h2 ") >= 5
+
+
+def test_render_notes_or_fallback(tmp_path):
+    path = tmp_path / "notes.md"
+    path.write_text("# Notes\n\n$\\unknowncommand$ < 2\n", encoding="utf-8")
+    html = render_notes_or_fallback(str(path))
+    assert html.startswith('<p class="notes-error">') and "Line 3" in html
+    assert html.endswith("<pre># Notes\n\n$\\unknowncommand$ &lt; 2\n</pre>\n")
+    path.write_text("# Notes\n\n$x^2$\n", encoding="utf-8")
+    good = render_notes_or_fallback(str(path))
+    assert good == render_notes(str(path))
+    path.write_text("# Notes\n\n```nosuchlanguage\ncode\n```\n", encoding="utf-8")
+    html = render_notes_or_fallback(str(path))
+    assert html.startswith('<p class="notes-error">') and html.endswith(good)
@@ -0,0 +1,75 @@
+"""Bounded process pool for the CPU-heavy calls of the web app, with a time budget and back-pressure
+
+The request threads only wait on the pool, so they do not hold the GIL while the work is done: cheap pages stay
+responsive however much heavy work is in flight. Admission is bounded: at most 'workers + max_queue' calls are
+running or queued, and the next one is refused at once with Overloaded instead of queueing without limit.
+A caller waits at most its time budget and then gets TimeBudgetExceeded; a call that is already running cannot
+be interrupted (nor one already handed to a worker process), so it keeps its slot until it finishes and the
+back-pressure accounts for it.
+"""
+
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Optional
+
+
+class Overloaded(RuntimeError):
+    """The pool has no free slot: 'workers + max_queue' calls are already running or queued"""
+
+
+class TimeBudgetExceeded(RuntimeError):
+    """The call did not complete within its time budget"""
+
+
+class WorkPool:
+    """Process pool running at most 'workers' calls at once, with at most 'max_queue' more waiting for a worker
+
+    The worker processes are started on the first call.
+    """
+
+    def __init__(self, workers: int, max_queue: int) -> None:
+        if workers < 1 or max_queue < 0:
+            raise ValueError("A work pool needs at least one worker and a non-negative queue length")
+        self.workers = workers
+        self.max_queue = max_queue
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"WorkPool(workers={self.workers}, max_queue={self.max_queue})"
+
+    def run(self, func: Callable, *args, timeout: Optional[float] = None):
+        """Return func(*args), computed in a worker process
+
+        Raise Overloaded if no slot is free, and TimeBudgetExceeded if the result is not ready after 'timeout'
+        seconds. 'func' and its arguments must be picklable.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise Overloaded(f"All {self.workers} workers are busy and {self.max_queue} calls are queued")
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            # a call not yet handed to a worker is dropped; otherwise it holds its slot until it is done
+            future.cancel()
+            raise TimeBudgetExceeded(f"No result within the time budget of {timeout} s") from None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, after the calls in flight"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
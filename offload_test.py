@@ -0,0 +1,58 @@
+import threading
+import time
+
+import pytest
+
+from offload import Overloaded, TimeBudgetExceeded, WorkPool
+
+
+def slow_square(x, seconds):
+    time.sleep(seconds)
+    return x * x
+
+
+@pytest.fixture
+def pool():
+    pool = WorkPool(workers=1, max_queue=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_run(pool):
+    assert pool.run(slow_square, 7, 0) == 49
+    assert pool.run(slow_square, 3, 0, timeout=10) == 9
+    with pytest.raises(ValueError):
+        WorkPool(workers=0, max_queue=1)
+
+
+def test_admission_is_bounded(pool):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool.run(slow_square, 2, 0.5))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    # one call running and one queued: the third is refused at once
+    start = time.monotonic()
+    with pytest.raises(Overloaded):
+        pool.run(slow_square, 2, 0)
+    assert time.monotonic() - start < 0.1
+    for thread in threads:
+        thread.join()
+    assert results == [4, 4]
+    assert pool.run(slow_square, 2, 0) == 4
+
+
+def test_time_budget(pool):
+    start = time.monotonic()
+    with pytest.raises(TimeBudgetExceeded):
+        pool.run(slow_square, 2, 0.5, timeout=0.1)
+    assert time.monotonic() - start < 0.4
+    # the running call keeps its slot until it is done, the queue slot is free
+    assert pool.run(slow_square, 3, 0, timeout=5) == 9
+    # a call that runs out of budget holds its slot at most until it is done
+    threading.Thread(target=lambda: pool.run(slow_square, 2, 0.5)).start()
+    time.sleep(0.1)
+    with pytest.raises(TimeBudgetExceeded):
+        pool.run(slow_square, 2, 0, timeout=0.05)
+    time.sleep(0.6)
+    assert pool.run(slow_square, 5, 0, timeout=5) == 25
@@ -0,0 +1,71 @@
+"""In-memory cache of rendered pages, with precompressed variants and strong ETags, invalidated by source mtimes
+
+A page is rendered once, encoded and compressed once (gzip, and Brotli when the 'brotli' package is installed),
+and then served from memory: a request costs a stat() of each source file, to notice edits, and the choice of a
+variant. Each variant has its own strong ETag, derived from the rendered body and the encoding, so that caches
+revalidate it with If-None-Match.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from typing import Callable, Dict, Sequence, Tuple
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional: without it pages are served gzip-compressed or identity
+    brotli = None
+
+IDENTITY = "identity"
+
+
+class CachedPage:
+    """A rendered page: its body in each content coding, their ETags, and the mtimes of the sources it was
+    rendered from"""
+
+    __slots__ = ("variants", "etags", "mtimes")
+
+    def __init__(self, body: bytes, mtimes: Tuple[int, ...], compress_level: int = 9) -> None:
+        self.variants: Dict[str, bytes] = {IDENTITY: body, "gzip": gzip.compress(body, compress_level, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body, quality=11)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etags = {encoding: digest if encoding == IDENTITY else f"{digest}-{encoding}" for encoding in self.variants}
+        self.mtimes = mtimes
+
+    def __repr__(self):
+        sizes = ", ".join(f"{encoding}={len(body)}" for encoding, body in self.variants.items())
+        return f"CachedPage({sizes})"
+
+    def negotiate(self, accept: Callable[[str], float]) -> str:
+        """Return the smallest variant that the client accepts, given 'accept', the quality the client gives to
+        each content coding (0 if refused)"""
+        acceptable = [encoding for encoding in self.variants if encoding == IDENTITY or accept(encoding) > 0]
+        return min(acceptable, key=lambda encoding: len(self.variants[encoding]))
+
+
+class PageCache:
+    """Rendered pages by key, re-rendered when the modification time of one of their source files changes"""
+
+    def __init__(self, compress_level: int = 9) -> None:
+        self.compress_level = compress_level
+        self._pages: Dict[str, CachedPage] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, sources: Sequence[str], render: Callable[[], str]) -> CachedPage:
+        """Return the page cached under 'key', rendering it with 'render' if it is not cached yet or if one of
+        the 'sources' files changed since"""
+        mtimes = tuple(os.stat(path).st_mtime_ns for path in sources)
+        page = self._pages.get(key)
+        if page is not None and page.mtimes == mtimes:
+            return page
+        # concurrent misses render the page more than once, but the last one stored is as good as any
+        page = CachedPage(render().encode("utf-8"), mtimes, self.compress_level)
+        with self._lock:
+            self._pages[key] = page
+        return page
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
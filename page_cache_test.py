@@ -0,0 +1,49 @@
+import gzip
+import os
+
+import page_cache
+from page_cache import IDENTITY, CachedPage, PageCache
+
+
+def test_cached_page_variants_and_etags():
+    body = ("<p>" + "0.1 " * 1000 + "</p>").encode()
+    page = CachedPage(body, ())
+    assert page.variants[IDENTITY] == body and gzip.decompress(page.variants["gzip"]) == body
+    assert page.variants["gzip"] == CachedPage(body, ()).variants["gzip"]
+    assert len(set(page.etags.values())) == len(page.variants)
+    assert page.etags["gzip"] == page.etags[IDENTITY] + "-gzip"
+    assert CachedPage(body + b" ", ()).etags[IDENTITY] != page.etags[IDENTITY]
+
+    assert page.negotiate(lambda encoding: 0) == IDENTITY
+    assert page.negotiate(lambda encoding: 1 if encoding == "gzip" else 0) == "gzip"
+    # a tiny body is smaller uncompressed
+    assert CachedPage(b"x", ()).negotiate(lambda encoding: 1) == IDENTITY
+
+
+def test_brotli_is_optional(monkeypatch):
+    monkeypatch.setattr(page_cache, "brotli", None)
+    assert set(CachedPage(b"body", ()).variants) == {IDENTITY, "gzip"}
+
+
+def test_page_cache_invalidated_by_source_mtime(tmp_path):
+    source = tmp_path / "page.html"
+    source.write_text("one")
+    renders = []
+
+    def render():
+        renders.append(source.read_text())
+        return renders[-1]
+
+    cache = PageCache()
+    page = cache.get("page", [str(source)], render)
+    assert cache.get("page", [str(source)], render) is page and renders == ["one"]
+
+    source.write_text("two")
+    mtime = os.stat(source).st_mtime_ns + 1_000_000_000
+    os.utime(source, ns=(mtime, mtime))
+    assert cache.get("page", [str(source)], render).variants[IDENTITY] == b"two"
+    assert renders == ["one", "two"]
+
+    cache.clear()
+    cache.get("page", [str(source)], render)
+    assert len(renders) == 3
@@ -0,0 +1,136 @@
+"""Precomputed segment table in a fixed-layout binary file, memory-mapped at runtime
+
+The exact bounds, distance and length of the 2047 segments are long decimals (hundreds of digits at the
+extremes) that each process would otherwise compute and keep in memory. build_segment_table() writes them once
+to a file; SegmentTable.open() maps it read-only, so the processes serving the app share its pages through the
+page cache, and each Segment is decoded from the buffer only when it is looked up.
+
+Layout (little-endian):
+- header: magic b"FPSEGTAB", version (uint16), decimal precision (uint32), rounding mode (16 ASCII bytes,
+  NUL-padded), first unbiased exponent (int16), number of segments (uint16)
+- index: one entry per segment, in exponent order: unbiased exponent (int16), then the offset (uint32) and
+  length (uint16) of min_val, max_val, distance and length in the data area
+- data: the decimal strings of the segments, ASCII
+
+Build the file with
+
+    python segment_table.py segments.bin [--prec 400]
+"""
+
+import argparse
+import mmap
+import os
+import struct
+from decimal import ROUND_HALF_UP, Decimal
+from typing import List, Optional
+
+from fp import Segment
+from fputil import DOUBLE_PRECISION_EXPONENT_BIAS, SUBNORMAL_UNBIASED_EXP
+
+MAGIC = b"FPSEGTAB"
+VERSION = 1
+DEFAULT_PREC = 400
+
+_HEADER = struct.Struct("<8sHI16shH")
+_ENTRY = struct.Struct("<h" + "IH" * 4)
+
+
+def build_segment_table(path: str, prec: int = DEFAULT_PREC, rounding: str = ROUND_HALF_UP) -> None:
+    """Compute every segment with 'prec' significant digits and 'rounding', and write them to the file at 'path'
+
+    The file is written next to 'path' and then renamed over it, so processes that have the previous file
+    mapped keep a consistent view of it.
+    """
+    first, count = SUBNORMAL_UNBIASED_EXP, DOUBLE_PRECISION_EXPONENT_BIAS - SUBNORMAL_UNBIASED_EXP + 1
+    index, data = [], bytearray()
+    for e in range(first, first + count):
+        segment = Segment.compute(e, prec, rounding)
+        fields = []
+        for value in (segment.min_val, segment.max_val, segment.distance, segment.length):
+            text = str(value).encode("ascii")
+            fields += [len(data), len(text)]
+            data += text
+        index.append(_ENTRY.pack(e, *fields))
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, prec, rounding.encode("ascii"), first, count))
+        f.write(b"".join(index))
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class SegmentTable:
+    """Read-only view of a segment table file, see build_segment_table()
+
+    'prec' and 'rounding' are the decimal precision and rounding mode the segments were computed with.
+    """
+
+    def __init__(self, buffer, prec: int, rounding: str, first: int, count: int) -> None:
+        self._buffer = buffer
+        self._data = _HEADER.size + count * _ENTRY.size
+        self.prec = prec
+        self.rounding = rounding
+        self.first = first
+        self.count = count
+
+    def __repr__(self):
+        return f"SegmentTable(prec={self.prec}, rounding={self.rounding}, exponents=[{self.first}, {self.first + self.count}))"
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, e: int) -> bool:
+        return self.first <= e < self.first + self.count
+
+    def get(self, e: int) -> Segment:
+        """Return the segment with unbiased exponent 'e', decoded from the buffer"""
+        if e not in self:
+            raise KeyError(e)
+        _, *fields = _ENTRY.unpack_from(self._buffer, _HEADER.size + (e - self.first) * _ENTRY.size)
+        values = [Decimal(self._buffer[self._data + offset:self._data + offset + length].decode("ascii"))
+                  for offset, length in zip(fields[::2], fields[1::2])]
+        return Segment(e, *values)
+
+    def close(self) -> None:
+        """Unmap the file of a table opened with open(); a table over another buffer has nothing to release"""
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    @staticmethod
+    def from_buffer(buffer) -> "SegmentTable":
+        """Return a SegmentTable over a bytes-like object holding a segment table file"""
+        if len(buffer) < _HEADER.size:
+            raise ValueError("Not a segment table: file too short")
+        magic, version, prec, rounding, first, count = _HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError("Not a segment table: bad magic number")
+        if version != VERSION:
+            raise ValueError(f"Unsupported segment table version {version}")
+        if len(buffer) < _HEADER.size + count * _ENTRY.size:
+            raise ValueError("Not a segment table: truncated index")
+        return SegmentTable(buffer, prec, rounding.rstrip(b"\0").decode("ascii"), first, count)
+
+    @staticmethod
+    def open(path: str) -> "SegmentTable":
+        """Map the segment table file at 'path' read-only"""
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return SegmentTable.from_buffer(buffer)
+        except ValueError:
+            buffer.close()
+            raise
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command-line entry point: build the segment table file at the given path"""
+    parser = argparse.ArgumentParser(description="Build the memory-mapped segment table file")
+    parser.add_argument("path", help="segment table file to write")
+    parser.add_argument("--prec", type=int, default=DEFAULT_PREC, help="decimal precision of the segments")
+    args = parser.parse_args(argv)
+    build_segment_table(args.path, args.prec)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+from decimal import ROUND_HALF_EVEN, ROUND_HALF_UP, Context
+
+import pytest
+
+import fp
+from fp import Segment, get_segment_table, get_segments, use_segment_table
+from segment_table import SegmentTable, build_segment_table
+
+CTX = Context(prec=400, rounding=ROUND_HALF_UP)
+
+
+@pytest.fixture(scope="module")
+def table_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("segments") / "segments.bin")
+    build_segment_table(path, 400, ROUND_HALF_UP)
+    return path
+
+
+@pytest.fixture
+def table(table_path):
+    table = SegmentTable.open(table_path)
+    yield table
+    use_segment_table(None)
+    table.close()
+
+
+def test_table_matches_computed_segments(table):
+    assert (table.prec, table.rounding, len(table)) == (400, ROUND_HALF_UP, 2047)
+    for e in range(-1023, 1024):
+        assert table.get(e) == Segment.compute(e, 400, ROUND_HALF_UP)
+    assert -1023 in table and 1023 in table and 1024 not in table
+    with pytest.raises(KeyError):
+        table.get(1024)
+
+
+def test_segments_are_served_from_the_table(table, monkeypatch):
+    assert get_segment_table() is None
+    use_segment_table(table)
+    assert get_segment_table() is table
+    monkeypatch.setattr(fp, "_segment_entry", lambda *args: pytest.fail("segment computed instead of read"))
+    assert Segment.from_fp(0.1, CTX) == table.get(-4)
+    assert Segment.from_exponent(1023, CTX).min_val == table.get(1023).min_val
+    assert get_segments(-2, 2, CTX) == [table.get(e) for e in range(-2, 2)]
+
+
+def test_other_precisions_are_computed(table):
+    use_segment_table(table)
+    for ctx in (Context(prec=50, rounding=ROUND_HALF_UP), Context(prec=400, rounding=ROUND_HALF_EVEN)):
+        assert Segment.from_exponent(-1000, ctx) == Segment.compute(-1000, ctx.prec, ctx.rounding)
+    assert Segment.from_exponent(-1000, Context(prec=50)) != table.get(-1000)
+
+
+def test_invalid_files_are_rejected(table_path, tmp_path):
+    with open(table_path, "rb") as f:
+        data = f.read()
+    with pytest.raises(ValueError):
+        SegmentTable.from_buffer(b"NOTATABLE" + data[9:])
+    with pytest.raises(ValueError):
+        SegmentTable.from_buffer(data[:100])
+    bad = tmp_path / "bad.bin"
+    bad.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        SegmentTable.open(str(bad))
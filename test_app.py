@@ -1,10 +1,28 @@
 #!/usr/bin/env python3
 """Tests for the Floatingpoint Flask application."""
 
+import gzip
+import itertools
 import json
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
 import unittest
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, getcontext
 
+import numpy as np
+from flask import Response
+from werkzeug.serving import make_server
+
+import app as app_module
 from app import app
+from bulk import RECORD, RECORD_LAYOUT, analyze_records
 
 
 class FloatingpointAppTestCase(unittest.TestCase):
@@ -51,6 +69,40 @@ class FloatingpointAppTestCase(unittest.TestCase):
         self.assertLess(data["neighbor_lower"], data["fp"])
         self.assertLess(data["fp"], data["neighbor_higher"])
 
+    def test_exact_decimal_large_digits_paginated(self) -> None:
+        response = self.client.post(
+            "/exact-decimal", data={"decimal": "0.1", "digits": "50", "offset": "5", "limit": "4"}
+        )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data["d_digit_count"], "2636779683484746783506125211715698")
+        self.assertEqual(data["d_digit_distance"], "1E-50")
+        self.assertEqual(data["d_digit_offset"], "5")
+        self.assertEqual(data["d_digit_limit"], 4)
+        self.assertEqual(len(data["d_digit_list"]), 4)
+
+    def test_exact_decimal_default_page(self) -> None:
+        response = self.client.post("/exact-decimal", data={"decimal": "0.1", "digits": "30"})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data["d_digit_offset"], "0")
+        self.assertEqual(len(data["d_digit_list"]), data["d_digit_limit"])
+
+    def test_exact_decimal_count_beyond_double_precision(self) -> None:
+        offset = 2 ** 53 + 1
+        response = self.client.post("/exact-decimal", data={"decimal": "5e-324", "digits": "50", "offset": str(offset), "limit": "2"})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data["d_digit_count"], "49406564584124654417656879286822137236505980261432")
+        self.assertEqual(data["d_digit_offset"], str(offset))
+        self.assertEqual(len(data["d_digit_list"]), 2)
+
+    def test_exact_decimal_invalid_page(self) -> None:
+        for page in ({"offset": "-1"}, {"limit": "100000"}, {"limit": "x"}):
+            response = self.client.post("/exact-decimal", data={"decimal": "0.1", "digits": "5", **page})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("error", json.loads(response.data))
+
     def test_exact_decimal_with_empty_input(self) -> None:
         response = self.client.post("/exact-decimal", data={"decimal": "", "digits": "5"})
         self.assertEqual(response.status_code, 400)
@@ -94,6 +146,13 @@ class FloatingpointAppTestCase(unittest.TestCase):
         self.assertEqual(data["float_index"], 1)
         self.assertEqual(data["length"], "4503599627370495")
 
+    def test_segment_negative_and_subnormal_index(self) -> None:
+        data = json.loads(self.client.post("/segment", data={"decimal": "-1.5"}).data)
+        self.assertEqual(data["float_index"], 2 ** 51)
+        data = json.loads(self.client.post("/segment", data={"decimal": "1e-323"}).data)
+        self.assertEqual(data["unbiased_exp"], -1023)
+        self.assertEqual(data["float_index"], 2)
+
     def test_segment_non_finite(self) -> None:
         response = self.client.post("/segment", data={"decimal": "inf"})
         self.assertEqual(response.status_code, 400)
@@ -104,10 +163,249 @@ class FloatingpointAppTestCase(unittest.TestCase):
         response = self.client.post("/segment", data={"decimal": ""})
         self.assertEqual(response.status_code, 400)
 
+    def test_exact_decimal_infinity(self) -> None:
+        response = self.client.post("/exact-decimal", data={"decimal": "inf", "digits": "5"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", json.loads(response.data))
+
+    def batch(self, path, body, content_type="application/x-ndjson"):
+        response = self.client.post(path, data=body, content_type=content_type)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        return [json.loads(line) for line in response.data.decode().splitlines()]
+
+    def test_exact_decimal_batch_matches_single(self) -> None:
+        items = [{"decimal": "0.1", "digits": 5}, {"decimal": 1e-310, "digits": "17", "limit": 2}]
+        lines = self.batch("/api/exact-decimal/batch", json.dumps(items), "application/json")
+        self.assertEqual(len(lines), 2)
+        for index, (item, line) in enumerate(zip(items, lines)):
+            single = self.client.post("/exact-decimal", data={k: str(v) for k, v in item.items()})
+            self.assertEqual(line, {"index": index, "status": 200, **json.loads(single.data)})
+
+    def test_exact_decimal_batch_inline_errors(self) -> None:
+        body = '{"decimal": "0.1", "digits": 5}\n{"decimal": "x", "digits": 5}\nnot json\n7\n{"decimal": "1", "digits": 1}\n'
+        lines = self.batch("/api/exact-decimal/batch", body)
+        self.assertEqual([line["index"] for line in lines], [0, 1, 2, 3, 4])
+        self.assertEqual([line["status"] for line in lines], [200, 400, 400, 400, 200])
+        self.assertTrue(all("error" in line for line in lines[1:4]))
+        self.assertEqual(lines[4]["fp"], 1.0)
+
+    def test_segment_batch(self) -> None:
+        lines = self.batch("/api/segment/batch", '[1.0, "4503599627370497", {"decimal": "1e300"}, "inf", null]')
+        self.assertEqual([line["status"] for line in lines], [200, 200, 200, 400, 400])
+        self.assertEqual(lines[0]["min_val"], "1")
+        self.assertEqual(lines[1]["float_index"], 1)
+        self.assertEqual(lines[2]["unbiased_exp"], 996)
+
+    def test_batch_empty_body(self) -> None:
+        self.assertEqual(self.batch("/api/segment/batch", ""), [])
+        self.assertEqual(self.batch("/api/segment/batch", "[]"), [])
+
+    def test_batch_streams_large_input(self) -> None:
+        body = "".join(f"{i}\n" for i in range(20000))
+        response = self.client.post("/api/segment/batch", data=body, content_type="application/x-ndjson")
+        self.assertTrue(response.is_streamed)
+        count = 0
+        for count, line in enumerate(response.response, 1):
+            self.assertEqual(json.loads(line)["status"], 200)
+        self.assertEqual(count, 20000)
+
+    def test_analyze_packed_doubles(self) -> None:
+        values = [0.1, -1e-310, 1.0, 1023.9999999999999, math.inf, math.nan]
+        body = struct.pack(f"<{len(values)}d", *values)
+        response = self.client.post("/api/analyze", data=body, content_type="application/octet-stream")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content_type, "application/octet-stream")
+        self.assertEqual(response.headers["X-Record-Layout"], RECORD_LAYOUT)
+        self.assertEqual(response.data, analyze_records(np.array(values)).tobytes())
+        records = np.frombuffer(response.data, dtype=RECORD)
+        self.assertEqual(records["digits"].tolist(), [1, 1, 1, 17, 0, 0])
+        for record, value in zip(records[:4].tolist(), values):
+            segment = json.loads(self.client.post("/segment", data={"decimal": repr(value)}).data)
+            self.assertEqual(record[0], segment["unbiased_exp"])
+            self.assertEqual(record[3], segment["float_index"])
+            self.assertEqual(record[4], float(segment["distance"]))
+
+        lines = [json.loads(line) for line in
+                 self.client.post("/api/analyze?format=ndjson&digits=0", data=body, content_type="application/octet-stream").data.splitlines()]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual((lines[0]["offset"], lines[0]["count"], lines[0]["digits"]), (0, 6, [0] * 6))
+        self.assertEqual(lines[0]["ulp"][4:], [None, None])
+
+    def test_analyze_streams_large_input(self) -> None:
+        values = np.arange(20000, dtype="<f8") * 0.1
+        response = self.client.post("/api/analyze?format=ndjson", data=values.tobytes(), content_type="application/octet-stream")
+        self.assertTrue(response.is_streamed)
+        lines = [json.loads(line) for line in response.response]
+        self.assertEqual([line["offset"] for line in lines], [0, 8192, 16384])
+        self.assertEqual(sum(line["count"] for line in lines), 20000)
+        binary = self.client.post("/api/analyze", data=values.tobytes(), content_type="application/octet-stream")
+        self.assertEqual(binary.headers["Content-Length"], str(20000 * RECORD.itemsize))
+        self.assertEqual(np.frombuffer(binary.data, dtype=RECORD)["float_index"].tolist(), sum((line["float_index"] for line in lines), []))
+
+    def test_analyze_invalid(self) -> None:
+        body = struct.pack("<2d", 1.0, 2.0)
+        for data, content_type, query, status in (
+            (body, "text/plain", "", 415),
+            (body[:-1], "application/octet-stream", "", 400),
+            (body, "application/octet-stream", "?format=csv", 400),
+        ):
+            response = self.client.post("/api/analyze" + query, data=data, content_type=content_type)
+            self.assertEqual(response.status_code, status)
+            self.assertIn("error", response.get_json())
+        saved = app.config["BULK_MAX_BYTES"]
+        app.config["BULK_MAX_BYTES"] = 8
+        try:
+            response = self.client.post("/api/analyze", data=body, content_type="application/octet-stream")
+        finally:
+            app.config["BULK_MAX_BYTES"] = saved
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.get_json()["reason"], "body_too_large")
+
+    def test_analyze_is_not_held_to_the_iteration_budget(self) -> None:
+        saved = app.config["ITERATION_BUDGET"]
+        app.config["ITERATION_BUDGET"] = 1
+        try:
+            response = self.client.post("/api/analyze?digits=0", data=np.arange(1000.0).tobytes(), content_type="application/octet-stream")
+        finally:
+            app.config["ITERATION_BUDGET"] = saved
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1000 * RECORD.itemsize)
+
+    def test_get_api_matches_post(self) -> None:
+        response = self.client.get("/api/exact-decimal?decimal=0.1&digits=5")
+        self.assertEqual(response.status_code, 200)
+        post = self.client.post("/exact-decimal", data={"decimal": "0.1", "digits": "5"})
+        self.assertEqual(json.loads(response.data), json.loads(post.data))
+        response = self.client.get("/api/segment?decimal=1.0")
+        post = self.client.post("/segment", data={"decimal": "1.0"})
+        self.assertEqual(json.loads(response.data), json.loads(post.data))
+
+    def test_get_api_conditional_requests(self) -> None:
+        for url in ("/api/exact-decimal?decimal=1e16&digits=17", "/api/segment?decimal=9007199254740993"):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            etag = response.headers["ETag"]
+            self.assertIn("public", response.headers["Cache-Control"])
+            self.assertIn("max-age=", response.headers["Cache-Control"])
+            self.assertEqual(self.client.get(url).headers["ETag"], etag)
+            revalidated = self.client.get(url, headers={"If-None-Match": etag})
+            self.assertEqual(revalidated.status_code, 304)
+            self.assertEqual(revalidated.data, b"")
+            self.assertEqual(self.client.get(url, headers={"If-None-Match": '"other"'}).status_code, 200)
+
+    def test_get_api_errors_not_cacheable(self) -> None:
+        response = self.client.get("/api/segment?decimal=inf")
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn("ETag", response.headers)
+
+    def test_result_cache_keyed_on_bit_pattern(self) -> None:
+        stats = json.loads(self.client.get("/api/cache-stats").data)["segment"]
+        for decimal in ("0.30000000000000004", "0.300000000000000044", "3.0000000000000004e-1"):
+            response = self.client.post("/segment", data={"decimal": decimal})
+            self.assertEqual(json.loads(response.data)["input"], decimal)
+        after = json.loads(self.client.get("/api/cache-stats").data)["segment"]
+        self.assertEqual(after["misses"] - stats["misses"], 1)
+        self.assertEqual(after["hits"] - stats["hits"], 2)
+        self.assertEqual(set(after), {"hits", "misses", "evictions", "size", "max_size"})
+
+    def test_range_streams_neighbors(self) -> None:
+        response = self.client.get("/api/range?decimal=1.0&k=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual([line["offset"] for line in lines], [-2, -1, 0, 1, 2])
+        self.assertEqual(lines[2], {"offset": 0, "fp": 1.0, "hex": "0x3ff0000000000000"})
+        self.assertEqual(lines[1]["fp"], math.nextafter(1.0, 0))
+        self.assertEqual(lines[3]["fp"], math.nextafter(1.0, 2))
+
+    def test_range_at_the_ends_and_exact(self) -> None:
+        response = self.client.get("/api/range?decimal=1.7976931348623157e308&k=3&step=2&exact=1")
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual([line["offset"] for line in lines], [-3, -2, -1, 0])
+        self.assertTrue(lines[-1]["exact_decimal"].startswith("17976931348623157"))
+        response = self.client.get("/api/range?decimal=-5e-324&k=1")
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual([line["fp"] for line in lines], [-1e-323, -5e-324, 0.0])
+
+    def test_range_invalid(self) -> None:
+        for query in ("decimal=", "decimal=x", "decimal=inf", "decimal=1&k=-1", "decimal=1&k=1000000", "decimal=1&step=0"):
+            response = self.client.get(f"/api/range?{query}")
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("error", json.loads(response.data))
+
+    def test_exact_decimal_head_and_more_digits(self) -> None:
+        full = str(Decimal(5e-324))
+        significant = full.partition("E")[0].replace(".", "")
+        data = self.client.get("/api/exact-decimal?decimal=5e-324&digits=3").get_json()
+        self.assertIsNone(data["exact_decimal"])
+        self.assertTrue(data["exact_decimal_truncated"])
+        self.assertEqual(data["exact_decimal_head"], significant[:64])
+        self.assertEqual((data["exact_decimal_digits"], data["exact_decimal_exponent"]), (len(significant), -324))
+        self.assertEqual(data["d_digit_list"][:2], ["2.48E-324", "2.49E-324"])
+
+        digits = data["exact_decimal_head"]
+        while len(digits) < data["exact_decimal_digits"]:
+            more = self.client.get(f"/api/exact-decimal/digits?decimal=5e-324&start={len(digits)}&count=300").get_json()
+            self.assertEqual((more["start"], more["total"], more["exponent"]), (len(digits), len(significant), -324))
+            digits += more["digits"]
+        self.assertEqual(digits, significant)
+
+        short = self.client.get("/api/exact-decimal?decimal=-0.1&digits=3").get_json()
+        self.assertFalse(short["exact_decimal_truncated"])
+        self.assertEqual(short["exact_decimal"], "-0.1000000000000000055511151231257827021181583404541015625")
+        self.assertIsNone(short["exact_decimal_head"])
+        self.assertEqual((short["exact_decimal_digits"], short["exact_decimal_exponent"]), (55, -1))
+
+    def test_exact_decimal_digits_api(self) -> None:
+        data = self.client.get("/api/exact-decimal/digits?decimal=1e22").get_json()
+        self.assertEqual(data, {"input": "1e22", "start": 0, "digits": "1", "total": 1, "exponent": 22})
+        data = self.client.get("/api/exact-decimal/digits?decimal=0.1&start=50&count=10").get_json()
+        self.assertEqual((data["digits"], data["total"]), ("15625", 55))
+        self.assertIn("ETag", self.client.get("/api/exact-decimal/digits?decimal=0.1").headers)
+        for query in ("decimal=", "decimal=x", "decimal=nan", "decimal=1&start=-1", "decimal=1&count=1001", "decimal=1&count=x"):
+            response = self.client.get(f"/api/exact-decimal/digits?{query}")
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("error", response.get_json())
+
     def test_notes_page(self) -> None:
         response = self.client.get("/notes")
         self.assertEqual(response.status_code, 200)
         self.assertIn(b"notes-content", response.data)
+        self.assertIn(b'display="block"', response.data)
+        self.assertIn(b'<div class="highlight">', response.data)
+        self.assertNotIn(b"<script", response.data)
+        self.assertNotIn(b"math-error", response.data.split(b"</style>")[-1])
+        self.assertNotIn(b"notes-error", response.data.split(b"</style>")[-1])
+
+    def test_notes_page_with_unsupported_syntax(self) -> None:
+        saved = app_module._NOTES_PATH
+        with tempfile.TemporaryDirectory() as directory:
+            app_module._NOTES_PATH = os.path.join(directory, "notes.md")
+            try:
+                with open(app_module._NOTES_PATH, "w", encoding="utf-8") as f:
+                    f.write("# Notes\n\n$\\unknowncommand$ <b>x</b>\n")
+                response = self.client.get("/notes")
+            finally:
+                app_module._NOTES_PATH = saved
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'class="notes-error"', response.data)
+        self.assertIn(b"<pre># Notes\n\n$\\unknowncommand$ &lt;b&gt;x&lt;/b&gt;\n</pre>", response.data)
+
+    def test_static_pages_precompressed_and_conditional(self) -> None:
+        for url in ("/", "/exact-decimal", "/segment", "/notes"):
+            plain = self.client.get(url)
+            self.assertNotIn("Content-Encoding", plain.headers)
+            self.assertEqual(plain.headers["Vary"], "Accept-Encoding")
+            self.assertIn("no-cache", plain.headers["Cache-Control"])
+            compressed = self.client.get(url, headers={"Accept-Encoding": "gzip, deflate"})
+            self.assertEqual(compressed.headers["Content-Encoding"], "gzip")
+            self.assertEqual(gzip.decompress(compressed.data), plain.data)
+            self.assertNotEqual(compressed.headers["ETag"], plain.headers["ETag"])
+            revalidated = self.client.get(url, headers={"Accept-Encoding": "gzip",
+                                                        "If-None-Match": compressed.headers["ETag"]})
+            self.assertEqual(revalidated.status_code, 304)
+            self.assertEqual(revalidated.data, b"")
 
     def test_notes_content(self) -> None:
         response = self.client.get("/notes/content")
@@ -115,6 +413,181 @@ class FloatingpointAppTestCase(unittest.TestCase):
         self.assertIn("text/plain", response.content_type)
         self.assertIn(b"Floating-point numbers", response.data)
 
+    def test_metrics(self) -> None:
+        stages = {"tool": "exact_decimal", "digits": "17", "exponent": "0..255"}
+        parsed = app_module.STAGE_SECONDS.count(stage="parse", **stages)
+        errors = app_module.REQUEST_ERRORS.value(route="/segment", method="POST", status="400")
+        self.client.post("/exact-decimal", data={"decimal": "12345.678", "digits": "17"})
+        self.client.post("/segment", data={"decimal": "x"})
+        self.client.get("/no/such/page")
+
+        self.assertEqual(app_module.STAGE_SECONDS.count(stage="parse", **stages), parsed + 1)
+        self.assertEqual(app_module.REQUEST_ERRORS.value(route="/segment", method="POST", status="400"), errors + 1)
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content_type, "text/plain; version=0.0.4; charset=utf-8")
+        text = response.get_data(as_text=True)
+        self.assertIn("# TYPE fp_http_request_duration_seconds histogram", text)
+        self.assertIn('fp_http_requests_in_flight{route="/metrics"} 1', text)
+        self.assertIn('fp_http_requests_in_flight{route="/segment"} 0', text)
+        self.assertIn('fp_http_request_errors_total{route="unmatched",method="GET",status="404"}', text)
+        for stage in ("parse", "result", "from_float", "d_digit_decimals", "exact_decimal_digits", "serialize"):
+            self.assertIn(f'fp_stage_duration_seconds_count{{tool="exact_decimal",stage="{stage}",digits="17",exponent="0..255"}}', text)
+        self.assertIn('fp_stage_duration_seconds_count{tool="segment",stage="parse"}', text)
+
+    def test_metrics_count_a_request_that_raised_as_a_server_error(self) -> None:
+        labels = {"route": "/api/segment", "method": "GET", "status": "500"}
+        errors = app_module.REQUEST_ERRORS.value(**labels)
+        with app.test_request_context("/api/segment?decimal=0.1"):
+            app_module._start_request_metrics()
+            app_module._record_response_status(Response(status=200))  # e.g. a stream that failed after its headers
+            app_module._finish_request_metrics(RuntimeError("stream failed"))
+        self.assertEqual(app_module.REQUEST_ERRORS.value(**labels), errors + 1)
+
+
+
+class ThreadedServingTestCase(unittest.TestCase):
+    """Concurrency stress test: the JSON APIs served from a thread pool whose threads carry arbitrary decimal contexts."""
+
+    REQUESTS = [
+        ("/exact-decimal", {"decimal": value, "digits": str(digits)})
+        for value in ("0.1", "1e-310", "72057594037927945", "1.7976931348623157e308", "-2.5")
+        for digits in (1, 5, 17, 18, 50)
+    ] + [
+        ("/segment", {"decimal": value})
+        for value in ("1.0", "5e-324", "1e-300", "4503599627370497", "1e300", "-0.1")
+    ]
+
+    def post(self, path, data, prec=None):
+        if prec is not None:
+            # a pooled thread may have been left with any context by earlier work
+            getcontext().prec = prec
+        response = app.test_client().post(path, data=data)
+        return response.status_code, json.loads(response.data)
+
+    def test_concurrent_requests_match_serial(self) -> None:
+        expected = [self.post(path, data) for path, data in self.REQUESTS]
+        jobs = [(i % len(self.REQUESTS), 3 + i % 40) for i in range(20 * len(self.REQUESTS))]
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(lambda job: self.post(*self.REQUESTS[job[0]], prec=job[1]), jobs))
+        for (i, _), result in zip(jobs, results):
+            self.assertEqual(result, expected[i])
+
+
+class OffloadServingTestCase(unittest.TestCase):
+    """Offload mode: heavy calls on a bounded process pool, with time and iteration budgets and back-pressure."""
+
+    CONFIG = {"OFFLOAD_WORKERS": 2, "OFFLOAD_QUEUE": 2, "TIME_BUDGET": 5.0, "ITERATION_BUDGET": 2 * 100000 + 1}
+    # distinct values, so that every heavy request misses the result caches
+    values = itertools.count(1)
+
+    def setUp(self) -> None:
+        self.saved = {key: app.config[key] for key in self.CONFIG}
+        app.config.update(self.CONFIG)
+        self.client = app.test_client()
+
+    def tearDown(self) -> None:
+        app.config.update(self.saved)
+        # shuts the pool down when the saved configuration has offload mode off
+        if self.saved["OFFLOAD_WORKERS"] <= 0:
+            self.assertIsNone(app_module.get_work_pool())
+
+    def test_work_pool_follows_the_config(self) -> None:
+        pool = app_module.get_work_pool()
+        self.assertEqual((pool.workers, pool.max_queue), (2, 2))
+        self.assertIs(app_module.get_work_pool(), pool)
+        app.config["OFFLOAD_QUEUE"] = 3
+        replaced = app_module.get_work_pool()
+        self.assertIsNot(replaced, pool)
+        self.assertEqual(replaced.max_queue, 3)
+        app.config["OFFLOAD_WORKERS"] = 0
+        self.assertIsNone(app_module.get_work_pool())
+        self.assertIsNone(app.extensions["work_pool"])
+
+    def heavy_query(self) -> str:
+        return f"/api/exact-decimal?decimal={next(self.values)}e-310&digits=50&limit=1000"
+
+    def test_offloaded_results_match_inline(self) -> None:
+        paths = [self.heavy_query(), "/api/segment?decimal=1e-300", "/api/exact-decimal?decimal=0.1&digits=17"]
+        offloaded = [self.client.get(path).get_json() for path in paths]
+        app.config["OFFLOAD_WORKERS"] = 0
+        app_module._exact_decimal_payload.cache_clear()
+        app_module._segment_payload.cache_clear()
+        self.assertEqual([self.client.get(path).get_json() for path in paths], offloaded)
+
+    def test_offloaded_stages_are_recorded(self) -> None:
+        labels = {"tool": "segment", "exponent": "-1024..-769"}
+        before = app_module.STAGE_SECONDS.count(stage="from_fp", **labels)
+        self.assertEqual(self.client.get(f"/api/segment?decimal={next(self.values)}e-300").status_code, 200)
+        self.assertEqual(app_module.STAGE_SECONDS.count(stage="from_fp", **labels), before + 1)
+
+    def test_time_budget(self) -> None:
+        app.config["TIME_BUDGET"] = 1e-4
+        response = self.client.get(self.heavy_query())
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json()["reason"], "time_budget")
+        self.assertEqual(response.headers["Retry-After"], "1")
+        self.assertNotIn("ETag", response.headers)
+
+    def test_range_exact_decimals_are_offloaded(self) -> None:
+        path = "/api/range?decimal=1e-310&k=1500&exact=1"
+        offloaded = self.client.get(path).data
+        app.config["OFFLOAD_WORKERS"] = 0
+        self.assertEqual(self.client.get(path).data, offloaded)
+        self.assertEqual(len(offloaded.splitlines()), 3001)
+
+    def test_range_exact_time_budget(self) -> None:
+        app.config["TIME_BUDGET"] = 1e-4
+        response = self.client.get("/api/range?decimal=1e-310&k=1500&exact=1")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json()["reason"], "time_budget")
+        self.assertEqual(response.headers["Retry-After"], "1")
+
+    def test_iteration_budget(self) -> None:
+        app.config["ITERATION_BUDGET"] = 10
+        self.assertEqual(self.client.get("/api/range?decimal=1&k=5").status_code, 422)
+        self.assertEqual(self.client.get("/api/range?decimal=1&k=4").status_code, 200)
+
+    def test_flood_keeps_light_pages_responsive(self) -> None:
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+        stop = threading.Event()
+        heavy = []
+
+        def flood():
+            while not stop.is_set():
+                try:
+                    with urllib.request.urlopen(base + self.heavy_query()) as response:
+                        heavy.append((response.status, None))
+                except urllib.error.HTTPError as exc:
+                    heavy.append((exc.code, (json.loads(exc.read())["reason"], exc.headers["Retry-After"])))
+
+        def latency(path):
+            start = time.perf_counter()
+            with urllib.request.urlopen(base + path) as response:
+                response.read()
+                self.assertEqual(response.status, 200)
+            return time.perf_counter() - start
+
+        try:
+            self.assertLess(latency("/notes"), 5)  # warm up: templates are compiled on first use
+            with ThreadPoolExecutor(max_workers=24) as flooders:
+                for _ in range(24):
+                    flooders.submit(flood)
+                time.sleep(0.5)
+                latencies = [latency(path) for path in ("/", "/notes") * 20]
+                stop.set()
+        finally:
+            server.shutdown()
+
+        self.assertLess(max(latencies), 0.5)
+        self.assertLessEqual({status for status, _ in heavy}, {200, 503})
+        self.assertIn(200, {status for status, _ in heavy})
+        for status, refusal in heavy:
+            if status == 503:
+                self.assertEqual(refusal, ("overloaded", "1"))
+
 
 if __name__ == "__main__":
     unittest.main()